@@ -0,0 +1,21 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+# Admin endpoints (profiling, memory snapshots) are off unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+
+def is_admin_token(value: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and value is not None and hmac.compare_digest(value.encode(), ADMIN_TOKEN.encode())
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Dependency for admin-only routes"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -0,0 +1,51 @@
+from app.api.responses import dumps
+from app.utils.admission import (
+    ADMISSION_RETRY_AFTER_SECONDS, DEGRADED_HEADER, admission_controller, degraded_scope, request_class
+)
+
+
+class AdmissionMiddleware:
+    """
+    Admit, degrade or shed each provider-backed request by the worker's current load. Batch work is
+    turned away with 503 + Retry-After; interactive requests are answered by the local engines and
+    marked with X-Degraded-Mode.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        kind = request_class(scope.get("method", ""), scope["path"]) if scope["type"] == "http" else None
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        decision = admission_controller.decide(kind)
+        if decision == "shed":
+            print(f"🚦 Shedding {scope['path']} - worker is over its batch capacity")
+            body = dumps({"detail": "AI service is busy; retry later", "retry_after": ADMISSION_RETRY_AFTER_SECONDS})
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        if decision == "admit":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (DEGRADED_HEADER.lower().encode(), b"local-fallback")
+                ]}
+            await send(message)
+
+        # Set before the deadline middleware starts its task, so the flag is copied into the handler's context
+        with degraded_scope(True):
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,161 @@
+import os
+import threading
+import zlib
+from typing import Dict, Optional
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+# Below this size the header overhead and CPU cost outweigh the bytes saved
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+# Brotli quality 4 compresses better than gzip -6 at similar speed; 11 is far too slow per request
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+compression_stats = {"responses": 0, "compressed": 0, "skipped_small": 0, "bytes_in": 0, "bytes_out": 0, "by_encoding": {}}
+_stats_lock = threading.Lock()
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+    wildcard = offered.get("*", 0.0)
+    candidates = (["br"] if BROTLI_AVAILABLE else []) + ["gzip"]
+    for encoding in candidates:
+        if offered.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 31 writes a gzip header and trailer around the deflate stream
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            chunk = self.compressor.process(data)
+            return chunk + (self.compressor.finish() if final else self.compressor.flush())
+        chunk = self.compressor.compress(data)
+        # Sync-flush streamed chunks so clients see each one as it is produced
+        return chunk + self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _record(encoding: Optional[str], bytes_in: int, bytes_out: int) -> None:
+    with _stats_lock:
+        compression_stats["responses"] += 1
+        if encoding is None:
+            compression_stats["skipped_small"] += 1
+            return
+        compression_stats["compressed"] += 1
+        compression_stats["bytes_in"] += bytes_in
+        compression_stats["bytes_out"] += bytes_out
+        compression_stats["by_encoding"][encoding] = compression_stats["by_encoding"].get(encoding, 0) + 1
+
+
+def get_compression_stats() -> Dict:
+    with _stats_lock:
+        saved = compression_stats["bytes_in"] - compression_stats["bytes_out"]
+        return {
+            **compression_stats,
+            "by_encoding": dict(compression_stats["by_encoding"]),
+            "enabled": COMPRESSION_ENABLED,
+            "brotli_available": BROTLI_AVAILABLE,
+            "min_bytes": COMPRESSION_MIN_BYTES,
+            "bytes_saved_pct": round(100 * saved / compression_stats["bytes_in"], 1) if compression_stats["bytes_in"] else 0.0,
+        }
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, whichever the client prefers and we support.
+    Whole bodies under the size threshold go out untouched; streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "compressor": None, "passthrough": False, "bytes_in": 0, "bytes_out": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk tells us whether to compress
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if state["compressor"] is None:
+                start = state["start"]
+                response_headers = {k.lower(): v for k, v in start["headers"]}
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                if (
+                    b"content-encoding" in response_headers
+                    or start["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    state["passthrough"] = True
+                    if not more_body:
+                        _record(None, len(body), len(body))
+                    await send(start)
+                    await send(message)
+                    return
+
+                state["compressor"] = _Compressor(encoding)
+                compressed = state["compressor"].compress(body, final=not more_body)
+                new_headers = [
+                    (k, v) for k, v in start["headers"] if k.lower() not in (b"content-length", b"vary")
+                ]
+                vary = response_headers.get(b"vary")
+                new_headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                new_headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    new_headers.append((b"content-length", str(len(compressed)).encode()))
+                await send({**start, "headers": new_headers})
+            else:
+                compressed = state["compressor"].compress(body, final=not more_body)
+
+            state["bytes_in"] += len(body)
+            state["bytes_out"] += len(compressed)
+            if not more_body:
+                _record(encoding, state["bytes_in"], state["bytes_out"])
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
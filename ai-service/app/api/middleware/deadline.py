@@ -0,0 +1,70 @@
+import asyncio
+import os
+
+from app.api.responses import dumps
+from app.utils.deadline import (
+    DEADLINE_HEADER, deadline_scope, release_deadline, resolve_deadline, record_deadline_event
+)
+
+# Extra time past the deadline before the request task is cancelled; handlers should answer well before this
+DEADLINE_GRACE_SECONDS = float(os.getenv("DEADLINE_GRACE_SECONDS", 1))
+
+
+class DeadlineMiddleware:
+    """
+    Give every request a deadline from the X-Request-Timeout-Ms header or the route default.
+    Handlers degrade to local fallbacks as it nears; a request still running once it has passed is cancelled with a 504.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        header_value = headers.get(DEADLINE_HEADER.encode())
+        deadline = resolve_deadline(scope["path"], header_value.decode("latin-1") if header_value else None)
+        if deadline is None:
+            await self.app(scope, receive, send)
+            return
+        record_deadline_event("requests")
+        if deadline.source == "header":
+            record_deadline_event("from_header")
+
+        state = {"started": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["started"] = True
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Background tasks run after the body in this same context and are not bound by the request's budget
+                release_deadline()
+
+        async def run():
+            with deadline_scope(deadline):
+                await self.app(scope, receive, send_wrapper)
+
+        # The task copies this context, so the deadline follows it into to_thread workers
+        task = asyncio.ensure_future(run())
+        done, _ = await asyncio.wait({task}, timeout=max(deadline.remaining(), 0) + DEADLINE_GRACE_SECONDS)
+        if task in done:
+            task.result()
+            return
+        if state["started"]:
+            # Already responding (or running background tasks); cancelling now would only truncate it
+            await task
+            return
+
+        task.cancel()
+        record_deadline_event("expired")
+        print(f"⏱️ {scope['path']} cancelled after its {deadline.seconds:.1f}s deadline")
+        body = dumps({"detail": f"Request exceeded its {deadline.seconds:.1f}s deadline"})
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
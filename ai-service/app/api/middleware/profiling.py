@@ -0,0 +1,42 @@
+from app.api.admin_auth import is_admin_token
+from app.services.profiler import sampling_profiler
+
+PROFILE_HEADER = b"x-debug-profile"
+
+
+class ProfilingMiddleware:
+    """
+    Sample the process while a request carrying X-Debug-Profile: <admin token> runs, and return the profile id
+    in X-Profile-Id for GET /api/admin/profile/{id}. Samples cover the whole process, so work from concurrent
+    requests shows up too. Requests without the header only pay for one header scan.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = None
+        for name, value in scope.get("headers") or []:
+            if name == PROFILE_HEADER:
+                token = value.decode("latin-1")
+                break
+        if token is None or not is_admin_token(token):
+            await self.app(scope, receive, send)
+            return
+
+        session = sampling_profiler.start(f"{scope['method']} {scope['path']}")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-profile-id", session.id.encode())
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampling_profiler.stop(session)
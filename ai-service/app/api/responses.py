@@ -0,0 +1,40 @@
+import json
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, via orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        # OPT_NON_STR_KEYS matches the stdlib encoder on dicts keyed by ints
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when installed, else compact stdlib JSON"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serialize a response model we built ourselves straight to JSON.
+    Returning a Response makes FastAPI skip response_model, which would otherwise dump the model,
+    validate the dump again and encode it a second time; the decorator's response_model still documents the schema.
+    """
+    return Response(
+        content=model.model_dump_json(),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
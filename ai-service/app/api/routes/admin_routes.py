@@ -0,0 +1,110 @@
+# /ai-service/routes/admin_routes.py
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.admin_auth import require_admin
+from app.services.profiler import (
+    sampling_profiler, memory_snapshots, render_folded, PROFILE_MAX_SECONDS
+)
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+def profile_output(session, output: str):
+    if output == "folded":
+        return PlainTextResponse(render_folded(session.samples))
+    return {**session.summary(), "top_stacks": [
+        {"stack": stack, "samples": count} for stack, count in session.samples.most_common(50)
+    ]}
+
+
+@router.post("/profile")
+async def profile_window(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    output: str = Query("folded", pattern="^(folded|json)$")
+):
+    """Sample every thread for a time window; folded output feeds flamegraph.pl or speedscope"""
+    session = sampling_profiler.start(f"window {seconds}s")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampling_profiler.stop(session)
+    print(f"🔬 Profiled {seconds}s: {session.summary()['samples']} stack samples")
+    return profile_output(session, output)
+
+
+@router.get("/profile")
+async def list_profiles():
+    """Recent window and per-request (X-Debug-Profile) profiles"""
+    return {"profiles": sampling_profiler.list_results(), "profiler": sampling_profiler.get_stats()}
+
+
+@router.get("/profile/{profile_id}")
+async def get_profile(profile_id: str, output: str = Query("folded", pattern="^(folded|json)$")):
+    session = sampling_profiler.get_result(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found or already evicted")
+    return profile_output(session, output)
+
+
+@router.post("/memory/start")
+async def start_memory_tracing(frames: int = Query(25, ge=1, le=100)):
+    """Start tracemalloc; allocations are slower until /memory/stop"""
+    return memory_snapshots.start(frames)
+
+
+@router.post("/memory/stop")
+async def stop_memory_tracing():
+    return memory_snapshots.stop()
+
+
+@router.get("/memory")
+async def memory_status():
+    """Tracing state, kept snapshots and the sizes of the in-process stores that tend to grow"""
+    from app.services.semantic_cache import bobby_cache
+    from app.services.transcript_store import transcript_cache
+    from app.services.question_dedup import course_question_history
+    from app.utils.shared_state import state_backend
+
+    stores = {
+        "semantic_cache": bobby_cache.get_stats(),
+        "transcript_cache": transcript_cache.get_stats(),
+        "question_history_courses": len(course_question_history),
+        "shared_state_backend": state_backend.name,
+    }
+    if hasattr(state_backend, "data"):
+        stores["shared_state_keys"] = len(state_backend.data)
+    return {**memory_snapshots.status(), "stores": stores}
+
+
+@router.post("/memory/snapshots")
+async def take_memory_snapshot(
+    label: Optional[str] = None,
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(25, ge=1, le=200),
+    include: Optional[str] = Query(None, description="only allocations with a frame in paths containing this, e.g. app/")
+):
+    """Take a snapshot and return its largest allocation sites"""
+    try:
+        snapshot = await asyncio.to_thread(memory_snapshots.take, label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {**snapshot, "top": memory_snapshots.top(snapshot["id"], group_by, limit, include)}
+
+
+@router.get("/memory/diff")
+async def diff_memory_snapshots(
+    from_id: str = Query(..., alias="from"),
+    to_id: str = Query(..., alias="to"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(25, ge=1, le=200),
+    include: Optional[str] = None
+):
+    """Allocation sites that grew most between two snapshots"""
+    try:
+        return await asyncio.to_thread(memory_snapshots.diff, from_id, to_id, group_by, limit, include)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e.args[0]} not found or already evicted")
@@ -1,12 +1,31 @@
 # /ai-service/routes/chatbot_routes.py
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Header, Response
 from pydantic import BaseModel
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import List, Optional
 import os
+import hashlib
 from groq import Groq
 from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 from dotenv import load_dotenv
+from app.services.provider_cassette import wrap_groq_client
+from app.utils.shared_state import state_backend, CircuitBreaker
+from app.utils.http_transport import get_http_client
+from app.api.responses import model_response
+from app.api.admin_auth import require_admin
+from app.services.semantic_cache import bobby_cache
+from app.services.intent_router import intent_router
+from app.services.usage_tracker import usage_tracker, extract_usage
+from app.utils.token_budget import chat_output_tokens
+from app.utils.deadline import has_time_for_llm, provider_timeout, deadline_expired, mongo_timeout
+from app.utils.admission import admission_controller, provider_admitted
+from app.services.health_prober import health_prober, MONGO_CLIENT_OPTIONS, mongo_check, groq_check
+from app.services.conversation_summary import (
+    SUMMARY_MODE, compact_history, build_prompt_messages, record_prompt_savings,
+    llm_summary, record_llm_summary, get_summary_stats
+)
 
 router = APIRouter()
 load_dotenv()
@@ -19,8 +38,8 @@ def initialize_groq_client():
             print("⚠️ Groq API key not found - Bobby chatbot will use fallback responses")
             return None, False
         
-        # Initialize with minimal configuration to avoid version conflicts
-        client = Groq(api_key=groq_api_key)
+        # Shared keep-alive pool instead of a private connection pool per SDK client
+        client = Groq(api_key=groq_api_key, http_client=get_http_client())
         
         # Test the client with a simple call to ensure it works
         print("✅ Groq AI configured successfully for Bobby")
@@ -33,9 +52,17 @@ def initialize_groq_client():
 
 groq_client, GROQ_AVAILABLE = initialize_groq_client()
 
+# Record/replay provider responses when PROVIDER_CASSETTE_MODE is set
+groq_client = wrap_groq_client(groq_client, "llama-3.1-8b-instant")
+GROQ_AVAILABLE = groq_client is not None
+
+# Opens for every worker once Groq keeps failing, so requests go straight to fallback
+groq_circuit = CircuitBreaker("groq")
+
 # MongoDB connection for chatbot conversations
 try:
-    mongo_client = MongoClient(os.getenv("MONGODB_URI"))
+    # Construction never fails, so reachability is tracked by the health prober
+    mongo_client = MongoClient(os.getenv("MONGODB_URI"), **MONGO_CLIENT_OPTIONS)
     db = mongo_client.chatbot_db
     conversations_collection = db.conversations
     print("✅ MongoDB connected for Bobby conversations")
@@ -45,6 +72,15 @@ except Exception as e:
     conversations_collection = None
     MONGO_AVAILABLE = False
 
+if MONGO_AVAILABLE:
+    health_prober.register("mongo", mongo_check(mongo_client))
+if GROQ_AVAILABLE:
+    health_prober.register("groq", groq_check(groq_client))
+
+def mongo_ready() -> bool:
+    """Mongo is configured and the last probe or request found it reachable"""
+    return MONGO_AVAILABLE and conversations_collection is not None and health_prober.is_ready("mongo")
+
 # Bobby's personality
 BOBBY_SYSTEM_PROMPT = """You are Bobby, a helpful and friendly AI assistant integrated into a learning management system. You help students and educators with questions about courses, learning, and general assistance.
 
@@ -65,6 +101,8 @@ You're part of an SkillNest , a learning Management platform, so you can help wi
 class ChatRequest(BaseModel):
     message: str
     sessionId: str
+    courseId: Optional[str] = None
+    userId: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -72,6 +110,10 @@ class ChatResponse(BaseModel):
 
 class ConversationHistory(BaseModel):
     messages: List[dict]
+    total: int = 0
+    has_more_before: bool = False
+    before_cursor: Optional[str] = None
+    after_cursor: Optional[str] = None
 
 # Helper Functions
 def get_fallback_response(message: str) -> str:
@@ -93,31 +135,146 @@ def get_fallback_response(message: str) -> str:
     # Default response
     return "I'm Bobby, your AI assistant! I'm here to help with your learning and studies. While I'm experiencing some technical difficulties right now, I'm still here to support you. What can I help you with?"
 
+# Fallback conversations live in the shared state backend so every worker sees them
+MEMORY_CONVERSATION_TTL = 24 * 3600
+
 def store_conversation_memory(session_id: str, user_message: str, assistant_response: str) -> None:
-    """Store conversation in memory (fallback when MongoDB unavailable)"""
-    if not hasattr(store_conversation_memory, 'conversations'):
-        store_conversation_memory.conversations = {}
-    
-    if session_id not in store_conversation_memory.conversations:
-        store_conversation_memory.conversations[session_id] = []
+    """Store conversation in shared state (fallback when MongoDB unavailable)"""
+    timestamp = datetime.now(timezone.utc).isoformat()
+
+    def append_exchange(messages: List[dict]) -> List[dict]:
+        # Explicit ids stay stable when old messages are trimmed below
+        next_id = messages[-1].get("id", len(messages) - 1) + 1 if messages else 0
+        appended = messages + [
+            {"id": next_id, "role": "user", "content": user_message, "timestamp": timestamp},
+            {"id": next_id + 1, "role": "assistant", "content": assistant_response, "timestamp": timestamp},
+        ]
+        # Keep only last 10 exchanges per session
+        return appended[-20:]
+
+    # One atomic update, so two workers answering the same session cannot drop each other's exchange
+    state_backend.update(f"conversation:{session_id}", append_exchange, [], ttl=MEMORY_CONVERSATION_TTL)
+
+def get_conversation_memory(session_id: str) -> List[dict]:
+    """Get conversation from shared state"""
+    return state_backend.get(f"conversation:{session_id}", [])
+
+def record_exchange(session_id: str, user_message: str, assistant_response: str) -> None:
+    """Append an exchange answered without Groq to the session's history"""
+    if mongo_ready():
+        try:
+            now = datetime.now(timezone.utc)
+            with mongo_timeout():
+                conversations_collection.update_one(
+                    {"sessionId": session_id},
+                    {
+                        "$push": {"messages": {"$each": [
+                            {"role": "user", "content": user_message, "timestamp": now},
+                            {"role": "assistant", "content": assistant_response, "timestamp": now},
+                        ]}},
+                        "$set": {"lastActivity": now},
+                        "$setOnInsert": {"createdAt": now}
+                    },
+                    upsert=True
+                )
+            return
+        except Exception as e:
+            print(f"⚠️ MongoDB error recording exchange: {e}")
+            if isinstance(e, PyMongoError):
+                health_prober.mark_failure("mongo", e)
+    store_conversation_memory(session_id, user_message, assistant_response)
+
+def refine_summary_with_llm(session_id: str, previous_summary: str, folded: List[dict], summarized_count: int) -> None:
+    """Replace the extractive summary with an LLM rewrite, unless the conversation moved on"""
+    summary = llm_summary(groq_client, previous_summary, folded)
+    if summary and conversations_collection is not None:
+        conversations_collection.update_one(
+            {"sessionId": session_id, "summarizedCount": summarized_count},
+            {"$set": {"summary": summary}}
+        )
+        record_llm_summary()
+
+# History pagination: a message's id is its position in the conversation, which is
+# stable because messages are only ever appended
+HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+_history_index_ready = False
+
+def parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None:
+        return None
+    if not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Cursor must be a message id")
+    return int(cursor)
+
+def page_bounds(before: Optional[int], after: Optional[int], limit: int) -> Optional[tuple]:
+    """(start, count) of the requested page, or None for the latest page"""
+    if before is not None:
+        start = max(before - limit, 0)
+        return start, before - start
+    if after is not None:
+        return after + 1, limit
+    return None
+
+def fetch_history_page_mongo(session_id: str, before: Optional[int], after: Optional[int], limit: int) -> Optional[dict]:
+    """Read only the requested page and the message count from Mongo"""
+    global _history_index_ready
+    if not _history_index_ready:
+        conversations_collection.create_index("sessionId")
+        _history_index_ready = True
     
-    store_conversation_memory.conversations[session_id].extend([        {"role": "user", "content": user_message, "timestamp": datetime.now(timezone.utc)},
-        {"role": "assistant", "content": assistant_response, "timestamp": datetime.now(timezone.utc)},
-    ])
+    bounds = page_bounds(before, after, limit)
+    if bounds is None:
+        page_expression = {"$slice": ["$messages", -limit]}
+    elif bounds[1] <= 0:
+        page_expression = {"$literal": []}
+    else:
+        page_expression = {"$slice": ["$messages", bounds[0], bounds[1]]}
     
-    # Keep only last 10 messages per session
-    if len(store_conversation_memory.conversations[session_id]) > 20:
-        store_conversation_memory.conversations[session_id] = store_conversation_memory.conversations[session_id][-20:]
+    result = list(conversations_collection.aggregate([
+        {"$match": {"sessionId": session_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "total": {"$size": "$messages"}, "lastActivity": 1, "page": page_expression}}
+    ]))
+    if not result:
+        return None
+    document = result[0]
+    start = bounds[0] if bounds else max(document["total"] - limit, 0)
+    return {"total": document["total"], "first": 0, "version": str(document.get("lastActivity")), "start": start, "page": document["page"]}
 
-def get_conversation_memory(session_id: str) -> List[dict]:
-    """Get conversation from memory"""
-    if hasattr(store_conversation_memory, 'conversations'):
-        return store_conversation_memory.conversations.get(session_id, [])
-    return []
+def fetch_history_page_memory(session_id: str, before: Optional[int], after: Optional[int], limit: int) -> Optional[dict]:
+    """Same page shape from the shared-state fallback store, which only keeps recent messages"""
+    messages = get_conversation_memory(session_id)
+    if not messages:
+        return None
+    first_id = messages[0].get("id", 0)
+    total = first_id + len(messages)
+    bounds = page_bounds(before, after, limit)
+    start, count = bounds if bounds else (max(total - limit, 0), limit)
+    if start < first_id:
+        count -= first_id - start
+        start = first_id
+    page = messages[start - first_id:start - first_id + max(count, 0)]
+    return {"total": total, "first": first_id, "version": str(messages[-1].get("timestamp")), "start": start, "page": page}
+
+def history_etag(session_id: str, page: dict, limit: int) -> str:
+    fingerprint = f"{session_id}:{page['total']}:{page['version']}:{page['start']}:{len(page['page'])}:{limit}"
+    return '"' + hashlib.sha1(fingerprint.encode()).hexdigest()[:20] + '"'
+
+def call_groq(messages: List[dict], max_tokens: int):
+    """One Groq completion, counted as an in-flight provider call"""
+    with admission_controller.provider_call():
+        return groq_client.chat.completions.create(
+            messages=messages,
+            model="llama-3.1-8b-instant",
+            max_tokens=max_tokens,
+            temperature=0.7,
+            timeout=provider_timeout(),
+        )
 
 # Routes
 @router.post("/chat", response_model=ChatResponse)
-async def bobby_chat(request: ChatRequest):
+async def bobby_chat(request: ChatRequest, background_tasks: BackgroundTasks):
     """Bobby Chatbot endpoint"""
     try:
         print(f"\n🤖 Bobby received message from session: {request.sessionId}")
@@ -125,54 +282,101 @@ async def bobby_chat(request: ChatRequest):
         
         bobby_response = ""
         
-        if GROQ_AVAILABLE and groq_client and MONGO_AVAILABLE and conversations_collection is not None:
+        # Greetings, platform FAQs and off-topic requests are answered from templates without Groq
+        routed = intent_router.route(request.message)
+        # Recurring standalone questions are answered from the semantic cache without Groq
+        cached_response = None if routed else bobby_cache.lookup(request.message)
+        
+        if routed:
+            bobby_response = routed["response"]
+            record_exchange(request.sessionId, request.message, bobby_response)
+            print(f"⚡ Bobby answered '{routed['intent']}' locally ({routed['source']}, {routed['confidence']})")
+            
+        elif cached_response:
+            bobby_response = cached_response
+            record_exchange(request.sessionId, request.message, bobby_response)
+            print("✅ Bobby responded from semantic cache")
+            
+        elif GROQ_AVAILABLE and groq_client and health_prober.is_ready("groq") and mongo_ready() \
+                and groq_circuit.allow_request() and not usage_tracker.over_budget(request.courseId) and has_time_for_llm() \
+                and provider_admitted():
             # Full AI + Database mode
             try:
-                # Get or create conversation
-                conversation = conversations_collection.find_one({"sessionId": request.sessionId})
+                # Conversation reads and writes share one Mongo budget, cut short near the deadline
+                with mongo_timeout():
+                    # Get or create conversation
+                    conversation = conversations_collection.find_one({"sessionId": request.sessionId})
                 
-                if not conversation:
-                    conversation = {
-                        "sessionId": request.sessionId,
-                        "messages": [],                        "lastActivity": datetime.now(timezone.utc),
-                        "createdAt": datetime.now(timezone.utc)
-                    }
-                    conversations_collection.insert_one(conversation)
-                
-                # Add user message
-                user_message = {
-                    "role": "user",
-                    "content": request.message,
-                    "timestamp": datetime.now(timezone.utc)
-                }
+                    if not conversation:
+                        conversation = {
+                            "sessionId": request.sessionId,
+                            "messages": [],                        "lastActivity": datetime.now(timezone.utc),
+                            "createdAt": datetime.now(timezone.utc)
+                        }
+                        conversations_collection.insert_one(conversation)
                 
-                # Update conversation with user message
-                conversations_collection.update_one(
-                    {"sessionId": request.sessionId},                    {
-                        "$push": {"messages": user_message},
-                        "$set": {"lastActivity": datetime.now(timezone.utc)}
+                    # Add user message
+                    user_message = {
+                        "role": "user",
+                        "content": request.message,
+                        "timestamp": datetime.now(timezone.utc)
                     }
-                )
                 
-                # Get updated conversation for context
-                conversation = conversations_collection.find_one({"sessionId": request.sessionId})
-                recent_messages = conversation["messages"][-10:]  # Last 10 messages
+                    # Update conversation with user message
+                    conversations_collection.update_one(
+                        {"sessionId": request.sessionId},                    {
+                            "$push": {"messages": user_message},
+                            "$set": {"lastActivity": datetime.now(timezone.utc)}
+                        }
+                    )
                 
+                    # Get updated conversation for context
+                    conversation = conversations_collection.find_one({"sessionId": request.sessionId})
+                
+                    # Older turns are folded into a rolling summary once the history gets long
+                    summary, recent_messages, summary_update = compact_history(conversation)
+                    if summary_update:
+                        conversations_collection.update_one(
+                            {"sessionId": request.sessionId},
+                            {"$set": {
+                                "summary": summary_update["summary"],
+                                "summarizedCount": summary_update["summarizedCount"]
+                            }}
+                        )
+                        if SUMMARY_MODE == "llm":
+                            background_tasks.add_task(
+                                refine_summary_with_llm, request.sessionId, summary_update["previousSummary"],
+                                summary_update["folded"], summary_update["summarizedCount"]
+                            )
+
                 # Prepare messages for Groq
-                groq_messages = [{"role": "system", "content": BOBBY_SYSTEM_PROMPT}]
-                for msg in recent_messages:
-                    groq_messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
+                groq_messages = build_prompt_messages(BOBBY_SYSTEM_PROMPT, summary, recent_messages)
+                record_prompt_savings(conversation, BOBBY_SYSTEM_PROMPT, groq_messages)
+                
                   # Get response from Groq
-                completion = groq_client.chat.completions.create(
-                    messages=groq_messages,
-                    model="llama-3.1-8b-instant",
-                    max_tokens=300,
-                    temperature=0.7,
+                try:
+                    # The Groq SDK blocks; a worker thread keeps the loop serving other chats, and to_thread copies
+                    # the request deadline's contextvars along with it
+                    completion = await asyncio.to_thread(
+                        call_groq, groq_messages, chat_output_tokens("llama-3.1-8b-instant", request.message)
+                    )
+                except Exception:
+                    # A timeout cut short by the request deadline says nothing about Groq's health
+                    if not deadline_expired():
+                        groq_circuit.record_failure()
+                    raise
+                groq_circuit.record_success()
+                prompt_tokens, completion_tokens, estimated = extract_usage(
+                    completion, " ".join(m["content"] for m in groq_messages), completion.choices[0].message.content or ""
+                )
+                usage_tracker.record(
+                    "chat", "llama-3.1-8b-instant", prompt_tokens, completion_tokens,
+                    request.courseId, request.userId, estimated
                 )
                 bobby_response = completion.choices[0].message.content or get_fallback_response(request.message)
+                # Only answers written without this session's summary or earlier turns can be shared with others
+                if completion.choices[0].message.content and not summary and len(recent_messages) <= 1:
+                    bobby_cache.store(request.message, bobby_response)
                 
                 # Store Bobby's response
                 assistant_message = {
@@ -181,17 +385,20 @@ async def bobby_chat(request: ChatRequest):
                     "timestamp": datetime.now(timezone.utc)
                 }
                 
-                conversations_collection.update_one(
-                    {"sessionId": request.sessionId},                    {
-                        "$push": {"messages": assistant_message},
-                        "$set": {"lastActivity": datetime.now(timezone.utc)}
-                    }
-                )
+                with mongo_timeout():
+                    conversations_collection.update_one(
+                        {"sessionId": request.sessionId},                    {
+                            "$push": {"messages": assistant_message},
+                            "$set": {"lastActivity": datetime.now(timezone.utc)}
+                        }
+                    )
                 
                 print("✅ Bobby responded using Groq AI + MongoDB")
                 
             except Exception as groq_error:
                 print(f"❌ Groq/MongoDB error: {groq_error}")
+                if isinstance(groq_error, PyMongoError):
+                    health_prober.mark_failure("mongo", groq_error)
                 bobby_response = get_fallback_response(request.message)
                 store_conversation_memory(request.sessionId, request.message, bobby_response)
                 
@@ -210,46 +417,66 @@ async def bobby_chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail="Sorry, I encountered an error. Please try again.")
 
 @router.get("/history/{session_id}", response_model=ConversationHistory)
-async def get_bobby_history(session_id: str):
-    """Get Bobby conversation history"""
+async def get_bobby_history(
+    session_id: str,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get a page of Bobby conversation history, newest page by default"""
+    before_id, after_id = parse_cursor(before), parse_cursor(after)
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
     try:
-        if MONGO_AVAILABLE and conversations_collection is not None:
-            conversation = conversations_collection.find_one({"sessionId": session_id})
-            
-            if not conversation:
-                return ConversationHistory(messages=[])
-            
-            # Return last 20 messages
-            messages = conversation["messages"][-20:]
-            
-            # Convert datetime objects for JSON serialization
-            for msg in messages:
-                if isinstance(msg["timestamp"], datetime):
-                    msg["timestamp"] = msg["timestamp"].isoformat()
-                    
-            return ConversationHistory(messages=messages)
+        if mongo_ready():
+            with mongo_timeout():
+                page = fetch_history_page_mongo(session_id, before_id, after_id, limit)
         else:
             # Fallback to memory
-            messages = get_conversation_memory(session_id)
-            for msg in messages:
-                if isinstance(msg["timestamp"], datetime):
-                    msg["timestamp"] = msg["timestamp"].isoformat()
-            return ConversationHistory(messages=messages)
-            
+            page = fetch_history_page_memory(session_id, before_id, after_id, limit)
     except Exception as e:
+        if isinstance(e, PyMongoError):
+            health_prober.mark_failure("mongo", e)
         print(f"History fetch error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch conversation history")
+    
+    if not page:
+        return model_response(ConversationHistory(messages=[]))
+    
+    etag = history_etag(session_id, page, limit)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    messages = []
+    for offset, msg in enumerate(page["page"]):
+        # Convert datetime objects for JSON serialization
+        timestamp = msg.get("timestamp")
+        messages.append({
+            **msg,
+            "id": str(page["start"] + offset),
+            "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
+        })
+    
+    return model_response(ConversationHistory(
+        messages=messages,
+        total=page["total"],
+        has_more_before=page["start"] > page["first"] and bool(messages),
+        # An empty page keeps the caller's cursor so polling with after= can continue
+        before_cursor=messages[0]["id"] if messages else before,
+        after_cursor=messages[-1]["id"] if messages else after
+    ), headers={"ETag": etag})
 
 @router.delete("/conversation/{session_id}")
 async def clear_bobby_conversation(session_id: str):
     """Clear Bobby conversation"""
     try:
-        if MONGO_AVAILABLE and conversations_collection is not None:
-            conversations_collection.delete_one({"sessionId": session_id})
+        if mongo_ready():
+            with mongo_timeout():
+                conversations_collection.delete_one({"sessionId": session_id})
         else:
-            # Clear from memory
-            if hasattr(store_conversation_memory, 'conversations'):
-                store_conversation_memory.conversations.pop(session_id, None)
+            # Clear from shared state
+            state_backend.delete(f"conversation:{session_id}")
         
         return {"message": "Conversation cleared successfully"}
         
@@ -257,12 +484,27 @@ async def clear_bobby_conversation(session_id: str):
         print(f"Clear conversation error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to clear conversation")
 
+@router.get("/cache/stats")
+async def bobby_cache_stats():
+    """Semantic cache hit rate and size"""
+    return bobby_cache.get_stats()
+
+@router.delete("/cache", dependencies=[Depends(require_admin)])
+async def invalidate_bobby_cache(query: Optional[str] = None):
+    """Invalidate cached answers similar to query, or all of them"""
+    removed = bobby_cache.invalidate(query)
+    return {"message": "Cache invalidated", "removed": removed}
+
 @router.get("/health")
 async def bobby_health():
     """Bobby chatbot health check"""
     return {
         "service": "bobby_chatbot",
         "ai_available": GROQ_AVAILABLE,
-        "database_available": MONGO_AVAILABLE,
+        "database_available": mongo_ready(),
+        "circuit": groq_circuit.get_state(),
+        "semantic_cache": bobby_cache.get_stats(),
+        "intent_router": intent_router.get_stats(),
+        "context_compaction": get_summary_stats(),
         "model": "llama-3.1-8b-instant" if GROQ_AVAILABLE else "intelligent_fallback"
     }
\ No newline at end of file
@@ -1,21 +1,41 @@
 # /ai-service/routes/quiz_routes.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import math
 import os
 import json
 import re
-import google.generativeai as genai
+import time
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
+from app.utils.token_budget import (
+    fit_text_to_budget, log_prompt_report, quiz_output_tokens, content_budget, split_text_evenly
+)
+from app.utils.upload_utils import stream_multipart_to_disk
+from app.services.document_extractor import extract_document
+from app.services.question_dedup import filter_near_duplicates, record_issued_questions
+from app.services.question_bank import question_bank
+from app.services.provider_cassette import wrap_gemini_model
+from app.utils.shared_state import CircuitBreaker
+from app.services.usage_tracker import usage_tracker, extract_usage
+from app.services.health_prober import health_prober, gemini_check
+from app.api.responses import model_response
+from app.utils.http_transport import get_gemini_model
+from app.utils.deadline import call_with_deadline, has_time_for_llm, DeadlineExceeded
+from app.utils.admission import admission_controller, provider_admitted
+from app.models.quiz_models import GradedSubmission, ShortAnswerGradingRequest, ShortAnswerGradingResponse
+from app.services.short_answer_grader import (
+    GRADING_LLM_BATCH_SIZE, GRADING_LLM_CONCURRENCY, build_grading_prompt, parse_llm_grades, short_answer_grader
+)
 
 load_dotenv()
 router = APIRouter()
 # Configure Gemini with error handling
 try:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if api_key and api_key != "your_gemini_api_key_here":
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
+    model = get_gemini_model('gemini-1.5-flash')
+    if model is not None:
         print("✅ Gemini AI configured successfully")
         GEMINI_AVAILABLE = True
     else:
@@ -27,6 +47,15 @@ except Exception as e:
     model = None
     GEMINI_AVAILABLE = False
 
+# Record/replay provider responses when PROVIDER_CASSETTE_MODE is set
+model = wrap_gemini_model(model, "gemini-1.5-flash")
+GEMINI_AVAILABLE = model is not None
+
+# Shared across workers so one worker's failures stop the others hammering Gemini
+gemini_circuit = CircuitBreaker("gemini")
+if GEMINI_AVAILABLE:
+    health_prober.register("gemini", gemini_check(model))
+
 # Models
 class QuizSettings(BaseModel):
     question_count: int = 10
@@ -38,6 +67,7 @@ class QuizGenerationRequest(BaseModel):
     settings: QuizSettings
     course_id: str = "default"
     user_id: str = "default"
+    use_question_bank: bool = True
 
 class QuizQuestion(BaseModel):
     question: str
@@ -87,6 +117,74 @@ FORMAT YOUR RESPONSE AS A VALID JSON ARRAY:
 IMPORTANT: Your response must contain EXACTLY {num_questions} questions. This is critical.
 """
 
+# Replacement prompt for questions rejected as near-duplicates
+REPLACEMENT_PROMPT = """
+You are an expert educational quiz generator. Generate EXACTLY {num_questions} NEW questions from the content below.
+
+CONTENT TO GENERATE QUESTIONS FROM:
+{content}
+
+DO NOT repeat or paraphrase any of these existing questions:
+{existing_questions}
+
+REQUIREMENTS:
+1. Difficulty level: {difficulty}
+2. Each question must have exactly 4 options
+3. Each question must test a different fact or concept than the existing questions
+
+FORMAT YOUR RESPONSE AS A VALID JSON ARRAY using the same structure:
+[
+  {{
+    "question": "Specific question from the content?",
+    "type": "mcq",
+    "options": ["Specific option A", "Specific option B", "Specific option C", "Specific option D"],
+    "correct_answer": "Specific option A",
+    "explanation": "Clear explanation why this is correct",
+    "difficulty": "{difficulty}",
+    "points": 1
+  }}
+]
+"""
+
+MAX_REPLACEMENT_ROUNDS = 2
+
+# Prompt for one shard of a large quiz: a few questions drawn from one section of the material
+SHARD_PROMPT = """
+You are an expert educational quiz generator. Generate EXACTLY {num_questions} questions about the section below.
+
+This is section {section} of {sections} of the material. Ask only about facts and concepts in this section.
+
+SECTION CONTENT:
+{content}
+
+REQUIREMENTS:
+1. Generate EXACTLY {num_questions} questions
+2. Difficulty level: {difficulty}
+3. Question type: {question_type}
+4. Each question must have exactly 4 options
+5. Questions should test comprehension of this section, not general knowledge
+
+FORMAT YOUR RESPONSE AS A VALID JSON ARRAY:
+[
+  {{
+    "question": "Specific question from the section?",
+    "type": "{question_type}",
+    "options": ["Specific option A", "Specific option B", "Specific option C", "Specific option D"],
+    "correct_answer": "Specific option A",
+    "explanation": "Clear explanation why this is correct",
+    "difficulty": "{difficulty}",
+    "points": 1
+  }}
+]
+"""
+
+# Quizzes this large are split into shards generated concurrently from different parts of the content
+QUIZ_SHARD_THRESHOLD = int(os.getenv("QUIZ_SHARD_THRESHOLD", 15))
+QUIZ_SHARD_SIZE = int(os.getenv("QUIZ_SHARD_SIZE", 8))
+QUIZ_MAX_SHARDS = int(os.getenv("QUIZ_MAX_SHARDS", 8))
+QUIZ_SHARD_CONCURRENCY = int(os.getenv("QUIZ_SHARD_CONCURRENCY", 6))
+MIXED_DIFFICULTIES = ["easy", "medium", "hard"]
+
 def clean_gemini_response(response_text: str) -> str:
     """Clean and extract JSON from Gemini response"""
     # Remove markdown code blocks
@@ -251,12 +349,213 @@ def generate_intelligent_fallback(content: str, settings: QuizSettings) -> List[
     # Return exactly the number of questions requested
     return question_pool[:settings.question_count]
 
+def call_gemini(prompt: str, request: QuizGenerationRequest, num_questions: int) -> str:
+    """Call Gemini with an output ceiling sized to the questions asked for and record usage"""
+    max_output_tokens = quiz_output_tokens("gemini-1.5-flash", num_questions, request.settings.question_types)
+    try:
+        with admission_controller.provider_call():
+            response = call_with_deadline(model.generate_content, prompt, generation_config={"max_output_tokens": max_output_tokens})
+    except DeadlineExceeded:
+        # Our budget ran out, not Gemini; the circuit only tracks provider failures
+        raise
+    except Exception:
+        gemini_circuit.record_failure()
+        raise
+    gemini_circuit.record_success()
+    prompt_tokens, completion_tokens, estimated = extract_usage(response, prompt, response.text)
+    usage_tracker.record(
+        "quiz", "gemini-1.5-flash", prompt_tokens, completion_tokens,
+        request.course_id, request.user_id, estimated
+    )
+    return response.text
+
+def deduplicate_with_replacements(
+    questions: List[dict],
+    request: QuizGenerationRequest,
+    prompt_content: str,
+    existing: List[dict],
+    target: Optional[int] = None
+) -> List[dict]:
+    """Drop near-duplicate questions and ask Gemini to replace only the rejected ones (and any shortfall below target)"""
+    target = len(questions) if target is None else target
+    accepted, rejected = filter_near_duplicates(questions, request.course_id, accepted=existing)
+    
+    for _ in range(MAX_REPLACEMENT_ROUNDS):
+        missing = target - len(accepted)
+        if missing <= 0 or not has_time_for_llm():
+            break
+        
+        print(f"♻️ Requesting {missing} replacement questions...")
+        prompt = REPLACEMENT_PROMPT.format(
+            content=prompt_content,
+            num_questions=missing,
+            difficulty=request.settings.difficulty,
+            existing_questions="\n".join(f"- {q['question']}" for q in existing + accepted + rejected)
+        )
+        try:
+            replacements = parse_gemini_response(call_gemini(prompt, request, missing))[:missing]
+        except Exception as replacement_error:
+            print(f"❌ Replacement generation error: {replacement_error}")
+            break
+        new_questions, new_rejected = filter_near_duplicates(replacements, request.course_id, accepted=existing + accepted)
+        accepted.extend(new_questions)
+        rejected.extend(new_rejected)
+    
+    return accepted
+
+def generate_gemini_questions(
+    request: QuizGenerationRequest,
+    num_questions: int,
+    existing: List[dict]
+) -> List[dict]:
+    """Generate num_questions new questions with Gemini, retrying until the count is right"""
+    prompt_content, prompt_report = fit_text_to_budget(
+        request.content, "gemini-1.5-flash", GEMINI_PROMPT,
+        reserved_output_tokens=quiz_output_tokens("gemini-1.5-flash", num_questions, request.settings.question_types)
+    )
+    log_prompt_report("Quiz", prompt_report)
+    
+    # Make up to 3 attempts to get the correct number of questions
+    for attempt in range(3):
+        if not has_time_for_llm():
+            break
+        print(f"\n🔄 Attempt {attempt + 1} to generate {num_questions} questions...")
+        
+        prompt = GEMINI_PROMPT.format(
+            content=prompt_content,
+            num_questions=num_questions,
+            difficulty=request.settings.difficulty
+        )
+        
+        response_text = call_gemini(prompt, request, num_questions)
+        
+        questions = parse_gemini_response(response_text)
+        
+        # Validate question count
+        if len(questions) == num_questions:
+            print(f"✅ Successfully generated exactly {len(questions)} questions!")
+            return deduplicate_with_replacements(questions, request, prompt_content, existing)
+        else:
+            print(f"⚠️ Got {len(questions)} questions instead of {num_questions}")
+    
+    return []
+
+def plan_shards(request: QuizGenerationRequest, num_questions: int) -> List[dict]:
+    """Split a large quiz into shards, each with its own content section, question count, difficulty and type"""
+    shard_count = min(QUIZ_MAX_SHARDS, math.ceil(num_questions / QUIZ_SHARD_SIZE))
+    reserved = quiz_output_tokens("gemini-1.5-flash", math.ceil(num_questions / shard_count), request.settings.question_types)
+    sections = split_text_evenly(
+        request.content, shard_count, max_tokens=content_budget("gemini-1.5-flash", SHARD_PROMPT, reserved)
+    )
+    if len(sections) < 2:
+        return []
+
+    question_types = request.settings.question_types or ["mcq"]
+    base, extra = divmod(num_questions, len(sections))
+    return [
+        {
+            "section": position + 1,
+            "content": section,
+            "num_questions": base + (1 if position < extra else 0),
+            # Spread types (and difficulties for mixed quizzes) across shards rather than within one prompt
+            "question_type": question_types[position % len(question_types)],
+            "difficulty": MIXED_DIFFICULTIES[position % len(MIXED_DIFFICULTIES)]
+            if request.settings.difficulty == "mixed" else request.settings.difficulty,
+        }
+        for position, section in enumerate(sections)
+        if base + (1 if position < extra else 0) > 0
+    ]
+
+def generate_shard(request: QuizGenerationRequest, shard: dict, sections: int) -> List[dict]:
+    """Generate one shard's questions, retrying once if the response cannot be parsed"""
+    prompt = SHARD_PROMPT.format(
+        content=shard["content"],
+        num_questions=shard["num_questions"],
+        section=shard["section"],
+        sections=sections,
+        difficulty=shard["difficulty"],
+        question_type=shard["question_type"]
+    )
+    shard_request = request.model_copy(update={"settings": QuizSettings(
+        question_count=shard["num_questions"], difficulty=shard["difficulty"], question_types=[shard["question_type"]]
+    )})
+    for _ in range(2):
+        if not has_time_for_llm():
+            break
+        questions = parse_gemini_response(call_gemini(prompt, shard_request, shard["num_questions"]))
+        if questions:
+            return questions[:shard["num_questions"]]
+    return []
+
+async def generate_sharded_questions(
+    request: QuizGenerationRequest,
+    num_questions: int,
+    existing: List[dict]
+) -> List[dict]:
+    """Generate a large quiz as concurrent shards over the whole content, then merge, deduplicate and top up"""
+    shards = plan_shards(request, num_questions)
+    if not shards:
+        # Too little content to split; one prompt covers it anyway
+        return await asyncio.to_thread(generate_gemini_questions, request, num_questions, existing)
+
+    print(f"\n🧩 Generating {num_questions} questions as {len(shards)} shards "
+          f"({', '.join(str(shard['num_questions']) for shard in shards)})")
+    semaphore = asyncio.Semaphore(QUIZ_SHARD_CONCURRENCY)
+
+    async def run_shard(shard: dict) -> List[dict]:
+        async with semaphore:
+            return await asyncio.to_thread(generate_shard, request, shard, len(shards))
+
+    outcomes = await asyncio.gather(*(run_shard(shard) for shard in shards), return_exceptions=True)
+
+    # Merge in section order so the quiz follows the material; note which sections came up short
+    merged, short_sections = [], []
+    for shard, outcome in zip(shards, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"❌ Shard {shard['section']} failed: {outcome}")
+            outcome = []
+        if len(outcome) < shard["num_questions"]:
+            short_sections.append(shard["content"])
+        merged.extend(outcome)
+    if not merged:
+        return []
+    print(f"🧩 Shards returned {len(merged)}/{num_questions} questions")
+
+    # Replacements for duplicates and shortfalls come from the sections that under-delivered when there are any
+    replacement_content, _ = fit_text_to_budget(
+        " ".join(short_sections) or request.content, "gemini-1.5-flash", REPLACEMENT_PROMPT,
+        reserved_output_tokens=quiz_output_tokens("gemini-1.5-flash", QUIZ_SHARD_SIZE, request.settings.question_types)
+    )
+    return await asyncio.to_thread(
+        deduplicate_with_replacements, merged, request, replacement_content, existing, num_questions
+    )
+
+def top_up_questions(questions_data: List[dict], request: QuizGenerationRequest) -> List[dict]:
+    """Fill missing questions from the fallback pool, skipping near-duplicates"""
+    missing = request.settings.question_count - len(questions_data)
+    if missing <= 0:
+        return questions_data
+    
+    candidates = generate_intelligent_fallback(
+        request.content,
+        QuizSettings(
+            question_count=request.settings.question_count + missing,
+            difficulty=request.settings.difficulty,
+            question_types=request.settings.question_types
+        )
+    )
+    extra, _ = filter_near_duplicates(candidates, accepted=questions_data)
+    return questions_data + extra[:missing]
+
 @router.get("/health")
 async def quiz_health():
     return {
         "service": "quiz_generator",
         "ai_available": GEMINI_AVAILABLE,
-        "model": "gemini-1.5-flash" if GEMINI_AVAILABLE else "intelligent_fallback"
+        "model": "gemini-1.5-flash" if GEMINI_AVAILABLE else "intelligent_fallback",
+        "question_bank": question_bank.get_stats(),
+        "short_answer_grading": short_answer_grader.get_stats(),
+        "circuit": gemini_circuit.get_state()
     }
 
 @router.post("/generate-quiz", response_model=QuizGenerationResponse)
@@ -272,64 +571,56 @@ async def generate_quiz(request: QuizGenerationRequest):
         questions_data = []
         ai_powered = False
         
-        if GEMINI_AVAILABLE and model:
+        # Serve what we can from the course question bank and generate only the gap
+        bank_questions = []
+        if request.use_question_bank:
+            bank_questions = question_bank.assemble(request.course_id, request.content, request.settings, request.user_id)
+            if bank_questions:
+                print(f"🏦 Served {len(bank_questions)}/{request.settings.question_count} questions from the question bank")
+                ai_powered = True
+        
+        needed = request.settings.question_count - len(bank_questions)
+        new_questions = []
+        
+        if needed <= 0:
+            questions_data = bank_questions
+        elif GEMINI_AVAILABLE and model and health_prober.is_ready("gemini") and gemini_circuit.allow_request() \
+                and not usage_tracker.over_budget(request.course_id) and has_time_for_llm() and provider_admitted():
             try:
-                # Make up to 3 attempts to get the correct number of questions
-                for attempt in range(3):
-                    print(f"\n🔄 Attempt {attempt + 1} to generate {request.settings.question_count} questions...")
-                    
-                    prompt = GEMINI_PROMPT.format(
-                        content=request.content[:4000],
-                        num_questions=request.settings.question_count,
-                        difficulty=request.settings.difficulty
-                    )
-                    
-                    response = model.generate_content(prompt)
-                    response_text = response.text
-                    
-                    questions = parse_gemini_response(response_text)
-                    
-                    # Validate question count
-                    if len(questions) == request.settings.question_count:
-                        print(f"✅ Successfully generated exactly {len(questions)} questions!")
-                        questions_data = questions
-                        ai_powered = True
-                        break
-                    else:
-                        print(f"⚠️ Got {len(questions)} questions instead of {request.settings.question_count}")
-                        
-                # If we still don't have the right number of questions, use fallback
-                if len(questions_data) != request.settings.question_count:
+                if needed >= QUIZ_SHARD_THRESHOLD:
+                    new_questions = await generate_sharded_questions(request, needed, bank_questions)
+                else:
+                    new_questions = await asyncio.to_thread(generate_gemini_questions, request, needed, bank_questions)
+                
+                # If we still don't have the right number of questions, use fallback (keeping banked ones)
+                if new_questions:
+                    questions_data = bank_questions + new_questions
+                    ai_powered = True
+                else:
                     print("⚠️ Failed to get correct number of questions, using fallback")
-                    questions_data = generate_intelligent_fallback(request.content, request.settings)
+                    questions_data = bank_questions or generate_intelligent_fallback(request.content, request.settings)
                     
             except Exception as gemini_error:
                 print(f"❌ Gemini AI error: {gemini_error}")
-                questions_data = generate_intelligent_fallback(request.content, request.settings)
+                questions_data = bank_questions or generate_intelligent_fallback(request.content, request.settings)
         else:
             print("🔄 Using fallback generation...")
-            questions_data = generate_intelligent_fallback(request.content, request.settings)
+            questions_data = bank_questions or generate_intelligent_fallback(request.content, request.settings)
         
-        # Final validation to ensure exact question count
+        # Final validation: never more than requested. A short quiz is topped up from the fallback pool through the
+        # dedup check; if the content cannot yield enough distinct questions the quiz is returned short rather than
+        # padded with placeholders
         if len(questions_data) > request.settings.question_count:
             questions_data = questions_data[:request.settings.question_count]
         elif len(questions_data) < request.settings.question_count:
-            # Add generic questions to make up the difference
-            while len(questions_data) < request.settings.question_count:
-                questions_data.append({
-                    "question": f"Additional question about the content ({len(questions_data) + 1})?",
-                    "type": "mcq",
-                    "options": [
-                        "Main point from the content",
-                        "Secondary detail",
-                        "Related concept",
-                        "Unrelated information"
-                    ],
-                    "correct_answer": "Main point from the content",
-                    "explanation": "This tests understanding of the main concepts in the content.",
-                    "difficulty": request.settings.difficulty,
-                    "points": 1
-                })
+            questions_data = top_up_questions(questions_data, request)
+            if len(questions_data) < request.settings.question_count:
+                print(f"⚠️ Returning {len(questions_data)}/{request.settings.question_count} questions: "
+                      f"no more distinct questions in the content")
+        
+        if new_questions:
+            await asyncio.to_thread(record_issued_questions, request.course_id, new_questions)
+            question_bank.add_questions(request.course_id, request.content, new_questions)
         
         # Generate unique quiz ID
         quiz_id = f"{'ai' if ai_powered else 'smart'}-quiz-{abs(hash(request.content + str(request.settings.question_count))) % 100000}"
@@ -339,13 +630,146 @@ async def generate_quiz(request: QuizGenerationRequest):
         print(f"📝 Final question count: {len(questions_data)}")
         print(f"🤖 AI Powered: {ai_powered}\n")
         
-        return QuizGenerationResponse(
+        # Validated once here; model_response skips FastAPI validating it a second time
+        return model_response(QuizGenerationResponse(
             quiz_id=quiz_id,
             questions=questions_data,
             status="completed",
             ai_powered=ai_powered
-        )
+        ))
         
     except Exception as e:
         print(f"💥 Error generating quiz: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate quiz: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to generate quiz: {str(e)}")
+
+@router.post("/generate-quiz-from-file", response_model=QuizGenerationResponse)
+async def generate_quiz_from_file(request: Request):
+    """Generate quiz from an uploaded PDF, DOCX or text file (multipart field 'file')"""
+    
+    upload = await stream_multipart_to_disk(request)
+    try:
+        print(f"\n📤 Received upload: {upload.filename} ({upload.size} bytes)")
+        
+        try:
+            extraction = await extract_document(upload.path, upload.filename, upload.content_type)
+        except ValueError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Document extraction timed out")
+        except BrokenProcessPool:
+            # The worker died, most often on the memory cap
+            raise HTTPException(status_code=422, detail="The document could not be processed")
+        
+        if not extraction["text"]:
+            raise HTTPException(status_code=422, detail="No text could be extracted from the document")
+        
+        fields = upload.fields
+        try:
+            settings = QuizSettings(
+                question_count=int(fields.get("question_count", 10)),
+                difficulty=fields.get("difficulty", "medium"),
+                question_types=[t.strip() for t in fields.get("question_types", "mcq").split(",") if t.strip()]
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid quiz settings: {e}")
+        
+        quiz_request = QuizGenerationRequest(
+            content=extraction["text"],
+            settings=settings,
+            course_id=fields.get("course_id", "default"),
+            user_id=fields.get("user_id", "default")
+        )
+        return await generate_quiz(quiz_request)
+        
+    finally:
+        upload.cleanup()
+
+def grade_batch_with_gemini(batch: List[dict], questions: dict, answers: dict, request: ShortAnswerGradingRequest) -> dict:
+    """Grade one batch of low-confidence answers with Gemini; answer key -> {score, feedback}"""
+    prompt, ids = build_grading_prompt(batch, questions, answers)
+    max_output_tokens = 60 * len(ids) + 100
+    try:
+        with admission_controller.provider_call():
+            response = call_with_deadline(model.generate_content, prompt, generation_config={"max_output_tokens": max_output_tokens})
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        gemini_circuit.record_failure()
+        raise
+    gemini_circuit.record_success()
+    prompt_tokens, completion_tokens, estimated = extract_usage(response, prompt, response.text)
+    usage_tracker.record(
+        "short_answer_grading", "gemini-1.5-flash", prompt_tokens, completion_tokens,
+        request.course_id, request.user_id, estimated
+    )
+    return parse_llm_grades(clean_gemini_response(response.text), ids)
+
+async def escalate_low_confidence(results: List[dict], request: ShortAnswerGradingRequest) -> dict:
+    """Regrade the least confident local grades with Gemini in concurrent batches"""
+    candidates = short_answer_grader.escalation_candidates(results)
+    stats = {"escalated": len(candidates), "llm_batches": 0, "llm_graded": 0, "llm_failed_batches": 0}
+    if not candidates:
+        return stats
+
+    questions = {q.question_id: q.model_dump() for q in request.questions}
+    answers = {result["answer_key"]: submission.answer for result, submission in zip(results, request.submissions)}
+    batches = [candidates[i:i + GRADING_LLM_BATCH_SIZE] for i in range(0, len(candidates), GRADING_LLM_BATCH_SIZE)]
+    print(f"\n🎓 Escalating {len(candidates)} low-confidence answers to Gemini in {len(batches)} batches")
+    semaphore = asyncio.Semaphore(GRADING_LLM_CONCURRENCY)
+
+    async def run_batch(batch: List[dict]) -> dict:
+        async with semaphore:
+            # Batches that would start too late keep their local grades
+            if not (gemini_circuit.allow_request() and has_time_for_llm()):
+                return {}
+            return await asyncio.to_thread(grade_batch_with_gemini, batch, questions, answers, request)
+
+    grades = {}
+    for outcome in await asyncio.gather(*(run_batch(batch) for batch in batches), return_exceptions=True):
+        if isinstance(outcome, Exception):
+            print(f"❌ Grading batch failed: {outcome}")
+            stats["llm_failed_batches"] += 1
+            continue
+        stats["llm_batches"] += 1 if outcome else 0
+        grades.update(outcome)
+    short_answer_grader.record_escalations(len(candidates))
+    stats["llm_graded"] = short_answer_grader.apply_llm_grades(
+        results, grades, {q.question_id: q.points for q in request.questions}
+    )
+    return stats
+
+@router.post("/grade-short-answers", response_model=ShortAnswerGradingResponse)
+async def grade_short_answers(request: ShortAnswerGradingRequest):
+    """Grade a batch of short answers locally, sending only low-confidence ones to Gemini"""
+    print(f"\n📝 Grading {len(request.submissions)} short answers for {len(request.questions)} questions")
+    started = time.perf_counter()
+    try:
+        # Scoring a large class is CPU work; keep it off the event loop
+        results = await asyncio.to_thread(
+            short_answer_grader.grade,
+            [q.model_dump() for q in request.questions],
+            [s.model_dump() for s in request.submissions]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    local_ms = (time.perf_counter() - started) * 1000
+
+    escalation = {"escalated": 0, "llm_batches": 0, "llm_graded": 0, "llm_failed_batches": 0}
+    if request.escalate and GEMINI_AVAILABLE and model and health_prober.is_ready("gemini") \
+            and not usage_tracker.over_budget(request.course_id) and provider_admitted():
+        escalation = await escalate_low_confidence(results, request)
+
+    methods = {}
+    for result in results:
+        methods[result["method"]] = methods.get(result["method"], 0) + 1
+    return model_response(ShortAnswerGradingResponse(
+        results=[GradedSubmission(**result) for result in results],
+        stats={
+            "submissions": len(results),
+            "unique_answers": len({r["answer_key"] for r in results}),
+            "methods": methods,
+            **escalation,
+            "local_ms": round(local_ms, 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    ))
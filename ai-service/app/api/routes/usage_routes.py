@@ -0,0 +1,34 @@
+# /ai-service/routes/usage_routes.py
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+from app.services.usage_tracker import usage_tracker, DIMENSIONS
+from app.api.admin_auth import require_admin
+
+router = APIRouter()
+
+class CourseBudgetRequest(BaseModel):
+    budget_usd: float
+
+@router.get("", dependencies=[Depends(require_admin)])
+async def get_usage(dimension: Optional[str] = None):
+    """Token and cost totals by route, course and user"""
+    if dimension and dimension not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"dimension must be one of {', '.join(DIMENSIONS)}")
+    return usage_tracker.get_report(dimension)
+
+@router.get("/courses/{course_id}")
+async def get_course_usage(course_id: str):
+    """Usage totals and budget status for one course"""
+    return {
+        **usage_tracker.get_course_budget_status(course_id),
+        "totals": usage_tracker.get_totals("course", course_id)
+    }
+
+@router.put("/courses/{course_id}/budget", dependencies=[Depends(require_admin)])
+async def set_course_budget(course_id: str, request: CourseBudgetRequest):
+    """Set a course's spend limit per budget window (0 removes the limit)"""
+    if request.budget_usd < 0:
+        raise HTTPException(status_code=400, detail="budget_usd cannot be negative")
+    usage_tracker.set_course_budget(course_id, request.budget_usd)
+    return usage_tracker.get_course_budget_status(course_id)
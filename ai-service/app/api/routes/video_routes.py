@@ -1,12 +1,23 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
 from app.models.video_models import (
-    SummarizationRequest, QARequest, SummaryResponse, QAResponse, TranscriptSegment
+    SummarizationRequest, QARequest, SummaryResponse, QAResponse, TranscriptSegment, IngestRequest, IngestResponse
 )
 from app.services.video_ai_services import VideoAIService
+from app.services.ingestion import IngestionPipeline
+from app.services.video_artifacts import video_artifacts, transcript_digest
+from app.services.transcript_store import transcript_cache, resolve_transcript
+from app.services.study_session import StudySessionManager, STUDY_SESSION_IDLE_SECONDS
+from app.services.context_cache import context_cache
+from app.services.summary_tree import summary_tree
+from app.api.responses import model_response
 
 # Initialize router and service
 router = APIRouter()
 video_ai_service = VideoAIService()
+ingestion_pipeline = IngestionPipeline(video_ai_service)
+study_sessions = StudySessionManager(video_ai_service)
 
 @router.get("/health")
 async def health_check():
@@ -15,14 +26,23 @@ async def health_check():
     return {
         "status": "healthy",
         **status,
-        "endpoints": ["/summarize", "/ask-question", "/test-sample"]
+        "artifacts": video_artifacts.get_stats(),
+        "transcript_cache": transcript_cache.get_stats(),
+        "ingestion": ingestion_pipeline.get_stats(),
+        "study_sessions": study_sessions.get_stats(),
+        "context_cache": context_cache.get_stats(),
+        "summary_tree": summary_tree.get_stats(),
+        "endpoints": ["/summarize", "/ask-question", "/ingest", "/session/{video_id} (WebSocket)", "/test-sample"]
     }
 
 @router.post("/summarize", response_model=SummaryResponse)
 async def summarize_video(request: SummarizationRequest):
     """Generate summary from video transcript"""
+    # A cache miss reads the transcript from Mongo, so it is resolved off the event loop
+    if not await asyncio.to_thread(resolve_transcript, request):
+        raise HTTPException(status_code=404, detail="Transcript not found for this video - send it inline")
     try:
-        return await video_ai_service.summarize_transcript(request)
+        return model_response(await video_ai_service.summarize_transcript(request))
     except Exception as e:
         print(f"💥 Error in summarization endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
@@ -30,12 +50,116 @@ async def summarize_video(request: SummarizationRequest):
 @router.post("/ask-question", response_model=QAResponse)
 async def ask_question(request: QARequest):
     """Answer questions based on video transcript"""
+    if not await asyncio.to_thread(resolve_transcript, request):
+        raise HTTPException(status_code=404, detail="Transcript not found for this video - send it inline")
     try:
-        return await video_ai_service.answer_question(request)
+        return model_response(await video_ai_service.answer_question(request))
     except Exception as e:
         print(f"💥 Error in Q&A endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Question answering failed: {str(e)}")
 
+@router.post("/ingest", response_model=IngestResponse, status_code=202)
+async def ingest_transcript(request: IngestRequest, background_tasks: BackgroundTasks):
+    """Precompute summaries, segment index and starter questions for a new or updated transcript"""
+    # Later by-reference summarize and Q&A calls get this version without reloading it
+    transcript_cache.put(request.video_id, request.transcript)
+    if request.wait:
+        result = await ingestion_pipeline.ingest(request, request.force)
+        # The work is done, so this is a 200 rather than the route's 202 for queued ingestion
+        return model_response(IngestResponse(**result), status_code=200)
+    background_tasks.add_task(ingestion_pipeline.ingest, request, request.force)
+    return IngestResponse(
+        video_id=request.video_id,
+        transcript_digest=transcript_digest(request.transcript),
+        status="queued"
+    )
+
+@router.get("/ingest/{video_id}")
+async def ingestion_status(video_id: str):
+    """What has been precomputed for a video"""
+    artifacts = video_artifacts.get(video_id)
+    if not artifacts:
+        raise HTTPException(status_code=404, detail="Video has not been ingested")
+    return {
+        "video_id": video_id,
+        "status": artifacts.get("status"),
+        "transcript_digest": artifacts.get("transcript_digest"),
+        "summaries": sorted(artifacts.get("summaries", {})),
+        "segments": len(artifacts.get("segment_index", [])),
+        "starter_questions": len(artifacts.get("starter_questions", [])),
+        "errors": artifacts.get("errors", []),
+        "updated_at": artifacts.get("updated_at")
+    }
+
+@router.websocket("/session/{video_id}")
+async def study_session(
+    websocket: WebSocket,
+    video_id: str,
+    course_id: str = "default",
+    user_id: str = "default",
+    transcript_digest: Optional[str] = None
+):
+    """
+    Q&A session on one video. The transcript and its retrieval index are loaded once; then each
+    {"type": "question", "question": "..."} streams back context, answer_delta and answer_done events.
+    """
+    await websocket.accept()
+    if not study_sessions.reserve():
+        study_sessions.stats["rejected_full"] += 1
+        await websocket.send_json({"type": "error", "detail": "Too many study sessions - try again shortly"})
+        await websocket.close(code=1013)
+        return
+
+    try:
+        loaded = await asyncio.to_thread(study_sessions.load, video_id, transcript_digest)
+    except BaseException:
+        study_sessions.release()
+        raise
+    if loaded is None:
+        study_sessions.release()
+        study_sessions.stats["not_found"] += 1
+        await websocket.send_json({"type": "error", "detail": "Transcript not found for this video"})
+        await websocket.close(code=4404)
+        return
+
+    transcript, segment_index = loaded
+    session = study_sessions.open(video_id, course_id, user_id, transcript, segment_index)
+    print(f"📚 Study session {session.id} opened for video {video_id} ({len(session.index)} windows)")
+    try:
+        await websocket.send_json({
+            "type": "ready", "session_id": session.id, "video_id": video_id,
+            "transcript_digest": session.digest, "windows": len(session.index),
+            "idle_timeout_seconds": STUDY_SESSION_IDLE_SECONDS,
+        })
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive_json(), timeout=STUDY_SESSION_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                study_sessions.stats["idle_closed"] += 1
+                await websocket.send_json({"type": "idle_timeout"})
+                await websocket.close(code=1000)
+                return
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON"})
+                continue
+
+            kind = message.get("type") if isinstance(message, dict) else None
+            if kind == "ping":
+                await websocket.send_json({"type": "pong"})
+            elif kind == "close":
+                await websocket.close(code=1000)
+                return
+            elif kind == "question" and str(message.get("question", "")).strip():
+                async for event in study_sessions.answer(session, str(message["question"]).strip()):
+                    await websocket.send_json({**event, "id": message.get("id")})
+            else:
+                await websocket.send_json({"type": "error", "detail": "Expected a question, ping or close message"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        study_sessions.close(session)
+        print(f"📚 Study session {session.id} closed after {session.questions} questions")
+
 @router.post("/test-sample")
 async def test_with_sample():
     """Test endpoint with sample transcript data"""
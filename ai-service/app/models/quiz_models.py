@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 
 class QuestionType(str, Enum):
@@ -35,4 +35,37 @@ class QuizGenerationRequest(BaseModel):
 class QuizGenerationResponse(BaseModel):
     quiz_id: str
     questions: List[QuizQuestion]
-    status: str
\ No newline at end of file
+    status: str
+
+class GradingQuestion(BaseModel):
+    question_id: str
+    question: str
+    correct_answer: str
+    explanation: Optional[str] = None
+    points: float = 1
+
+class ShortAnswerSubmission(BaseModel):
+    submission_id: str
+    question_id: str
+    answer: str
+
+class ShortAnswerGradingRequest(BaseModel):
+    questions: List[GradingQuestion]
+    submissions: List[ShortAnswerSubmission]
+    course_id: str = "default"
+    user_id: str = "default"
+    # Send low-confidence answers to the LLM; False grades everything locally
+    escalate: bool = True
+
+class GradedSubmission(BaseModel):
+    submission_id: str
+    question_id: str
+    score: float
+    points_awarded: float
+    confidence: float
+    method: str
+    feedback: str
+
+class ShortAnswerGradingResponse(BaseModel):
+    results: List[GradedSubmission]
+    stats: Dict[str, Any]
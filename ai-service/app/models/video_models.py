@@ -16,15 +16,22 @@ class VideoTranscript(BaseModel):
 
 class SummarizationRequest(BaseModel):
     video_id: str
-    transcript: List[TranscriptSegment]
+    # Omit transcript to have the service load it by video_id; transcript_digest lets it detect a stale copy
+    transcript: Optional[List[TranscriptSegment]] = None
+    transcript_digest: Optional[str] = None
     summary_type: str = "detailed"  # detailed, brief, key_points
     focus_area: Optional[str] = None
+    course_id: Optional[str] = None
+    user_id: Optional[str] = None
 
 class QARequest(BaseModel):
     video_id: str
-    transcript: List[TranscriptSegment]
+    transcript: Optional[List[TranscriptSegment]] = None
+    transcript_digest: Optional[str] = None
     question: str
     context: Optional[str] = None
+    course_id: Optional[str] = None
+    user_id: Optional[str] = None
 
 class SummaryResponse(BaseModel):
     video_id: str
@@ -42,4 +49,18 @@ class QAResponse(BaseModel):
     relevant_timestamps: List[str]
     confidence: str
     sources: List[str]
-    ai_powered: bool = False
\ No newline at end of file
+    ai_powered: bool = False
+
+class IngestRequest(VideoTranscript):
+    force: bool = False  # recompute even if this transcript version is already ingested
+    wait: bool = False  # run inline and return the result instead of queueing
+
+class IngestResponse(BaseModel):
+    video_id: str
+    transcript_digest: str
+    status: str
+    summaries: List[str] = []
+    segments: int = 0
+    starter_questions: int = 0
+    errors: List[str] = []
+    seconds: Optional[float] = None
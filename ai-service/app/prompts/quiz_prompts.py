@@ -22,4 +22,28 @@ Format your response as a JSON array of questions:
     "points": 1
   }}
 ]
-"""
\ No newline at end of file
+"""
+
+SHORT_ANSWER_GRADING_PROMPT = """
+You are grading students' short answers. GRADE EACH ANSWER against the expected answer for its question.
+
+{questions}
+
+GRADING RULES:
+1. Score each answer from 0.0 (wrong or missing) to 1.0 (fully correct); give partial credit for partly correct answers
+2. Judge the meaning, not the wording; ignore spelling and grammar
+3. An answer that contradicts the expected answer scores 0.0
+4. Feedback is one short sentence addressed to the student
+
+FORMAT YOUR RESPONSE AS A VALID JSON ARRAY with one object per answer id:
+[
+  {{"id": "a1", "score": 0.5, "feedback": "Names the process but not where it happens."}}
+]
+"""
+
+SHORT_ANSWER_GRADING_QUESTION = """QUESTION: {question}
+EXPECTED ANSWER: {correct_answer}
+EXPLANATION: {explanation}
+ANSWERS:
+{answers}
+"""
@@ -1,9 +1,18 @@
-SUMMARIZATION_PROMPTS = {
-    "detailed": """
-You are an expert educational content summarizer. Create a comprehensive summary of this video transcript:
+# Summary and Q&A prompts share one prefix per video: the instructions, then the transcript. The part that
+# changes from call to call (summary requirements, the student's question) comes after it, so repeated calls
+# on a video resend an identical prefix that providers can cache.
+VIDEO_CONTEXT_INSTRUCTIONS = """You are an expert educational assistant working from the transcript of a lecture video.
+Students read your output as study material about the video itself, not about a transcript."""
+
+VIDEO_CONTEXT_PREFIX = VIDEO_CONTEXT_INSTRUCTIONS + """
 
 TRANSCRIPT:
 {transcript}
+"""
+
+SUMMARIZATION_TASKS = {
+    "detailed": """
+TASK: Create a comprehensive summary of this video.
 
 REQUIREMENTS:
 - Create a detailed summary that captures all main concepts
@@ -21,10 +30,7 @@ FORMAT YOUR RESPONSE AS JSON:
 """,
     
     "brief": """
-You are an expert at creating concise educational summaries. Summarize this video transcript briefly:
-
-TRANSCRIPT:
-{transcript}
+TASK: Summarize this video briefly.
 
 REQUIREMENTS:
 - Create a brief, focused summary (2-3 paragraphs max)
@@ -40,10 +46,7 @@ FORMAT YOUR RESPONSE AS JSON:
 """,
     
     "key_points": """
-Extract the most important key points from this video transcript:
-
-TRANSCRIPT:
-{transcript}
+TASK: Extract the most important key points from this video.
 
 REQUIREMENTS:
 - List 5-10 key takeaways
@@ -59,11 +62,8 @@ FORMAT YOUR RESPONSE AS JSON:
 """
 }
 
-QA_PROMPT = """
-You are an expert educational assistant. Answer the student's question based on this video transcript:
-
-TRANSCRIPT:
-{transcript}
+QA_TASK = """
+TASK: Answer the student's question based on this video.
 
 STUDENT QUESTION: {question}
 
@@ -83,4 +83,70 @@ FORMAT YOUR RESPONSE AS JSON:
     "confidence": "high/medium/low",
     "additional_info": "Any extra context or explanations..."
 }}
-"""
\ No newline at end of file
+"""
+
+# Long transcripts are summarized as a tree: notes for each section of the transcript, condensed notes for
+# runs of sections when there are too many to send at once, and every summary type written from the top notes
+SECTION_NOTES_PROMPT = VIDEO_CONTEXT_INSTRUCTIONS + """
+
+TRANSCRIPT SECTION ({start} to {end}):
+{transcript}
+
+TASK: Write study notes for this section of the video. They are combined with the notes for the other sections
+later, so cover only what this section says.
+
+FORMAT YOUR RESPONSE AS JSON:
+{{
+    "summary": "What this section covers, in 3-5 sentences...",
+    "key_points": ["Point 1", "Point 2", ...],
+    "main_topics": ["Topic 1", "Topic 2"]
+}}
+"""
+
+MERGE_NOTES_PROMPT = VIDEO_CONTEXT_INSTRUCTIONS + """
+
+NOTES ON CONSECUTIVE SECTIONS OF THE VIDEO:
+{notes}
+
+TASK: Condense these notes into one set of notes for the whole stretch ({start} to {end}), keeping every
+important concept and example.
+
+FORMAT YOUR RESPONSE AS JSON:
+{{
+    "summary": "What this stretch of the video covers...",
+    "key_points": ["Point 1", "Point 2", ...],
+    "main_topics": ["Topic 1", "Topic 2"]
+}}
+"""
+
+SUMMARY_FROM_NOTES_PREFIX = VIDEO_CONTEXT_INSTRUCTIONS + """
+
+NOTES ON EACH PART OF THE VIDEO, IN PLAYBACK ORDER:
+{notes}
+"""
+
+# Every task is budgeted against the longest one, so a video's inline prefix is the same for summaries
+# and questions alike
+VIDEO_PROMPT_BUDGET_TEMPLATE = VIDEO_CONTEXT_PREFIX + max([*SUMMARIZATION_TASKS.values(), QA_TASK], key=len)
+
+# Study sessions stream plain text so the answer can be shown as it is written
+STUDY_SESSION_PROMPT = """
+You are a study assistant answering a student's questions while they watch a lecture video.
+
+LECTURE EXCERPTS (each starts with its timestamp):
+{excerpts}
+
+EARLIER IN THIS SESSION:
+{history}
+
+SESSION QUESTION: {question}
+
+REQUIREMENTS:
+- Answer directly and clearly from the lecture; if it does not cover the question, say so honestly
+- Follow-up questions may refer back to earlier answers
+- Do NOT mention "the transcript" or "the excerpts"
+- Keep the answer under 200 words
+
+Answer in plain text. On the last line, list the timestamps you relied on, like:
+TIMESTAMPS: 01:20, 03:45
+"""
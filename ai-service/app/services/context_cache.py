@@ -0,0 +1,222 @@
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.services.provider_cassette import CASSETTE_MODE
+from app.utils.shared_state import state_backend
+
+try:
+    # Explicit context caching arrived in google-generativeai 0.7
+    from google.generativeai import caching as genai_caching
+except ImportError:
+    genai_caching = None
+
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+# Cached content is tied to a pinned model version
+CONTEXT_CACHE_MODEL = os.getenv("CONTEXT_CACHE_MODEL", "models/gemini-1.5-flash-002")
+# Storage is billed per token-hour, so caches live briefly and are only extended while a video is in use
+CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", 900))
+# A handle used with less than this left is extended
+CONTEXT_CACHE_RENEW_SECONDS = float(os.getenv("CONTEXT_CACHE_RENEW_SECONDS", 300))
+# Gemini rejects cached content under 32K tokens. Cached tokens bill at a quarter of the input price, so a
+# prefix somewhat under 4x the inline prompt budget costs less per call than sending the budget inline.
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", 32768))
+CONTEXT_CACHE_MAX_TOKENS = int(os.getenv("CONTEXT_CACHE_MAX_TOKENS", 40000))
+CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("CONTEXT_CACHE_MAX_ENTRIES", 200))
+
+
+class GeminiCachingProvider:
+    """Gemini CachedContent calls behind the small interface ContextCache needs"""
+
+    def __init__(self, model_name: str = CONTEXT_CACHE_MODEL):
+        self.model_name = model_name
+
+    def create(self, display_name: str, instructions: str, content: str, ttl_seconds: float):
+        return genai_caching.CachedContent.create(
+            model=self.model_name,
+            display_name=display_name,
+            system_instruction=instructions,
+            contents=[content],
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+
+    def get(self, name: str):
+        return genai_caching.CachedContent.get(name)
+
+    def renew(self, handle, ttl_seconds: float) -> None:
+        handle.update(ttl=datetime.timedelta(seconds=ttl_seconds))
+
+    def model_for(self, handle):
+        import google.generativeai as genai
+        return genai.GenerativeModel.from_cached_content(cached_content=handle)
+
+
+def _default_provider() -> Optional[GeminiCachingProvider]:
+    return GeminiCachingProvider() if genai_caching is not None else None
+
+
+class ContextCache:
+    """
+    Provider-side caches of each video's prompt prefix (instructions + transcript). A video's prefix is
+    registered once; workers share the handle name through the state backend, reuse it for every summary
+    and question, and extend its TTL when it is close to expiring.
+    """
+
+    def __init__(self, provider=None, backend=None):
+        self.provider = provider if provider is not None else _default_provider()
+        self.backend = backend
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.registering = set()
+        self.lock = threading.Lock()
+        self.stats = {
+            "hits": 0, "misses": 0, "registered": 0, "renewed": 0, "attached": 0,
+            "expired": 0, "failures": 0, "too_small": 0,
+        }
+
+    @property
+    def _backend(self):
+        return self.backend or state_backend
+
+    @property
+    def enabled(self) -> bool:
+        # Cassette runs record and replay whole prompts, so they always take the uncached path
+        return CONTEXT_CACHE_ENABLED and self.provider is not None and CASSETTE_MODE == "off"
+
+    def disabled_reason(self) -> Optional[str]:
+        if not CONTEXT_CACHE_ENABLED:
+            return "CONTEXT_CACHE_ENABLED is false"
+        if self.provider is None:
+            return "installed google-generativeai has no context caching (needs 0.7+)"
+        if CASSETTE_MODE != "off":
+            return "provider cassettes are active"
+        return None
+
+    def eligible(self, tokens: int) -> bool:
+        if tokens < CONTEXT_CACHE_MIN_TOKENS:
+            self.stats["too_small"] += 1
+            return False
+        return True
+
+    @staticmethod
+    def _key(video_id: str, digest: str) -> str:
+        return f"context_cache:{video_id}:{digest}"
+
+    def _remember(self, key: str, handle, expires_at: float, tokens: int) -> Dict:
+        entry = {"handle": handle, "model": self.provider.model_for(handle), "expires_at": expires_at, "tokens": tokens}
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            # Dropping a local entry leaves the provider cache to expire on its own TTL
+            while len(self.entries) > CONTEXT_CACHE_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+        self._backend.set(key, {"name": handle.name, "expires_at": expires_at, "tokens": tokens},
+                          ttl=max(expires_at - time.time(), 1))
+        return entry
+
+    def _local(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.time():
+                self.entries.pop(key, None)
+                self.stats["expired"] += 1
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def _attach_shared(self, key: str) -> Optional[Dict]:
+        """Pick up a cache another worker registered"""
+        shared = self._backend.get(key)
+        if not shared or shared.get("expires_at", 0) <= time.time():
+            return None
+        handle = self.provider.get(shared["name"])
+        self.stats["attached"] += 1
+        return self._remember(key, handle, shared["expires_at"], shared.get("tokens", 0))
+
+    def _renew_if_due(self, key: str, entry: Dict) -> None:
+        if entry["expires_at"] - time.time() > CONTEXT_CACHE_RENEW_SECONDS:
+            return
+        try:
+            self.provider.renew(entry["handle"], CONTEXT_CACHE_TTL_SECONDS)
+        except Exception as e:
+            # The handle stays usable until its current expiry
+            self.stats["failures"] += 1
+            print(f"⚠️ Context cache renewal failed for {key}: {e}")
+            return
+        entry["expires_at"] = time.time() + CONTEXT_CACHE_TTL_SECONDS
+        self._backend.set(key, {"name": entry["handle"].name, "expires_at": entry["expires_at"],
+                                "tokens": entry["tokens"]}, ttl=CONTEXT_CACHE_TTL_SECONDS)
+        self.stats["renewed"] += 1
+
+    def register(self, video_id: str, digest: str, instructions: str, content: str, tokens: int) -> Optional[Dict]:
+        """Create the provider cache for a video's prefix unless one is already live"""
+        key = self._key(video_id, digest)
+        with self.lock:
+            if key in self.registering:
+                return None
+            self.registering.add(key)
+        try:
+            entry = self._local(key) or self._attach_shared(key)
+            if entry is not None:
+                return entry
+            started = time.perf_counter()
+            handle = self.provider.create(f"video-{video_id}", instructions, content, CONTEXT_CACHE_TTL_SECONDS)
+            entry = self._remember(key, handle, time.time() + CONTEXT_CACHE_TTL_SECONDS, tokens)
+            self.stats["registered"] += 1
+            print(f"📌 Cached {tokens} prefix tokens for video {video_id} "
+                  f"in {round((time.perf_counter() - started) * 1000)}ms")
+            return entry
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"⚠️ Context cache registration failed for video {video_id}: {e}")
+            return None
+        finally:
+            with self.lock:
+                self.registering.discard(key)
+
+    def cached_model(self, video_id: str, digest: str, instructions: str, content: str, tokens: int):
+        """
+        Model bound to the video's cached prefix, or None to send the prefix inline. A miss registers
+        the cache in the background so the request that found it missing is not held up.
+        """
+        if not self.enabled or not self.eligible(tokens):
+            return None
+        key = self._key(video_id, digest)
+        try:
+            entry = self._local(key) or self._attach_shared(key)
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"⚠️ Context cache lookup failed for video {video_id}: {e}")
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            threading.Thread(
+                target=self.register, args=(video_id, digest, instructions, content, tokens),
+                name="context-cache-register", daemon=True
+            ).start()
+            return None
+        self._renew_if_due(key, entry)
+        self.stats["hits"] += 1
+        return entry["model"]
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            entries = len(self.entries)
+            cached_tokens = sum(entry["tokens"] for entry in self.entries.values())
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "disabled_reason": self.disabled_reason(),
+            "entries": entries,
+            "cached_tokens": cached_tokens,
+            "min_tokens": CONTEXT_CACHE_MIN_TOKENS,
+            "max_tokens": CONTEXT_CACHE_MAX_TOKENS,
+            "ttl_seconds": CONTEXT_CACHE_TTL_SECONDS,
+        }
+
+
+context_cache = ContextCache()
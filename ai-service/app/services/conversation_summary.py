@@ -0,0 +1,177 @@
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.token_budget import estimate_tokens, remove_fillers
+from app.services.usage_tracker import usage_tracker, extract_usage
+from app.utils.admission import admission_controller
+
+# Unsummarized history above this many tokens is folded into the rolling summary
+CONTEXT_TOKEN_THRESHOLD = int(os.getenv("BOBBY_CONTEXT_TOKENS", 600))
+RECENT_MESSAGES_KEPT = int(os.getenv("BOBBY_RECENT_MESSAGES", 4))
+SUMMARY_MAX_TOKENS = int(os.getenv("BOBBY_SUMMARY_TOKENS", 200))
+# extractive (local, synchronous) | llm (extractive now, LLM rewrite in the background)
+SUMMARY_MODE = os.getenv("BOBBY_SUMMARY_MODE", "extractive").lower()
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a student and Bobby, a learning assistant.
+Keep the student's goals, courses, topics discussed, open questions and any facts Bobby gave. Write at most {max_words} words of plain prose.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{messages}
+
+UPDATED SUMMARY:"""
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = set(
+    "a an and are as at be but by can do does for from how i if in is it me my of on or so that the this "
+    "to was what when where which who why will with you your yes no ok okay sure".split()
+)
+
+# The saving is measured against the prompt sent before compaction: the system prompt and the last 10 messages
+PREVIOUS_WINDOW_MESSAGES = 10
+summary_stats = {"compactions": 0, "llm_summaries": 0, "prompt_tokens_baseline": 0, "prompt_tokens_sent": 0}
+_stats_lock = threading.Lock()
+
+
+def _message_tokens(messages: List[dict]) -> int:
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+def _summary_sentences(messages: List[dict]) -> List[str]:
+    """Candidate sentences, prefixed with who said them"""
+    sentences = []
+    for message in messages:
+        speaker = "Student" if message["role"] == "user" else "Bobby"
+        for sentence in _SENTENCE_RE.split(remove_fillers(message["content"]).strip()):
+            if len(_WORD_RE.findall(sentence.lower())) >= 3:
+                sentences.append(f"{speaker}: {sentence.strip()}")
+    return sentences
+
+
+def extractive_summary(previous_summary: str, messages: List[dict], max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    """Fold messages into the summary by keeping the highest-scoring sentences in order"""
+    candidates = [s for s in _SENTENCE_RE.split(previous_summary) if s.strip()] + _summary_sentences(messages)
+    if not candidates:
+        return previous_summary
+
+    # Score sentences by how often their content words recur across the conversation
+    tokenized = [[w for w in _WORD_RE.findall(s.lower()) if w not in _STOPWORDS and len(w) > 2] for s in candidates]
+    frequencies = Counter(word for words in tokenized for word in set(words))
+    scores = []
+    for i, words in enumerate(tokenized):
+        score = sum(frequencies[w] for w in set(words)) / (len(words) ** 0.5 or 1)
+        if candidates[i].startswith("Student:"):
+            # The student's own questions say most about what the session is for
+            score *= 1.5
+        # Slight preference for newer sentences
+        scores.append(score * (1 + 0.5 * i / len(candidates)))
+
+    chosen = set()
+    used = 0
+    for i in sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True):
+        cost = estimate_tokens(candidates[i])
+        if used + cost > max_tokens:
+            continue
+        # Skip sentences that mostly repeat one already kept
+        words = set(tokenized[i])
+        if any(len(words & set(tokenized[j])) > 0.6 * len(words | set(tokenized[j])) for j in chosen):
+            continue
+        chosen.add(i)
+        used += cost
+    return " ".join(candidates[i] for i in sorted(chosen))
+
+
+def llm_summary(client, previous_summary: str, messages: List[dict], model: str = "llama-3.1-8b-instant") -> Optional[str]:
+    """Rewrite the summary with the LLM; None if the call fails"""
+    transcript = "\n".join(
+        f"{'Student' if m['role'] == 'user' else 'Bobby'}: {m['content']}" for m in messages
+    )
+    prompt = SUMMARY_PROMPT.format(
+        max_words=int(SUMMARY_MAX_TOKENS * 0.6),
+        summary=previous_summary or "(none yet)",
+        messages=transcript
+    )
+    try:
+        with admission_controller.provider_call():
+            completion = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=model,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                temperature=0.2,
+            )
+        text = (completion.choices[0].message.content or "").strip()
+        prompt_tokens, completion_tokens, estimated = extract_usage(completion, prompt, text)
+        usage_tracker.record("chat_summary", model, prompt_tokens, completion_tokens, estimated=estimated)
+        return text or None
+    except Exception as e:
+        print(f"⚠️ LLM conversation summary failed: {e}")
+        return None
+
+
+def compact_history(conversation: Dict) -> Tuple[str, List[dict], Optional[Dict]]:
+    """
+    Split a conversation into (summary, recent messages) for the prompt.
+    Returns an update for the conversation document when older turns were folded in, else None.
+    """
+    messages = conversation.get("messages", [])
+    summary = conversation.get("summary", "")
+    summarized_count = min(conversation.get("summarizedCount", 0), len(messages))
+    unsummarized = messages[summarized_count:]
+
+    if _message_tokens(unsummarized) <= CONTEXT_TOKEN_THRESHOLD or len(unsummarized) <= RECENT_MESSAGES_KEPT:
+        return summary, unsummarized, None
+
+    fold = unsummarized[:-RECENT_MESSAGES_KEPT]
+    new_summary = extractive_summary(summary, fold)
+    new_count = summarized_count + len(fold)
+    with _stats_lock:
+        summary_stats["compactions"] += 1
+    print(f"🗜️ Folded {len(fold)} messages into the conversation summary ({estimate_tokens(new_summary)} tokens)")
+    update = {"summary": new_summary, "summarizedCount": new_count, "folded": fold, "previousSummary": summary}
+    return new_summary, unsummarized[-RECENT_MESSAGES_KEPT:], update
+
+
+def build_prompt_messages(system_prompt: str, summary: str, recent: List[dict]) -> List[dict]:
+    """System prompt + rolling summary + the last few turns"""
+    prompt = [{"role": "system", "content": system_prompt}]
+    if summary:
+        prompt.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+    prompt.extend({"role": m["role"], "content": m["content"]} for m in recent)
+    return prompt
+
+
+def record_prompt_savings(conversation: Dict, system_prompt: str, prompt_messages: List[dict]) -> Dict:
+    """Compare the compacted prompt with the previous last-10-messages prompt and log the saving"""
+    window = conversation.get("messages", [])[-PREVIOUS_WINDOW_MESSAGES:]
+    baseline_tokens = _message_tokens([{"content": system_prompt}] + window)
+    sent_tokens = _message_tokens(prompt_messages)
+    with _stats_lock:
+        summary_stats["prompt_tokens_baseline"] += baseline_tokens
+        summary_stats["prompt_tokens_sent"] += sent_tokens
+    # Negative when the summary costs more than the turns it replaced
+    saved = 100 * (1 - sent_tokens / baseline_tokens) if baseline_tokens else 0
+    print(f"📉 Bobby prompt: {sent_tokens} tokens sent vs {baseline_tokens} for the last "
+          f"{PREVIOUS_WINDOW_MESSAGES} messages ({saved:.0f}% saved)")
+    return {"baseline_tokens": baseline_tokens, "sent_tokens": sent_tokens}
+
+
+def get_summary_stats() -> Dict:
+    with _stats_lock:
+        baseline = summary_stats["prompt_tokens_baseline"]
+        return {
+            **summary_stats,
+            "mode": SUMMARY_MODE,
+            "token_threshold": CONTEXT_TOKEN_THRESHOLD,
+            "prompt_tokens_saved_pct": round(100 * (1 - summary_stats["prompt_tokens_sent"] / baseline), 1) if baseline else 0.0,
+        }
+
+
+def record_llm_summary() -> None:
+    with _stats_lock:
+        summary_stats["llm_summaries"] += 1
@@ -0,0 +1,236 @@
+import asyncio
+import multiprocessing
+import os
+import re
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = int(os.getenv("EXTRACTION_PAGES_PER_TASK", "8"))
+PAGE_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_PAGE_TIMEOUT", "5"))
+WORKER_MEMORY_LIMIT_MB = int(os.getenv("EXTRACTION_WORKER_MEMORY_MB", "512"))
+MAX_EXTRACTED_CHARACTERS = int(os.getenv("MAX_EXTRACTED_CHARACTERS", "2000000"))
+
+# A stuck worker gets this long past its pages' timeouts before the pool is replaced
+HUNG_BATCH_GRACE_SECONDS = 10
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+# (event loop, semaphore): one slot per worker, so a batch's timeout starts when a worker picks it up
+_extraction_slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+
+def _limit_worker_memory(limit_mb: int) -> None:
+    """Cap the address space of an extraction worker (Unix only)"""
+    try:
+        import resource
+        limit_bytes = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"⚠️ Could not limit extraction worker memory: {e}")
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Get the shared extraction process pool, creating it on first use"""
+    global _extraction_pool
+    if _extraction_pool is None:
+        # spawn avoids forking the server's provider client threads into workers
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_limit_worker_memory,
+            initargs=(WORKER_MEMORY_LIMIT_MB,),
+        )
+        print(f"✅ Document extraction pool started with {EXTRACTION_WORKERS} workers")
+    return _extraction_pool
+
+
+def shutdown_extraction_pool(kill: bool = False) -> None:
+    """Stop the extraction pool; kill=True also terminates workers stuck in a task"""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        if kill:
+            for process in list((getattr(_extraction_pool, "_processes", None) or {}).values()):
+                process.terminate()
+        _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _extraction_pool = None
+
+
+def _extraction_slots_for_loop() -> asyncio.Semaphore:
+    global _extraction_slots
+    loop = asyncio.get_running_loop()
+    if _extraction_slots is None or _extraction_slots[0] is not loop:
+        _extraction_slots = (loop, asyncio.Semaphore(EXTRACTION_WORKERS))
+    return _extraction_slots[1]
+
+
+async def _run_in_pool(timeout: float, fn, *args):
+    """
+    Run fn in the extraction pool once a worker is free, so time spent queued does not count against
+    the timeout; a task still running past it has hung its worker, and the pool is replaced
+    """
+    async with _extraction_slots_for_loop():
+        loop = asyncio.get_running_loop()
+        pool = get_extraction_pool()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(pool, fn, *args), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Extraction worker hung in {fn.__name__} - restarting the pool")
+            if _extraction_pool is pool:
+                shutdown_extraction_pool(kill=True)
+            raise
+        except BrokenProcessPool:
+            # Other tasks on a killed pool land here too; leave any replacement pool alone
+            if _extraction_pool is pool:
+                shutdown_extraction_pool()
+            raise
+
+
+# Worker functions - these run in the pool and must stay importable at module level
+
+def _count_pdf_pages(path: str) -> int:
+    """Count pages in a PDF without extracting text"""
+    from PyPDF2 import PdfReader
+    return len(PdfReader(path).pages)
+
+
+class _PageTimeout(Exception):
+    pass
+
+
+def _raise_page_timeout(signum, frame):
+    raise _PageTimeout()
+
+
+def _extract_pdf_pages(path: str, start: int, end: int, page_timeout: float) -> List[Tuple[int, Optional[str]]]:
+    """Extract text from a range of PDF pages; a page over page_timeout seconds comes back as None"""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    pages = []
+    # Tasks run on the worker's main thread, so SIGALRM can interrupt a slow page (Unix only)
+    use_alarm = hasattr(signal, "setitimer") and page_timeout > 0
+    previous_handler = signal.signal(signal.SIGALRM, _raise_page_timeout) if use_alarm else None
+    try:
+        for page_number in range(start, end):
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                text = reader.pages[page_number].extract_text() or ""
+            except _PageTimeout:
+                print(f"⚠️ PDF page {page_number + 1} timed out after {page_timeout}s")
+                text = None
+            except Exception as e:
+                print(f"⚠️ Failed to extract PDF page {page_number + 1}: {e}")
+                text = ""
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            pages.append((page_number, text))
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous_handler)
+    return pages
+
+
+def _extract_docx(path: str) -> str:
+    """Extract paragraph and table text from a DOCX file"""
+    import docx
+    document = docx.Document(path)
+    parts = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+            if cells:
+                parts.append(" | ".join(cells))
+    return "\n".join(parts)
+
+
+def _read_text_file(path: str, max_characters: int) -> str:
+    """Read a plain text file in chunks up to a character cap"""
+    parts = []
+    total = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while total < max_characters:
+            chunk = f.read(64 * 1024)
+            if not chunk:
+                break
+            parts.append(chunk)
+            total += len(chunk)
+    return "".join(parts)[:max_characters]
+
+
+def normalize_extracted_text(text: str) -> str:
+    """Normalize extracted text for quiz generation"""
+    text = text.replace("\x00", "")
+    # Join words hyphenated across line breaks
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def detect_document_format(path: str, filename: Optional[str], content_type: Optional[str]) -> str:
+    """Detect pdf, docx or text from magic bytes, content type and extension"""
+    with open(path, "rb") as f:
+        header = f.read(8)
+
+    if header.startswith(b"%PDF"):
+        return "pdf"
+    extension = os.path.splitext(filename or "")[1].lower()
+    if header.startswith(b"PK\x03\x04") and (extension == ".docx" or "wordprocessingml" in (content_type or "")):
+        return "docx"
+    if extension in (".txt", ".md", ".text") or (content_type or "").startswith("text/"):
+        return "text"
+    raise ValueError(f"Unsupported document type: {filename or content_type or 'unknown'}")
+
+
+async def _extract_pdf(path: str) -> Dict:
+    """Extract PDF pages in parallel batches across the process pool"""
+    page_count = await _run_in_pool(PAGE_TIMEOUT_SECONDS * 2, _count_pdf_pages, path)
+    batches = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+
+    async def run_batch(start: int, end: int) -> List[Tuple[int, Optional[str]]]:
+        # Each page is timed inside the worker; this only catches a worker that stopped responding
+        try:
+            return await _run_in_pool(
+                PAGE_TIMEOUT_SECONDS * (end - start) + HUNG_BATCH_GRACE_SECONDS,
+                _extract_pdf_pages, path, start, end, PAGE_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            # Hung or crashed (e.g. over the memory cap) batches are skipped, not fatal
+            print(f"⚠️ PDF pages {start + 1}-{end} failed: {type(e).__name__}")
+            return [(page_number, None) for page_number in range(start, end)]
+
+    results = await asyncio.gather(*(run_batch(start, end) for start, end in batches))
+
+    pages = sorted(page for batch in results for page in batch)
+    failed_pages = [page_number + 1 for page_number, text in pages if text is None]
+    text = "\n\n".join(text for _, text in pages if text)
+
+    return {"text": text, "pages": page_count, "failed_pages": failed_pages}
+
+
+async def extract_document(path: str, filename: Optional[str] = None, content_type: Optional[str] = None) -> Dict:
+    """Extract normalized text from a PDF, DOCX or plain text file on disk"""
+    start_time = time.perf_counter()
+    document_format = detect_document_format(path, filename, content_type)
+
+    if document_format == "pdf":
+        result = await _extract_pdf(path)
+    elif document_format == "docx":
+        text = await _run_in_pool(PAGE_TIMEOUT_SECONDS * 10, _extract_docx, path)
+        result = {"text": text, "pages": None, "failed_pages": []}
+    else:
+        text = await asyncio.to_thread(_read_text_file, path, MAX_EXTRACTED_CHARACTERS)
+        result = {"text": text, "pages": None, "failed_pages": []}
+
+    result["text"] = normalize_extracted_text(result["text"])[:MAX_EXTRACTED_CHARACTERS]
+    result["format"] = document_format
+    result["characters"] = len(result["text"])
+    result["extraction_seconds"] = round(time.perf_counter() - start_time, 3)
+
+    print(f"📄 Extracted {result['characters']} characters from {document_format.upper()} "
+          f"({result['pages'] or '-'} pages, {len(result['failed_pages'])} failed) in {result['extraction_seconds']}s")
+    return result
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from app.utils.deadline import deadline_expired
+
+PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL", 15))
+PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT", 3))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", 2000))
+
+# Short timeouts so an unreachable Mongo fails in seconds rather than the 30s default
+MONGO_CLIENT_OPTIONS = {
+    "serverSelectionTimeoutMS": MONGO_TIMEOUT_MS,
+    "connectTimeoutMS": MONGO_TIMEOUT_MS,
+    "socketTimeoutMS": MONGO_TIMEOUT_MS * 5,
+}
+
+
+class DependencyState:
+    """Latest probe outcome for one dependency"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.healthy: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.consecutive_failures = 0
+        self.source = "probe"
+
+    def to_dict(self) -> Dict:
+        return {
+            "healthy": self.healthy,
+            "age_seconds": round(time.time() - self.checked_at, 1) if self.checked_at else None,
+            "latency_ms": self.latency_ms,
+            "error": self.error,
+            "consecutive_failures": self.consecutive_failures,
+            "source": self.source,
+        }
+
+
+class HealthProber:
+    """Checks each dependency on an interval and keeps readiness state that route handlers consult"""
+
+    def __init__(self, interval: float = PROBE_INTERVAL_SECONDS, timeout: float = PROBE_TIMEOUT_SECONDS):
+        self.interval = interval
+        self.timeout = timeout
+        self.checks: Dict[str, Callable[[], None]] = {}
+        self.states: Dict[str, DependencyState] = {}
+        self.lock = threading.Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, check: Callable[[], None]) -> None:
+        """Register a blocking check that raises when the dependency is unusable"""
+        self.checks[name] = check
+        self.states.setdefault(name, DependencyState(name))
+
+    def is_ready(self, name: str) -> bool:
+        """Last known readiness; dependencies not probed yet are assumed ready"""
+        state = self.states.get(name)
+        return state is None or state.healthy is not False
+
+    def mark_failure(self, name: str, error: Exception) -> None:
+        """Let a request that just hit a failure mark the dependency down until the next probe"""
+        state = self.states.get(name)
+        if state is None or deadline_expired():
+            # A request that ran out of its own time budget is no evidence the dependency is down
+            return
+        with self.lock:
+            if state.healthy is not False:
+                print(f"🩺 {name} marked unavailable after request failure: {error}")
+            state.healthy = False
+            state.error = str(error)[:200]
+            state.checked_at = time.time()
+            state.consecutive_failures += 1
+            state.source = "request"
+
+    async def probe(self, name: str) -> DependencyState:
+        state = self.states[name]
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self.checks[name]), self.timeout)
+            healthy, error = True, None
+        except asyncio.TimeoutError:
+            healthy, error = False, f"probe timed out after {self.timeout}s"
+        except Exception as e:
+            healthy, error = False, str(e)[:200]
+        with self.lock:
+            if healthy != state.healthy:
+                print(f"🩺 {name} is now {'available' if healthy else 'unavailable'}" + (f": {error}" if error else ""))
+            state.healthy = healthy
+            state.error = error
+            state.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            state.checked_at = time.time()
+            state.consecutive_failures = 0 if healthy else state.consecutive_failures + 1
+            state.source = "probe"
+        return state
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self.probe(name) for name in self.checks))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe_all()
+            except Exception as e:
+                print(f"⚠️ Health probe round failed: {e}")
+
+    async def start(self) -> None:
+        """Probe once so readiness is known before traffic arrives, then keep probing"""
+        await self.probe_all()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def get_report(self) -> Dict:
+        with self.lock:
+            return {name: state.to_dict() for name, state in self.states.items()}
+
+
+def mongo_check(client) -> Callable[[], None]:
+    return lambda: client.admin.command("ping")
+
+
+def groq_check(client) -> Callable[[], None]:
+    """List models, which costs no tokens; cassette and fake clients get a synthetic check"""
+    def check():
+        if client is None:
+            raise RuntimeError("Groq client not configured")
+        if hasattr(client, "models"):
+            client.models.list(timeout=PROBE_TIMEOUT_SECONDS)
+    return check
+
+
+def gemini_check(model) -> Callable[[], None]:
+    """Fetch model metadata, which costs no tokens; cassette and fake models get a synthetic check"""
+    def check():
+        if model is None:
+            raise RuntimeError("Gemini model not configured")
+        import google.generativeai as genai
+        if isinstance(model, genai.GenerativeModel):
+            genai.get_model(model.model_name)
+    return check
+
+
+health_prober = HealthProber()
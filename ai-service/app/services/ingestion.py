@@ -0,0 +1,277 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+from app.models.video_models import VideoTranscript, TranscriptSegment, SummarizationRequest
+from app.services.video_artifacts import video_artifacts, transcript_digest, build_segment_index
+from app.services.summary_tree import SUMMARY_TREE_MIN_TOKENS
+from app.utils.token_budget import estimate_tokens
+from app.services.question_bank import question_bank
+from app.services.usage_tracker import usage_tracker
+from app.services.health_prober import health_prober
+
+# Provider calls in flight at once across every video being ingested
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 4))
+STARTER_QUESTION_COUNT = int(os.getenv("STARTER_QUESTION_COUNT", 10))
+SUMMARY_TYPES = ("detailed", "brief", "key_points")
+INGEST_USER_ID = "ingestion"
+
+
+def transcript_from_document(document: Dict) -> VideoTranscript:
+    """VideoTranscript from a document in the Node server's videotranscripts collection"""
+    return VideoTranscript(
+        video_id=document["videoId"],
+        course_id=document["courseId"],
+        title=document["title"],
+        transcript=[
+            TranscriptSegment(timestamp=segment.get("timestamp"), text=segment["text"])
+            for segment in document.get("transcript", [])
+        ],
+        duration=document.get("duration"),
+    )
+
+
+def quiz_content(transcript: VideoTranscript) -> str:
+    return " ".join(segment.text.strip() for segment in transcript.transcript)
+
+
+class IngestionPipeline:
+    """Precomputes summaries, the segment index and starter questions when a transcript is created or changed"""
+
+    def __init__(self, video_service, concurrency: int = INGEST_CONCURRENCY):
+        self.video_service = video_service
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = set()
+        self.stats = {"ingested": 0, "partial": 0, "skipped": 0, "failed": 0}
+
+    async def _limited(self, fn, *args):
+        """Run a blocking provider call in a thread once a concurrency slot is free"""
+        async with self.semaphore:
+            return await asyncio.to_thread(fn, *args)
+
+    def build_starter_questions(self, transcript: VideoTranscript) -> Dict:
+        """Generate a starter quiz and bank it so the first quiz request for the video is served from the bank"""
+        # Imported here: the quiz generator lives in its route module
+        from app.api.routes import quiz_routes
+
+        content = quiz_content(transcript)
+        settings = quiz_routes.QuizSettings(question_count=STARTER_QUESTION_COUNT)
+        request = quiz_routes.QuizGenerationRequest(
+            content=content, settings=settings, course_id=transcript.course_id, user_id=INGEST_USER_ID
+        )
+        if quiz_routes.GEMINI_AVAILABLE and quiz_routes.model and health_prober.is_ready("gemini") \
+                and quiz_routes.gemini_circuit.allow_request() and not usage_tracker.over_budget(transcript.course_id):
+            questions = quiz_routes.generate_gemini_questions(request, STARTER_QUESTION_COUNT, [])
+            if questions:
+                question_bank.add_questions(transcript.course_id, content, questions)
+                return {"questions": questions, "ai_powered": True}
+        # Fallback questions are cheap to make on demand, so they are not stored
+        return {"questions": [], "ai_powered": False}
+
+    async def ingest(self, transcript: VideoTranscript, force: bool = False) -> Dict:
+        """Precompute every artifact for a transcript unless this version is already complete"""
+        digest = transcript_digest(transcript.transcript)
+        result = {"video_id": transcript.video_id, "transcript_digest": digest}
+        if transcript.video_id in self.in_flight:
+            return {**result, "status": "in_progress"}
+
+        # Claimed before the first await so a concurrent ingest of the same video sees it in flight
+        self.in_flight.add(transcript.video_id)
+        try:
+            # Artifact reads and writes are Mongo round trips, so they run off the event loop
+            existing = await asyncio.to_thread(video_artifacts.get, transcript.video_id)
+            if not force and existing and existing.get("transcript_digest") == digest and existing.get("status") == "complete":
+                self.stats["skipped"] += 1
+                return {**result, "status": "skipped"}
+
+            started = time.perf_counter()
+            print(f"\n🏭 Ingesting video {transcript.video_id} ({len(transcript.transcript)} segments)")
+            # Register the provider-side prefix cache first so the summaries below already read from it
+            await asyncio.to_thread(
+                self.video_service.register_context, transcript.video_id, digest, transcript.transcript
+            )
+            summary_request = SummarizationRequest(
+                video_id=transcript.video_id, transcript=transcript.transcript,
+                course_id=transcript.course_id, user_id=INGEST_USER_ID
+            )
+            use_tree = sum(estimate_tokens(segment.text) for segment in transcript.transcript) >= SUMMARY_TREE_MIN_TOKENS
+            tree = None
+            if use_tree:
+                # Long transcripts are summarized from per-chunk notes, and the previous version's notes are
+                # reused for every chunk the edit left alone
+                summary_jobs = [self.video_service.build_summaries_incremental(
+                    summary_request, SUMMARY_TYPES, (existing or {}).get("summary_tree", {}).get("nodes"),
+                    self._limited
+                )]
+            else:
+                summary_jobs = [
+                    self._limited(self.video_service.build_summary, summary_request.model_copy(update={"summary_type": summary_type}))
+                    for summary_type in SUMMARY_TYPES
+                ]
+            outcomes = await asyncio.gather(
+                *summary_jobs, self._limited(self.build_starter_questions, transcript), return_exceptions=True
+            )
+            segment_index = build_segment_index(transcript.transcript)
+
+            # Only AI output is stored; fallbacks would otherwise be served after the provider recovers
+            summaries, errors = {}, []
+            if use_tree:
+                if isinstance(outcomes[0], Exception):
+                    errors.append(f"summary tree: {outcomes[0]}")
+                else:
+                    tree = outcomes[0]
+                    summaries = {summary_type: summary.model_dump() for summary_type, summary in (tree["summaries"] or {}).items()}
+                    errors.extend(tree["report"]["errors"])
+            else:
+                for summary_type, outcome in zip(SUMMARY_TYPES, outcomes[:-1]):
+                    if isinstance(outcome, Exception):
+                        errors.append(f"{summary_type}: {outcome}")
+                    elif outcome.ai_powered:
+                        summaries[summary_type] = outcome.model_dump()
+            starter = outcomes[-1]
+            if isinstance(starter, Exception):
+                errors.append(f"starter_questions: {starter}")
+                starter = {"questions": [], "ai_powered": False}
+
+            complete = len(summaries) == len(SUMMARY_TYPES) and starter["ai_powered"]
+            document = {
+                "video_id": transcript.video_id,
+                "course_id": transcript.course_id,
+                "title": transcript.title,
+                "transcript_digest": digest,
+                "status": "complete" if complete else "partial",
+                "summaries": summaries,
+                "segment_index": segment_index,
+                "starter_questions": starter["questions"],
+                "errors": errors,
+            }
+            if tree is not None:
+                # Only this version's nodes are kept, so the document does not grow with every edit
+                document["summary_tree"] = {"root": tree["root"], "nodes": tree["nodes"]}
+            # Keep what an earlier run produced for this version when a retry only partly succeeds
+            if existing and existing.get("transcript_digest") == digest:
+                document["summaries"] = {**existing.get("summaries", {}), **summaries}
+                document["starter_questions"] = starter["questions"] or existing.get("starter_questions", [])
+                if len(document["summaries"]) == len(SUMMARY_TYPES) and document["starter_questions"]:
+                    document["status"] = "complete"
+            await asyncio.to_thread(video_artifacts.save, document)
+
+            self.stats["ingested" if document["status"] == "complete" else "partial"] += 1
+            seconds = round(time.perf_counter() - started, 2)
+            print(f"🏭 Video {transcript.video_id} ingested ({document['status']}) in {seconds}s")
+            return {
+                **result,
+                "status": document["status"],
+                "summaries": sorted(document["summaries"]),
+                "segments": len(segment_index),
+                "starter_questions": len(document["starter_questions"]),
+                "errors": errors,
+                "seconds": seconds,
+            }
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"❌ Ingestion failed for video {transcript.video_id}: {e}")
+            return {**result, "status": "failed", "errors": [str(e)]}
+        finally:
+            self.in_flight.discard(transcript.video_id)
+
+    async def backfill(
+        self,
+        collection,
+        checkpoint_path: str,
+        course_id: Optional[str] = None,
+        force: bool = False,
+        limit: Optional[int] = None
+    ) -> Dict:
+        """
+        Ingest every stored transcript in _id order, checkpointing after each batch so an
+        interrupted run resumes where it stopped; videos that failed are retried first.
+        """
+        checkpoint = load_checkpoint(checkpoint_path)
+        retry_ids = checkpoint["failed_ids"]
+        # Ids leave the retry list only once retried, so a run stopped partway keeps the rest for the next one
+        pending_retries = list(retry_ids)
+        failures = []
+        processed = 0
+        finished = True
+
+        for batch in _batches(iter_transcripts(collection, checkpoint["last_id"], course_id, retry_ids), self.concurrency):
+            if limit is not None and processed >= limit:
+                finished = False
+                break
+            batch = batch[:limit - processed] if limit is not None else batch
+            results = await asyncio.gather(*(self._ingest_document(document, force) for document in batch))
+            for document, outcome in zip(batch, results):
+                checkpoint["counts"][outcome["status"]] = checkpoint["counts"].get(outcome["status"], 0) + 1
+                if outcome["status"] in ("failed", "partial"):
+                    failures.append(str(document["_id"]))
+            batch_ids = {str(document["_id"]) for document in batch}
+            pending_retries = [i for i in pending_retries if i not in batch_ids]
+            # Retried ids sit before last_id, so only new documents move the checkpoint forward
+            new_ids = [i for i in batch_ids if i not in retry_ids]
+            if new_ids:
+                checkpoint["last_id"] = max([checkpoint["last_id"] or ""] + new_ids)
+            processed += len(batch)
+            checkpoint["failed_ids"] = pending_retries + failures
+            save_checkpoint(checkpoint_path, checkpoint)
+            print(f"📍 Backfill checkpoint: {processed} videos this run, {json.dumps(checkpoint['counts'])}")
+
+        # A complete unfiltered run found every retry id it could; the ones left were deleted
+        if finished and not course_id and pending_retries:
+            checkpoint["failed_ids"] = failures
+            save_checkpoint(checkpoint_path, checkpoint)
+        return {**checkpoint, "processed": processed}
+
+    async def _ingest_document(self, document: Dict, force: bool) -> Dict:
+        try:
+            transcript = transcript_from_document(document)
+        except (KeyError, ValueError) as e:
+            print(f"⚠️ Skipping malformed transcript {document.get('_id')}: {e}")
+            return {"status": "failed", "errors": [str(e)]}
+        return await self.ingest(transcript, force)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "in_flight": len(self.in_flight), "concurrency": self.concurrency}
+
+
+def iter_transcripts(collection, after_id: Optional[str], course_id: Optional[str], retry_ids: List[str]) -> Iterator[Dict]:
+    """Previously failed transcripts, then the rest of the collection after the checkpoint"""
+    from bson import ObjectId
+
+    query = {"courseId": course_id} if course_id else {}
+    if retry_ids:
+        yield from collection.find({**query, "_id": {"$in": [ObjectId(i) for i in retry_ids]}}).sort("_id", 1)
+    if after_id:
+        query["_id"] = {"$gt": ObjectId(after_id)}
+    yield from collection.find(query).sort("_id", 1)
+
+
+def _batches(documents: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_checkpoint(path: str) -> Dict:
+    if os.path.exists(path):
+        with open(path) as f:
+            checkpoint = json.load(f)
+        print(f"📍 Resuming backfill after {checkpoint.get('last_id')} ({len(checkpoint.get('failed_ids', []))} to retry)")
+        return {"last_id": None, "failed_ids": [], "counts": {}, **checkpoint}
+    return {"last_id": None, "failed_ids": [], "counts": {}}
+
+
+def save_checkpoint(path: str, checkpoint: Dict) -> None:
+    # Write then rename so a crash mid-write never leaves a truncated checkpoint
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, path)
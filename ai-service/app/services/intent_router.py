@@ -0,0 +1,275 @@
+import hashlib
+import os
+import random
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INTENT_ROUTER_ENABLED = os.getenv("BOBBY_INTENT_ROUTER_ENABLED", "true").lower() == "true"
+# Least model probability for answering from a template; refusing a real question costs more than a Groq call
+INTENT_ROUTER_THRESHOLD = float(os.getenv("BOBBY_INTENT_THRESHOLD", 0.6))
+INTENT_ROUTER_REFUSAL_THRESHOLD = float(os.getenv("BOBBY_INTENT_REFUSAL_THRESHOLD", 0.75))
+# Longer messages almost always carry a real question, whatever else they contain
+INTENT_ROUTER_MAX_WORDS = int(os.getenv("BOBBY_INTENT_MAX_WORDS", 16))
+VECTOR_DIMENSIONS = 2048
+TRAINING_EPOCHS = 500
+LEARNING_RATE = 10.0
+L2_PENALTY = 1e-4
+
+LLM_INTENT = "llm"
+OFF_TOPIC_REFUSAL = "I'm sorry, I can not help with this question."
+
+TEMPLATES = {
+    "greeting": [
+        "Hi there! 👋 I'm Bobby, your SkillNest learning assistant. What are you studying today?",
+        "Hello! 😊 I'm Bobby. Ask me about your courses, a tricky topic or how to prepare for a quiz.",
+    ],
+    "thanks": [
+        "You're welcome! 😊 Anything else I can help you with?",
+        "Happy to help! 🎓 Let me know if another question comes up.",
+    ],
+    "goodbye": [
+        "Goodbye and happy learning! 📚 Come back any time you have a question.",
+    ],
+    "bot_identity": [
+        "I'm Bobby 🤖, SkillNest's learning assistant. I can explain course topics, help you prepare for quizzes, "
+        "suggest study strategies and answer questions about using the platform.",
+    ],
+    "faq_enroll": [
+        "To enroll 📚, sign in, open the course from the course list and click **Enroll Now**. Once you're "
+        "enrolled the button changes to **Go to Course**, and the course shows up under **My Enrollments**.",
+    ],
+    "faq_progress": [
+        "Your courses and progress are under **My Enrollments** 📈 in the top menu. Each course shows how many "
+        "lectures you've completed; open one to continue where you left off.",
+    ],
+    "faq_educator": [
+        "To teach on SkillNest 👩‍🏫, click **Become Educator** in the top menu. You'll then have an **Educator "
+        "Dashboard** where you can add courses and see your enrolled students.",
+    ],
+    "faq_account": [
+        "You sign in or create an account 🔐 with the **Create Account** button in the top menu. Your profile, "
+        "email and password are managed from the account menu under your avatar once you're signed in.",
+    ],
+    "off_topic": [OFF_TOPIC_REFUSAL],
+}
+
+# Whole-message patterns that are unambiguous on their own, checked before the model
+_PATTERNS = {
+    "greeting": r"(hi+|hello+|hey+|hiya|howdy|yo|good (morning|afternoon|evening)|greetings)( there)?( bobby)?",
+    "thanks": r"(thanks|thank you|thx|ty|thanks a lot|thank you so much|much appreciated|appreciate it|cheers)( bobby)?",
+    "goodbye": r"(bye+|goodbye|see you|see ya|good ?night|cya|talk later)( bobby)?",
+}
+_MATCHER = re.compile("|".join(f"(?P<{intent}>{pattern})" for intent, pattern in _PATTERNS.items()))
+# Platform FAQ templates need a word that ties the message to SkillNest itself: "how do i create an account in
+# django" or "how do i log in to mysql" are course questions that only share the FAQ's wording
+_FAQ_ANCHOR_RE = re.compile(
+    r"\b(enrol\w*|skillnest|course\w*|class(es)?|lectures?|educators?|instructors?|teach\w*|password|profile|"
+    r"progress|dashboard|platform|my account|this site)\b"
+)
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Labelled examples the linear model is trained on at startup. Everything a template cannot answer is "llm",
+# including greetings and thanks that carry a question.
+TRAINING_EXAMPLES: List[Tuple[str, str]] = [
+    ("hi", "greeting"), ("hello there", "greeting"), ("hey bobby", "greeting"), ("good morning", "greeting"),
+    ("hi bobby how are you", "greeting"), ("hello, how's it going?", "greeting"), ("hey there!", "greeting"),
+    ("good evening bobby", "greeting"), ("hi :)", "greeting"), ("hello bobby nice to meet you", "greeting"),
+    ("hey, what's up", "greeting"), ("yo bobby", "greeting"), ("hiii", "greeting"), ("greetings", "greeting"),
+    ("thanks", "thanks"), ("thank you so much", "thanks"), ("thanks bobby that helped", "thanks"),
+    ("great, thanks!", "thanks"), ("that was helpful thank you", "thanks"), ("ok thanks", "thanks"),
+    ("awesome thank you", "thanks"), ("perfect, thanks a lot", "thanks"), ("thx", "thanks"),
+    ("much appreciated", "thanks"), ("cool thanks for the help", "thanks"), ("thank you, that makes sense", "thanks"),
+    ("bye", "goodbye"), ("goodbye bobby", "goodbye"), ("see you later", "goodbye"), ("gotta go, bye", "goodbye"),
+    ("talk to you tomorrow", "goodbye"), ("good night", "goodbye"), ("that's all for today, bye", "goodbye"),
+    ("i'm done for now, see ya", "goodbye"),
+    ("who are you", "bot_identity"), ("what can you do", "bot_identity"), ("what are you", "bot_identity"),
+    ("are you a bot", "bot_identity"), ("what is bobby", "bot_identity"), ("how can you help me", "bot_identity"),
+    ("what can i ask you", "bot_identity"), ("are you an ai", "bot_identity"), ("what do you do", "bot_identity"),
+    ("who made you", "bot_identity"), ("what are your features", "bot_identity"),
+    ("how do i enroll in a course", "faq_enroll"), ("how can i join a course", "faq_enroll"),
+    ("how to enroll", "faq_enroll"), ("how do i sign up for this course", "faq_enroll"),
+    ("where is the enroll button", "faq_enroll"), ("i want to enroll in a course how", "faq_enroll"),
+    ("how do i buy a course", "faq_enroll"), ("how can i register for a class", "faq_enroll"),
+    ("how do i start a course", "faq_enroll"), ("can't find how to enroll", "faq_enroll"),
+    ("where are my courses", "faq_progress"), ("how do i see my progress", "faq_progress"),
+    ("where can i find my enrolled courses", "faq_progress"), ("how to continue my course", "faq_progress"),
+    ("where do i check my course progress", "faq_progress"), ("how do i find courses i bought", "faq_progress"),
+    ("where is my enrollments page", "faq_progress"), ("how do i track my progress", "faq_progress"),
+    ("how do i resume where i left off", "faq_progress"), ("where did my course go", "faq_progress"),
+    ("which lectures have i completed", "faq_progress"), ("how do i open a course i already enrolled in", "faq_progress"),
+    ("how do i become an educator", "faq_educator"), ("how can i teach on skillnest", "faq_educator"),
+    ("how do i upload my own course", "faq_educator"), ("can i create a course", "faq_educator"),
+    ("how to become a teacher here", "faq_educator"), ("i want to publish a course", "faq_educator"),
+    ("how do i add a course as an instructor", "faq_educator"), ("where is the educator dashboard", "faq_educator"),
+    ("how do i sell courses here", "faq_educator"),
+    ("how do i create an account", "faq_account"), ("how do i log in", "faq_account"),
+    ("i forgot my password", "faq_account"), ("how do i change my email", "faq_account"),
+    ("how to sign in", "faq_account"), ("how do i reset my password", "faq_account"),
+    ("how do i update my profile", "faq_account"), ("can't log into my account", "faq_account"),
+    ("how to register an account", "faq_account"), ("how do i change my profile picture", "faq_account"),
+    ("how do i edit my account details", "faq_account"), ("i can't log in", "faq_account"),
+    ("what's the weather today", "off_topic"), ("who won the football game last night", "off_topic"),
+    ("give me a recipe for pancakes", "off_topic"), ("what stocks should i buy", "off_topic"),
+    ("tell me some celebrity gossip", "off_topic"), ("recommend a movie for tonight", "off_topic"),
+    ("what's your favorite pizza topping", "off_topic"), ("who will win the election", "off_topic"),
+    ("can you book me a flight", "off_topic"), ("what's the bitcoin price", "off_topic"),
+    ("give me dating advice", "off_topic"), ("what should i eat for dinner", "off_topic"),
+    ("play some music", "off_topic"), ("what is the latest iphone price", "off_topic"),
+    ("what's the score of the lakers game", "off_topic"), ("which team will win the world cup", "off_topic"),
+    ("recommend a tv series to binge", "off_topic"), ("find me a restaurant for dinner", "off_topic"),
+    ("who is going to win the match tonight", "off_topic"), ("order me a pizza", "off_topic"),
+    ("explain recursion", LLM_INTENT), ("what is photosynthesis", LLM_INTENT),
+    ("hi, can you explain how mitochondria make atp", LLM_INTENT), ("hello what is a derivative", LLM_INTENT),
+    ("thanks, and what about integrals?", LLM_INTENT), ("how do i study for my biology quiz", LLM_INTENT),
+    ("can you give me study tips for exams", LLM_INTENT), ("what is the difference between mitosis and meiosis", LLM_INTENT),
+    ("help me understand big o notation", LLM_INTENT), ("why is the sky blue", LLM_INTENT),
+    ("explain the python for loop", LLM_INTENT), ("what does this lecture on databases cover", LLM_INTENT),
+    ("can you summarize chapter 3", LLM_INTENT), ("i don't understand the last quiz question", LLM_INTENT),
+    ("what is supervised learning", LLM_INTENT), ("how do neural networks learn", LLM_INTENT),
+    ("can you explain that again", LLM_INTENT), ("what did you mean by that", LLM_INTENT),
+    ("give me an example", LLM_INTENT), ("yes please", LLM_INTENT), ("no, the other one", LLM_INTENT),
+    ("ok and then what", LLM_INTENT), ("how should i plan my week to finish the course", LLM_INTENT),
+    ("what is the capital of france", LLM_INTENT), ("solve 2x + 3 = 7", LLM_INTENT),
+    ("what's a good way to memorize vocabulary", LLM_INTENT), ("how does the html course help with web dev", LLM_INTENT),
+    ("is javascript hard to learn", LLM_INTENT), ("what courses do you recommend for data science", LLM_INTENT),
+    ("how long does the react course take", LLM_INTENT), ("i failed my quiz what should i do", LLM_INTENT),
+    ("how to write a good essay introduction", LLM_INTENT), ("quiz me on chemistry", LLM_INTENT),
+    ("what is the weather cycle in geography", LLM_INTENT), ("how do football players use physics", LLM_INTENT),
+    ("explain how stock markets work for my economics class", LLM_INTENT),
+    ("hey bobby, can you help me with my calculus homework", LLM_INTENT),
+    ("thank you! can you also explain the quadratic formula", LLM_INTENT),
+    ("who are the main characters in hamlet", LLM_INTENT), ("how do i enroll in the best machine learning course for beginners and which one should i pick", LLM_INTENT),
+    ("how do i enroll and what is a limit in calculus", LLM_INTENT),
+    ("where are my courses and can you explain loops", LLM_INTENT),
+    ("my course video won't play", LLM_INTENT), ("the quiz page shows an error", LLM_INTENT),
+    ("what is an api", LLM_INTENT), ("define osmosis", LLM_INTENT), ("translate hello into spanish", LLM_INTENT),
+    # Questions about tools, frameworks and history share words with the FAQs and off-topic requests
+    ("how do i create a user in postgres", LLM_INTENT), ("how do i sign in to the aws console", LLM_INTENT),
+    ("how do i set up login in flask", LLM_INTENT), ("how do i create a model in django", LLM_INTENT),
+    ("how do i change the font in word", LLM_INTENT), ("how do i log in to github from the terminal", LLM_INTENT),
+    ("how do i reset a git branch", LLM_INTENT), ("how do i register a service worker", LLM_INTENT),
+    ("how do i update my node version", LLM_INTENT), ("how do i sign up for an api key", LLM_INTENT),
+    ("who won the battle of hastings", LLM_INTENT), ("who won the american civil war", LLM_INTENT),
+    ("when did world war 1 end", LLM_INTENT), ("who was the first president of the united states", LLM_INTENT),
+    ("who won the cold war", LLM_INTENT), ("which empire won the punic wars", LLM_INTENT),
+    ("what was the score in the first olympic marathon", LLM_INTENT),
+]
+
+
+def _bucket(feature: str) -> int:
+    # blake2b rather than hash() so every worker trains the same model
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=4).digest(), "little") % VECTOR_DIMENSIONS
+
+
+def message_words(message: str) -> List[str]:
+    return _WORD_RE.findall(message.lower())
+
+
+def featurize(words: List[str]) -> np.ndarray:
+    """Hashed words, word prefixes, word bigrams and a message-length feature, scaled to unit length"""
+    vector = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+    for word in words:
+        vector[_bucket(f"w:{word}")] += 1.0
+        # A five-letter prefix lines up "enroll", "enrolled" and "enrollments" without a stemmer
+        if len(word) > 5:
+            vector[_bucket(f"p:{word[:5]}")] += 1.0
+    for a, b in zip(words, words[1:]):
+        vector[_bucket(f"b:{a} {b}")] += 1.0
+    # Greetings and thanks are short; questions rarely are
+    vector[_bucket(f"len:{min(len(words), 8)}")] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class IntentRouter:
+    """
+    Answers greetings, thanks, questions about Bobby, platform FAQs and off-topic requests from templates,
+    leaving everything else for the LLM. Unambiguous whole-message phrases are caught by one compiled pattern;
+    the rest go through a softmax model over hashed word features trained on TRAINING_EXAMPLES at startup.
+    """
+
+    def __init__(self, examples: List[Tuple[str, str]] = TRAINING_EXAMPLES):
+        self.intents = sorted({intent for _, intent in examples})
+        self.weights, self.bias = self._train(examples)
+        self.lock = threading.Lock()
+        self.stats = {"routed_local": 0, "sent_to_llm": 0, "pattern_hits": 0, "model_hits": 0, "intents": {}}
+
+    def _train(self, examples: List[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Full-batch gradient descent on the cross-entropy of a softmax over the intents"""
+        features = np.stack([featurize(message_words(text)) for text, _ in examples])
+        # Only dimensions some example uses can get a nonzero weight, so training runs on those alone
+        active = np.flatnonzero(features.any(axis=0))
+        features = features[:, active]
+        labels = np.array([self.intents.index(intent) for _, intent in examples])
+        targets = np.eye(len(self.intents), dtype=np.float32)[labels]
+        weights = np.zeros((len(active), len(self.intents)), dtype=np.float32)
+        bias = np.zeros(len(self.intents), dtype=np.float32)
+        for _ in range(TRAINING_EPOCHS):
+            probabilities = self._softmax(features @ weights + bias)
+            error = (probabilities - targets) / len(examples)
+            weights -= LEARNING_RATE * (features.T @ error + L2_PENALTY * weights)
+            bias -= LEARNING_RATE * error.sum(axis=0)
+        full = np.zeros((VECTOR_DIMENSIONS, len(self.intents)), dtype=np.float32)
+        full[active] = weights
+        return full, bias
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exponents = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exponents / exponents.sum(axis=-1, keepdims=True)
+
+    def classify(self, message: str) -> Dict:
+        """{intent, confidence, source} where source is 'pattern', 'model' or 'faq_anchor' (FAQ sent to the LLM)"""
+        words = message_words(message)
+        match = _MATCHER.fullmatch(" ".join(words))
+        if match:
+            return {"intent": match.lastgroup, "confidence": 1.0, "source": "pattern"}
+        if not words or len(words) > INTENT_ROUTER_MAX_WORDS:
+            return {"intent": LLM_INTENT, "confidence": 1.0, "source": "model"}
+        probabilities = self._softmax(featurize(words) @ self.weights + self.bias)
+        best = int(probabilities.argmax())
+        intent, confidence = self.intents[best], round(float(probabilities[best]), 3)
+        if intent.startswith("faq_") and not _FAQ_ANCHOR_RE.search(" ".join(words)):
+            return {"intent": LLM_INTENT, "confidence": confidence, "source": "faq_anchor"}
+        return {"intent": intent, "confidence": confidence, "source": "model"}
+
+    def local_intent(self, classified: Dict) -> bool:
+        """True when the classification is confident enough to answer from a template"""
+        intent, confidence = classified["intent"], classified["confidence"]
+        if intent == LLM_INTENT:
+            return False
+        threshold = INTENT_ROUTER_REFUSAL_THRESHOLD if intent == "off_topic" else INTENT_ROUTER_THRESHOLD
+        return confidence >= threshold
+
+    def route(self, message: str) -> Optional[Dict]:
+        """Template answer for a message Bobby can handle without the LLM, or None to send it on"""
+        if not INTENT_ROUTER_ENABLED:
+            return None
+        classified = self.classify(message)
+        local = self.local_intent(classified)
+        with self.lock:
+            if not local:
+                self.stats["sent_to_llm"] += 1
+                return None
+            self.stats["routed_local"] += 1
+            self.stats["pattern_hits" if classified["source"] == "pattern" else "model_hits"] += 1
+            self.stats["intents"][classified["intent"]] = self.stats["intents"].get(classified["intent"], 0) + 1
+        return {**classified, "response": random.choice(TEMPLATES[classified["intent"]])}
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            stats = {**self.stats, "intents": dict(self.stats["intents"])}
+        total = stats["routed_local"] + stats["sent_to_llm"]
+        return {
+            **stats,
+            "enabled": INTENT_ROUTER_ENABLED,
+            "local_rate": round(stats["routed_local"] / total, 3) if total else 0.0,
+            "threshold": INTENT_ROUTER_THRESHOLD,
+            "refusal_threshold": INTENT_ROUTER_REFUSAL_THRESHOLD,
+        }
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,249 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", 64))
+# Per-request profiles kept for the admin endpoints to fetch
+PROFILE_RESULTS_KEPT = int(os.getenv("PROFILE_RESULTS_KEPT", 20))
+MEMORY_SNAPSHOTS_KEPT = int(os.getenv("MEMORY_SNAPSHOTS_KEPT", 5))
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", 25))
+
+_SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the service or site-packages, so frames read as module paths"""
+    if "site-packages" in filename:
+        return filename.split("site-packages", 1)[1].lstrip("/\\")
+    if filename.startswith(_SERVICE_ROOT):
+        return os.path.relpath(filename, _SERVICE_ROOT)
+    return os.path.basename(filename)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_stack(frame, thread_name: str) -> str:
+    """One sample in collapsed-stack form: thread;outermost;...;innermost"""
+    labels = []
+    while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+def render_folded(samples: Counter) -> str:
+    """Brendan Gregg's folded format, readable by flamegraph.pl, speedscope and inferno"""
+    return "\n".join(f"{stack} {count}" for stack, count in samples.most_common())
+
+
+class ProfileSession:
+    def __init__(self, label: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.samples: Counter = Counter()
+        self.started_at = time.time()
+        self.seconds = 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "seconds": round(self.seconds, 3),
+            "samples": sum(self.samples.values()),
+            "stacks": len(self.samples),
+        }
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler over sys._current_frames(). A background thread runs only while at least one
+    session is open, so a process that is not being profiled pays nothing.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.sessions: Dict[str, ProfileSession] = {}
+        self.results: "OrderedDict[str, ProfileSession]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.stats = {"sessions": 0, "samples": 0}
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            with self.lock:
+                if not self.sessions:
+                    self.thread = None
+                    return
+                sessions = list(self.sessions.values())
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [
+                fold_stack(frame, names.get(thread_id, f"thread-{thread_id}"))
+                for thread_id, frame in sys._current_frames().items()
+                if thread_id != own_id
+            ]
+            with self.lock:
+                for session in sessions:
+                    session.samples.update(stacks)
+                self.stats["samples"] += 1
+            time.sleep(self.interval)
+
+    def start(self, label: str) -> ProfileSession:
+        session = ProfileSession(label)
+        with self.lock:
+            self.sessions[session.id] = session
+            self.stats["sessions"] += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self.thread.start()
+        return session
+
+    def stop(self, session: ProfileSession) -> ProfileSession:
+        """Close a session and keep its result for later retrieval"""
+        with self.lock:
+            self.sessions.pop(session.id, None)
+            session.seconds = time.time() - session.started_at
+            self.results[session.id] = session
+            while len(self.results) > PROFILE_RESULTS_KEPT:
+                self.results.popitem(last=False)
+        return session
+
+    def get_result(self, session_id: str) -> Optional[ProfileSession]:
+        with self.lock:
+            return self.results.get(session_id)
+
+    def list_results(self) -> List[Dict]:
+        with self.lock:
+            return [session.summary() for session in reversed(self.results.values())]
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {**self.stats, "active": len(self.sessions), "kept": len(self.results),
+                    "interval_ms": self.interval * 1000}
+
+
+class MemorySnapshots:
+    """tracemalloc snapshots taken on demand and diffed to find what is growing"""
+
+    def __init__(self):
+        self.snapshots: "OrderedDict[str, Dict]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.started_here = False
+
+    def start(self, frames: int = TRACEMALLOC_FRAMES) -> Dict:
+        # Tracing slows every allocation, so it is only on between start and stop
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.started_here = True
+        return self.status()
+
+    def stop(self) -> Dict:
+        if tracemalloc.is_tracing() and self.started_here:
+            tracemalloc.stop()
+            self.started_here = False
+        with self.lock:
+            self.snapshots.clear()
+        return self.status()
+
+    def take(self, label: Optional[str] = None) -> Dict:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        snapshot_id = uuid.uuid4().hex[:8]
+        entry = {
+            "id": snapshot_id,
+            "label": label or snapshot_id,
+            "taken_at": time.time(),
+            "snapshot": snapshot,
+            "traced_bytes": sum(stat.size for stat in snapshot.statistics("filename")),
+        }
+        with self.lock:
+            self.snapshots[snapshot_id] = entry
+            while len(self.snapshots) > MEMORY_SNAPSHOTS_KEPT:
+                self.snapshots.popitem(last=False)
+        return self._describe(entry)
+
+    def _get(self, snapshot_id: str) -> Dict:
+        with self.lock:
+            entry = self.snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(snapshot_id)
+        return entry
+
+    @staticmethod
+    def _describe(entry: Dict) -> Dict:
+        return {key: value for key, value in entry.items() if key != "snapshot"}
+
+    @staticmethod
+    def _filtered(snapshot, include: Optional[str]):
+        if not include:
+            return snapshot
+        # all_frames: keep allocations made in library code on behalf of matching code
+        return snapshot.filter_traces((tracemalloc.Filter(True, f"*{include}*", all_frames=True),))
+
+    def top(self, snapshot_id: str, group_by: str = "lineno", limit: int = 25, include: Optional[str] = None) -> List[Dict]:
+        snapshot = self._filtered(self._get(snapshot_id)["snapshot"], include)
+        return [
+            {"location": _stat_location(stat.traceback, group_by), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:limit]
+        ]
+
+    def diff(self, from_id: str, to_id: str, group_by: str = "lineno", limit: int = 25,
+             include: Optional[str] = None) -> Dict:
+        """Allocation sites that grew most between two snapshots"""
+        before = self._filtered(self._get(from_id)["snapshot"], include)
+        after = self._filtered(self._get(to_id)["snapshot"], include)
+        stats = after.compare_to(before, group_by)
+        return {
+            "from": from_id,
+            "to": to_id,
+            "total_growth_bytes": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "location": _stat_location(stat.traceback, group_by),
+                    "size_diff_bytes": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def status(self) -> Dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self.lock:
+            snapshots = [self._describe(entry) for entry in self.snapshots.values()]
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "snapshots": snapshots,
+        }
+
+
+def _stat_location(traceback, group_by: str) -> str:
+    if group_by == "traceback":
+        # tracemalloc orders frames oldest first
+        return " -> ".join(f"{_short_path(frame.filename)}:{frame.lineno}" for frame in traceback)
+    frame = traceback[-1]
+    return _short_path(frame.filename) if group_by == "filename" else f"{_short_path(frame.filename)}:{frame.lineno}"
+
+
+sampling_profiler = SamplingProfiler()
+memory_snapshots = MemorySnapshots()
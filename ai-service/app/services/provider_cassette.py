@@ -0,0 +1,204 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Dict, Optional, Tuple
+
+# off | record | replay | replay_then_live
+CASSETTE_MODE = os.getenv("PROVIDER_CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("PROVIDER_CASSETTE_PATH", "provider_cassettes.jsonl")
+
+VALID_MODES = {"off", "record", "replay", "replay_then_live"}
+
+
+class CassetteMiss(Exception):
+    """Raised in replay-only mode when no recording exists for a prompt"""
+
+
+def prompt_digest(model_name: str, payload) -> str:
+    """Digest of a model name and canonical prompt payload"""
+    canonical = payload if isinstance(payload, str) else json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(f"{model_name}\n{canonical}".encode()).hexdigest()[:32]
+
+
+class CassetteStore:
+    """Append-only on-disk store of prompt digest → compressed response text and the provider's usage numbers"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Tuple[bytes, Optional[Dict]]] = {}
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+        self.offset = 0
+        self._load()
+        if self.entries:
+            print(f"📼 Loaded {len(self.entries)} provider cassette entries from {self.path}")
+
+    def _load(self) -> None:
+        """Read records appended since the last load, including ones written by other workers"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A sibling worker is mid-write; pick the line up next time
+                    break
+                self.offset += len(line)
+                try:
+                    record = json.loads(line)
+                    # Later records win, so re-recording a prompt replaces it
+                    self.entries[record["k"]] = (base64.b64decode(record["r"]), record.get("u"))
+                except (ValueError, KeyError):
+                    continue
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[Dict]]]:
+        """(response text, usage) or None; usage is None for recordings made without it"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self._load()
+                entry = self.entries.get(key)
+            self.stats["hits" if entry is not None else "misses"] += 1
+        return (zlib.decompress(entry[0]).decode("utf-8"), entry[1]) if entry is not None else None
+
+    def put(self, key: str, model_name: str, response_text: str, usage: Optional[Dict] = None) -> None:
+        compressed = zlib.compress(response_text.encode("utf-8"), 6)
+        line = json.dumps({
+            "k": key,
+            "m": model_name,
+            "t": int(time.time()),
+            "r": base64.b64encode(compressed).decode("ascii"),
+            "u": usage,
+        }) + "\n"
+        with self.lock:
+            self.entries[key] = (compressed, usage)
+            self.stats["recorded"] += 1
+            # One write per record in append mode keeps concurrent writers from interleaving lines
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {**self.stats, "entries": len(self.entries), "path": self.path}
+
+
+_stores: Dict[str, CassetteStore] = {}
+
+
+def get_cassette_store(path: str = CASSETTE_PATH) -> CassetteStore:
+    """Get the shared store for a cassette file"""
+    if path not in _stores:
+        _stores[path] = CassetteStore(path)
+    return _stores[path]
+
+
+def _usage_fields(usage, fields) -> Optional[Dict]:
+    """Plain dict of a provider usage object's token counts, or None when it reports none"""
+    if usage is None:
+        return None
+    values = {field: getattr(usage, field, None) for field in fields}
+    return values if any(value is not None for value in values.values()) else None
+
+
+class _CassetteProvider:
+    def __init__(self, live, store: CassetteStore, mode: str, model_name: str):
+        self.live = live
+        self.store = store
+        self.mode = mode
+        self.model_name = model_name
+
+    def _call(self, payload, live_call) -> Tuple[str, Optional[Dict]]:
+        """(response text, usage) from the cassette or from live_call, which returns the same pair"""
+        key = prompt_digest(self.model_name, payload)
+        if self.mode in ("replay", "replay_then_live"):
+            recorded = self.store.get(key)
+            if recorded is not None:
+                return recorded
+            if self.mode == "replay" or self.live is None:
+                raise CassetteMiss(f"No cassette recording for {self.model_name} prompt {key}")
+
+        response_text, usage = live_call()
+        if self.mode in ("record", "replay_then_live") and response_text:
+            self.store.put(key, self.model_name, response_text, usage)
+        return response_text, usage
+
+
+class CassetteGeminiModel(_CassetteProvider):
+    """Record/replay wrapper with the GenerativeModel.generate_content interface"""
+
+    USAGE_FIELDS = ("prompt_token_count", "candidates_token_count", "cached_content_token_count")
+
+    def generate_content(self, prompt: str, **kwargs):
+        # Recordings hold whole responses, so streaming callers get the text as one chunk
+        kwargs.pop("stream", None)
+        # Generation settings change the response (max_output_tokens truncates it), so they are part of the key;
+        # request_options only carry timeouts. A bare prompt keeps the digest of older recordings.
+        settings = {name: value for name, value in kwargs.items() if name != "request_options"}
+        payload = {"prompt": prompt, **settings} if settings else prompt
+
+        def live_call():
+            response = self.live.generate_content(prompt, **kwargs)
+            return response.text, _usage_fields(getattr(response, "usage_metadata", None), self.USAGE_FIELDS)
+
+        text, usage = self._call(payload, live_call)
+        return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(**usage) if usage else None)
+
+
+class CassetteGroqClient(_CassetteProvider):
+    """Record/replay wrapper with the Groq chat.completions.create interface"""
+
+    USAGE_FIELDS = ("prompt_tokens", "completion_tokens")
+
+    def __init__(self, live, store: CassetteStore, mode: str, model_name: str):
+        super().__init__(live, store, mode, model_name)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+
+    def _create_completion(self, messages, model: str, **kwargs):
+        payload = {"messages": messages, "model": model,
+                   "temperature": kwargs.get("temperature"), "max_tokens": kwargs.get("max_tokens")}
+
+        def live_call():
+            response = self.live.chat.completions.create(messages=messages, model=model, **kwargs)
+            return response.choices[0].message.content, _usage_fields(getattr(response, "usage", None), self.USAGE_FIELDS)
+
+        text, usage = self._call(payload, live_call)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                               usage=SimpleNamespace(**usage) if usage else None)
+
+
+def _cassette_mode() -> str:
+    if CASSETTE_MODE not in VALID_MODES:
+        print(f"⚠️ Unknown PROVIDER_CASSETTE_MODE '{CASSETTE_MODE}' - cassettes disabled")
+        return "off"
+    return CASSETTE_MODE
+
+
+def wrap_gemini_model(model, model_name: str):
+    """Wrap a Gemini model for record/replay; replay modes work without a live model"""
+    mode = _cassette_mode()
+    if mode == "off" or (model is None and mode == "record"):
+        return model
+    print(f"📼 Gemini cassette mode: {mode}")
+    return CassetteGeminiModel(model, get_cassette_store(), mode, model_name)
+
+
+def wrap_groq_client(client, model_name: str):
+    """Wrap a Groq client for record/replay; replay modes work without a live client"""
+    mode = _cassette_mode()
+    if mode == "off" or (client is None and mode == "record"):
+        return client
+    print(f"📼 Groq cassette mode: {mode}")
+    return CassetteGroqClient(client, get_cassette_store(), mode, model_name)
+
+
+def get_cassette_stats() -> Dict:
+    """Cassette mode and hit statistics for health reporting"""
+    return {
+        "mode": _cassette_mode(),
+        "stores": [store.get_stats() for store in _stores.values()],
+    }
@@ -0,0 +1,236 @@
+import hashlib
+import os
+import random
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from pymongo import MongoClient, UpdateOne
+from app.utils.token_budget import estimate_tokens
+from app.services.health_prober import MONGO_CLIENT_OPTIONS
+from app.utils.deadline import mongo_timeout
+
+CHUNK_TOKENS = int(os.getenv("QUESTION_BANK_CHUNK_TOKENS", "600"))
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def chunk_content(content: str, chunk_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Split content into sentence-aligned chunks of roughly chunk_tokens"""
+    chunks, current, used = [], [], 0
+    for sentence in _SENTENCE_RE.split(re.sub(r"\s+", " ", content).strip()):
+        cost = estimate_tokens(sentence)
+        if current and used + cost > chunk_tokens:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+        current.append(sentence)
+        used += cost
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def chunk_digest(chunk: str) -> str:
+    """Stable digest of a normalized content chunk"""
+    return hashlib.sha1(chunk.lower().encode()).hexdigest()[:16]
+
+
+def question_id(question: Dict) -> str:
+    """Stable id of a question from its normalized text"""
+    normalized = " ".join(_TOKEN_RE.findall(str(question.get("question", "")).lower()))
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _attribute_chunk(question: Dict, chunk_words: List[set], digests: List[str]) -> str:
+    """Pick the content chunk a question most likely came from by word overlap"""
+    text = " ".join([str(question.get("question", "")), str(question.get("correct_answer", "")),
+                     str(question.get("explanation", ""))]).lower()
+    words = set(_WORD_RE.findall(text))
+    best = max(range(len(digests)), key=lambda i: len(words & chunk_words[i]))
+    return digests[best]
+
+
+class InMemoryQuestionStore:
+    """Local stand-in for the Mongo question bank, used for tests and when Mongo is not configured"""
+
+    def __init__(self):
+        self.documents: Dict[tuple, Dict] = {}
+
+    def upsert_many(self, documents: List[Dict]) -> None:
+        for document in documents:
+            key = (document["course_id"], document["question_id"])
+            self.documents.setdefault(key, document)
+
+    def find(self, course_id: str, chunk_digests: List[str], difficulty: str, types: List[str]) -> List[Dict]:
+        digests = set(chunk_digests)
+        return [
+            document for (doc_course, _), document in self.documents.items()
+            if doc_course == course_id and document["chunk_digest"] in digests
+            and document["difficulty"] == difficulty and document["type"] in types
+        ]
+
+    def count(self, course_id: Optional[str] = None) -> int:
+        return sum(1 for (doc_course, _) in self.documents if course_id is None or doc_course == course_id)
+
+
+class MongoQuestionStore:
+    """Question bank stored in Mongo, indexed by course, chunk digest, difficulty and type"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexes_ready = False
+
+    def _ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        self.collection.create_index([("course_id", 1), ("question_id", 1)], unique=True)
+        self.collection.create_index([("course_id", 1), ("chunk_digest", 1), ("difficulty", 1), ("type", 1)])
+        self._indexes_ready = True
+
+    def upsert_many(self, documents: List[Dict]) -> None:
+        self._ensure_indexes()
+        operations = [
+            UpdateOne(
+                {"course_id": document["course_id"], "question_id": document["question_id"]},
+                {"$setOnInsert": document},
+                upsert=True,
+            )
+            for document in documents
+        ]
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def find(self, course_id: str, chunk_digests: List[str], difficulty: str, types: List[str]) -> List[Dict]:
+        self._ensure_indexes()
+        return list(self.collection.find(
+            {
+                "course_id": course_id,
+                "chunk_digest": {"$in": chunk_digests},
+                "difficulty": difficulty,
+                "type": {"$in": types},
+            },
+            {"_id": 0, "created_at": 0},
+        ))
+
+    def count(self, course_id: Optional[str] = None) -> int:
+        return self.collection.count_documents({"course_id": course_id} if course_id else {})
+
+
+def initialize_question_store():
+    """Use Mongo when configured, otherwise the in-memory stand-in"""
+    backend = os.getenv("QUESTION_BANK_BACKEND", "mongo" if os.getenv("MONGODB_URI") else "memory")
+    if backend == "mongo":
+        try:
+            client = MongoClient(os.getenv("MONGODB_URI"), **MONGO_CLIENT_OPTIONS)
+            print("✅ Question bank using MongoDB")
+            return MongoQuestionStore(client.quiz_db.question_bank)
+        except Exception as e:
+            print(f"⚠️ Question bank MongoDB error: {e} - using in-memory store")
+    else:
+        print("⚠️ Question bank using in-memory store")
+    return InMemoryQuestionStore()
+
+
+class QuestionBank:
+    """Course-scoped bank of generated questions with stratified quiz assembly"""
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else initialize_question_store()
+        self.stats = {"requested": 0, "served_from_bank": 0, "stored": 0}
+
+    def add_questions(self, course_id: str, content: str, questions: List[Dict]) -> None:
+        """Store generated questions, attributed to the content chunk they cover"""
+        chunks = chunk_content(content)
+        if not chunks or not questions:
+            return
+        digests = [chunk_digest(chunk) for chunk in chunks]
+        chunk_words = [set(_WORD_RE.findall(chunk.lower())) for chunk in chunks]
+
+        documents = []
+        for question in questions:
+            documents.append({
+                "course_id": course_id,
+                "question_id": question_id(question),
+                "chunk_digest": _attribute_chunk(question, chunk_words, digests),
+                "difficulty": str(question.get("difficulty", "medium")),
+                "type": str(question.get("type", "mcq")),
+                "question": question.get("question"),
+                "options": question.get("options"),
+                "correct_answer": question.get("correct_answer"),
+                "explanation": question.get("explanation"),
+                "points": question.get("points", 1),
+                "created_at": datetime.now(timezone.utc),
+            })
+        try:
+            with mongo_timeout():
+                self.store.upsert_many(documents)
+            self.stats["stored"] += len(documents)
+        except Exception as e:
+            print(f"⚠️ Failed to store questions in bank: {e}")
+
+    def assemble(self, course_id: str, content: str, quiz_settings, user_id: str) -> List[Dict]:
+        """Sample up to question_count banked questions, stratified by chunk and type"""
+        requested = quiz_settings.question_count
+        self.stats["requested"] += requested
+
+        chunks = chunk_content(content)
+        digests = [chunk_digest(chunk) for chunk in chunks]
+        if not digests:
+            return []
+        try:
+            with mongo_timeout():
+                candidates = self.store.find(course_id, digests, str(quiz_settings.difficulty),
+                                             [str(t) for t in quiz_settings.question_types])
+        except Exception as e:
+            print(f"⚠️ Question bank lookup failed: {e}")
+            return []
+        if not candidates:
+            return []
+
+        # Per-student randomization: a student sees a stable order for the same content
+        rng = random.Random(f"{user_id}:{course_id}:{':'.join(digests)}")
+
+        strata: Dict[tuple, List[Dict]] = {}
+        for candidate in candidates:
+            strata.setdefault((candidate["chunk_digest"], candidate["type"]), []).append(candidate)
+        for bucket in strata.values():
+            rng.shuffle(bucket)
+
+        # Round-robin across strata so coverage spans every chunk and question type
+        selected = []
+        stratum_keys = sorted(strata)
+        rng.shuffle(stratum_keys)
+        while len(selected) < requested and stratum_keys:
+            for key in list(stratum_keys):
+                if len(selected) >= requested:
+                    break
+                if strata[key]:
+                    selected.append(strata[key].pop())
+                else:
+                    stratum_keys.remove(key)
+
+        rng.shuffle(selected)
+        questions = []
+        for document in selected:
+            options = list(document.get("options") or [])
+            rng.shuffle(options)
+            questions.append({
+                "question": document["question"],
+                "type": document["type"],
+                "options": options or None,
+                "correct_answer": document["correct_answer"],
+                "explanation": document.get("explanation"),
+                "difficulty": document["difficulty"],
+                "points": document.get("points", 1),
+            })
+
+        self.stats["served_from_bank"] += len(questions)
+        return questions
+
+    def get_stats(self) -> Dict:
+        """Bank hit statistics"""
+        requested = self.stats["requested"] or 1
+        return {**self.stats, "bank_hit_rate": round(self.stats["served_from_bank"] / requested, 3)}
+
+
+question_bank = QuestionBank()
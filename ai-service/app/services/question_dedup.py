@@ -0,0 +1,189 @@
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.shared_state import state_backend
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_DEDUP_THRESHOLD", "0.6"))
+MAX_HISTORY_PER_COURSE = int(os.getenv("QUESTION_HISTORY_PER_COURSE", "100000"))
+# Quizzes kept in each course's shared history log
+MAX_HISTORY_ENTRIES = int(os.getenv("QUESTION_HISTORY_ENTRIES", "10000"))
+# How long a log entry whose number is taken but which is not written yet is waited for before it is skipped
+PENDING_ENTRY_GRACE_SECONDS = 30
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Each salted 64-byte blake2b digest yields 32 independent 16-bit hash functions.
+# Fixed salts keep signatures comparable across processes and restarts.
+_HASHES_PER_DIGEST = 32
+_SALTS = [f"minhash{i}".encode() for i in range(NUM_PERMUTATIONS // _HASHES_PER_DIGEST)]
+_unpack_digest = struct.Struct(f"<{_HASHES_PER_DIGEST}H").unpack
+_EMPTY_SIGNATURE = tuple([0xFFFF] * NUM_PERMUTATIONS)
+
+
+def question_shingles(question: Dict) -> set:
+    """Word unigram and bigram shingles of a question and its options"""
+    options = sorted(str(option) for option in (question.get("options") or []))
+    text = " ".join([str(question.get("question", ""))] + options).lower()
+    words = _WORD_RE.findall(text)
+    shingles = set(words)
+    shingles.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return shingles
+
+
+def _shingle_hashes(shingle: str) -> Tuple[int, ...]:
+    data = shingle.encode()
+    values: Tuple[int, ...] = ()
+    for salt in _SALTS:
+        values += _unpack_digest(hashlib.blake2b(data, salt=salt).digest())
+    return values
+
+
+def minhash_signature(question: Dict) -> Tuple[int, ...]:
+    """Compute the MinHash signature of a question"""
+    shingles = question_shingles(question)
+    if not shingles:
+        return _EMPTY_SIGNATURE
+    # Column-wise minimum over every shingle's hash values
+    return tuple(map(min, zip(*map(_shingle_hashes, shingles))))
+
+
+def estimate_similarity(signature_a: Tuple[int, ...], signature_b: Tuple[int, ...]) -> float:
+    """Estimate Jaccard similarity from two signatures"""
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / NUM_PERMUTATIONS
+
+
+class QuestionIndex:
+    """LSH index of question signatures with FIFO eviction"""
+
+    def __init__(self, max_entries: int = MAX_HISTORY_PER_COURSE):
+        self.max_entries = max_entries
+        self.signatures: "OrderedDict[int, Tuple[int, ...]]" = OrderedDict()
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], set] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    @staticmethod
+    def _band_keys(signature: Tuple[int, ...]):
+        for band in range(LSH_BANDS):
+            yield band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+
+    def add(self, signature: Tuple[int, ...]) -> int:
+        """Add a signature and return its entry id"""
+        entry_id = self._next_id
+        self._next_id += 1
+        self.signatures[entry_id] = signature
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, set()).add(entry_id)
+
+        if len(self.signatures) > self.max_entries:
+            self._evict_oldest()
+        return entry_id
+
+    def _evict_oldest(self) -> None:
+        entry_id, signature = self.signatures.popitem(last=False)
+        for key in self._band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def find_similar(self, signature: Tuple[int, ...], threshold: float = DUPLICATE_THRESHOLD) -> Optional[float]:
+        """Return the best similarity at or above threshold, or None"""
+        candidates = set()
+        for key in self._band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket:
+                candidates.update(bucket)
+
+        best = None
+        for entry_id in candidates:
+            similarity = estimate_similarity(signature, self.signatures[entry_id])
+            if similarity >= threshold and (best is None or similarity > best):
+                best = similarity
+        return best
+
+
+# Issued questions are appended to a numbered per-course log in the shared state backend, one entry per quiz, so
+# every worker checks against the same history. Each worker replays new entries into its own LSH index.
+course_question_history: Dict[str, QuestionIndex] = {}
+_synced_entries: Dict[str, int] = {}
+_missing_since: Dict[str, float] = {}
+_history_lock = threading.Lock()
+
+
+def _entry_key(course_id: str, number: int) -> str:
+    return f"question_history:{course_id}:{number}"
+
+
+def get_course_index(course_id: str) -> QuestionIndex:
+    """Get the question history index for a course, caught up with the shared log"""
+    with _history_lock:
+        index = course_question_history.setdefault(course_id, QuestionIndex())
+        latest = state_backend.get(f"question_history:{course_id}:count", 0)
+        synced = max(_synced_entries.get(course_id, 0), latest - MAX_HISTORY_ENTRIES)
+        while synced < latest:
+            signatures = state_backend.get(_entry_key(course_id, synced + 1))
+            if signatures is None:
+                # Another worker took the number and has not written the entry yet; it is skipped only if it never
+                # shows up (the worker died in between)
+                first_missing = _missing_since.setdefault(course_id, time.time())
+                if time.time() - first_missing < PENDING_ENTRY_GRACE_SECONDS:
+                    break
+            else:
+                _missing_since.pop(course_id, None)
+                for signature in signatures:
+                    index.add(tuple(signature))
+            synced += 1
+        _synced_entries[course_id] = synced
+        return index
+
+
+def filter_near_duplicates(
+    questions: List[Dict],
+    course_id: Optional[str] = None,
+    accepted: Optional[List[Dict]] = None,
+    threshold: float = DUPLICATE_THRESHOLD
+) -> Tuple[List[Dict], List[Dict]]:
+    """Split questions into accepted and near-duplicates of the quiz so far or the course history"""
+    quiz_index = QuestionIndex()
+    for question in accepted or []:
+        quiz_index.add(minhash_signature(question))
+
+    history = get_course_index(course_id) if course_id else None
+    kept, rejected = [], []
+    for question in questions:
+        signature = minhash_signature(question)
+        if quiz_index.find_similar(signature, threshold) is not None:
+            rejected.append(question)
+        elif history is not None and history.find_similar(signature, threshold) is not None:
+            rejected.append(question)
+        else:
+            quiz_index.add(signature)
+            kept.append(question)
+
+    if rejected:
+        print(f"🧹 Rejected {len(rejected)} near-duplicate questions")
+    return kept, rejected
+
+
+def record_issued_questions(course_id: str, questions: List[Dict]) -> None:
+    """Append issued questions to the course's shared history"""
+    if not questions:
+        return
+    number = state_backend.incr(f"question_history:{course_id}:count")
+    state_backend.set(_entry_key(course_id, number), [list(minhash_signature(q)) for q in questions])
+    if number > MAX_HISTORY_ENTRIES:
+        state_backend.delete(_entry_key(course_id, number - MAX_HISTORY_ENTRIES))
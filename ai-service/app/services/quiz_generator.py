@@ -5,10 +5,13 @@ import re
 from app.models.quiz_models import QuizQuestion, QuizSettings
 from app.prompts.quiz_prompts import QUIZ_GENERATION_PROMPT
 from app.config.settings import settings
+from app.utils.token_budget import fit_text_to_budget, quiz_output_tokens
+from app.services.usage_tracker import usage_tracker, extract_usage
+from app.utils.http_transport import get_http_client
 
 class QuizGeneratorService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = OpenAI(api_key=settings.openai_api_key, http_client=get_http_client())
     
     async def generate_quiz_from_content(
         self, 
@@ -17,7 +20,10 @@ class QuizGeneratorService:
     ) -> List[QuizQuestion]:
         """Generate quiz questions from content using OpenAI"""
         
-        cleaned_content = self._clean_content(content)
+        output_tokens = quiz_output_tokens(
+            "gpt-3.5-turbo", quiz_settings.question_count, [qt.value for qt in quiz_settings.question_types]
+        )
+        cleaned_content = self._clean_content(content, output_tokens)
         questions = await self._generate_questions(cleaned_content, quiz_settings)
         
         return questions
@@ -41,8 +47,16 @@ class QuizGeneratorService:
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=quiz_output_tokens(
+                    "gpt-3.5-turbo",
+                    quiz_settings.question_count,
+                    [qt.value for qt in quiz_settings.question_types]
+                )
+            )
+            prompt_tokens, completion_tokens, estimated = extract_usage(
+                response, prompt, response.choices[0].message.content or ""
             )
+            usage_tracker.record("quiz_openai", "gpt-3.5-turbo", prompt_tokens, completion_tokens, estimated=estimated)
             
             questions_data = self._parse_openai_response(response.choices[0].message.content)
             return [QuizQuestion(**q) for q in questions_data]
@@ -51,10 +65,12 @@ class QuizGeneratorService:
             print(f"Error generating quiz: {e}")
             return []
     
-    def _clean_content(self, content: str) -> str:
+    def _clean_content(self, content: str, reserved_output_tokens: int = 2000) -> str:
         """Clean and preprocess content"""
-        cleaned = re.sub(r'\s+', ' ', content)
-        return cleaned.strip()[:4000]  # Limit content length
+        cleaned = re.sub(r'\s+', ' ', content).strip()
+        # Pack whole sentences into the model's prompt budget
+        packed, _ = fit_text_to_budget(cleaned, "gpt-3.5-turbo", QUIZ_GENERATION_PROMPT, reserved_output_tokens=reserved_output_tokens)
+        return packed
     
     def _parse_openai_response(self, response: str) -> List[dict]:
         """Parse OpenAI response into structured question data"""
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.shared_state import state_backend
+
+SEMANTIC_CACHE_ENABLED = os.getenv("BOBBY_CACHE_ENABLED", "true").lower() == "true"
+SIMILARITY_THRESHOLD = float(os.getenv("BOBBY_CACHE_THRESHOLD", 0.82))
+DEFAULT_TTL_SECONDS = int(os.getenv("BOBBY_CACHE_TTL", 24 * 3600))
+MAX_ENTRIES = int(os.getenv("BOBBY_CACHE_MAX_ENTRIES", 2000))
+VECTOR_DIMENSIONS = 1024
+MAX_CACHEABLE_WORDS = 25
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_FILLER_RE = re.compile(
+    r"\b(hey|hi|hello|bobby|please|pls|plz|thanks|thank you|can you|could you|tell me|i want to know)\b"
+)
+# Messages that lean on earlier turns or on the student's own situation cannot share an answer
+_CONTEXT_RE = re.compile(
+    r"\b(it|that|this|these|those|above|earlier|previous|again|you said|same|my|mine|me|i'm|i am|"
+    r"more|else|another|why not|what about|and then|we|our|ours|us|conversation|chat|discuss(?:ed|ing)?|"
+    r"talk(?:ed|ing)?|so far)\b"
+)
+# "what is not X" must never be served the answer to "what is X"; "isn't" normalizes to "isn t"
+_NEGATIONS = {"not", "no", "never", "none", "nothing", "without", "cannot", "isn", "aren", "doesn", "don", "didn",
+              "wasn", "weren", "can", "won", "shouldn", "wouldn", "couldn"}
+_WORD_WEIGHT = 1.0
+_TRIGRAM_WEIGHT = 0.5
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop greetings and politeness words, and collapse whitespace"""
+    text = _FILLER_RE.sub(" ", message.lower())
+    return " ".join(_WORD_RE.findall(text))
+
+
+def is_context_independent(message: str) -> bool:
+    """Short standalone questions whose answer does not depend on the conversation"""
+    lowered = _FILLER_RE.sub(" ", message.lower())
+    words = _WORD_RE.findall(lowered)
+    if len(words) < 2 or len(words) > MAX_CACHEABLE_WORDS:
+        return False
+    return not _CONTEXT_RE.search(lowered)
+
+
+def is_negated(normalized: str) -> bool:
+    words = normalized.split()
+    # "can" only counts in "can t"; everything else on its own
+    return any(w in _NEGATIONS and (w != "can" and w != "won" or nxt == "t")
+               for w, nxt in zip(words, words[1:] + [""]))
+
+
+def _bucket(feature: str) -> int:
+    # blake2b rather than hash() so every worker maps a feature to the same dimension
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=4).digest(), "little") % VECTOR_DIMENSIONS
+
+
+def vectorize(normalized: str) -> np.ndarray:
+    """Unit-length hashed bag of words and character trigrams"""
+    vector = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+    for word in normalized.split():
+        vector[_bucket(f"w:{word}")] += _WORD_WEIGHT
+    # Trigrams make typos and inflections ("enroll" / "enrolling") land close together
+    padded = f" {normalized} "
+    for i in range(len(padded) - 2):
+        vector[_bucket(f"c:{padded[i:i + 3]}")] += _TRIGRAM_WEIGHT
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Nearest-neighbour answer cache over normalized message vectors"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, ttl: int = DEFAULT_TTL_SECONDS,
+                 max_entries: int = MAX_ENTRIES, namespace: str = "bobby"):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.vectors = np.zeros((64, VECTOR_DIMENSIONS), dtype=np.float32)
+        self.expires_at = np.zeros(64, dtype=np.float64)
+        self.negated = np.zeros(64, dtype=bool)
+        self.entries: List[Dict] = []
+        self.generation = self._shared_generation()
+        self.stats = {"hits": 0, "misses": 0, "skipped": 0, "stored": 0, "expired": 0, "invalidated": 0}
+
+    def _shared_generation(self) -> int:
+        return state_backend.get(f"semantic_cache:{self.namespace}:generation", 0)
+
+    def _sync_invalidations(self) -> None:
+        """Apply invalidations issued by other workers since the last lookup"""
+        generation = self._shared_generation()
+        if generation == self.generation:
+            return
+        log = state_backend.get(f"semantic_cache:{self.namespace}:invalidations", [])
+        pending = [item for item in log if item["generation"] > self.generation]
+        # If the log was trimmed past our generation we cannot replay it, so start over
+        if len(pending) < generation - self.generation or any(item["query"] is None for item in pending):
+            self._clear_local()
+        else:
+            for item in pending:
+                self._invalidate_local(item["query"])
+        self.generation = generation
+
+    def _clear_local(self) -> int:
+        removed = len(self.entries)
+        self.entries = []
+        self.expires_at[:] = 0
+        return removed
+
+    def _keep(self, mask: np.ndarray) -> None:
+        """Compact the matrix down to the entries selected by mask"""
+        count = int(mask.sum())
+        self.vectors[:count] = self.vectors[:len(self.entries)][mask]
+        self.expires_at[:count] = self.expires_at[:len(self.entries)][mask]
+        self.expires_at[count:] = 0
+        self.negated[:count] = self.negated[:len(self.entries)][mask]
+        self.entries = [entry for entry, keep in zip(self.entries, mask) if keep]
+
+    def _invalidate_local(self, query: str) -> int:
+        if not self.entries:
+            return 0
+        similarities = self.vectors[:len(self.entries)] @ vectorize(normalize_message(query))
+        mask = similarities < self.threshold
+        removed = len(self.entries) - int(mask.sum())
+        if removed:
+            self._keep(mask)
+        return removed
+
+    def lookup(self, message: str) -> Optional[str]:
+        """Cached answer for a context-independent message, or None"""
+        if not SEMANTIC_CACHE_ENABLED or not is_context_independent(message):
+            with self.lock:
+                self.stats["skipped"] += 1
+            return None
+        normalized = normalize_message(message)
+        query = vectorize(normalized)
+        negated = is_negated(normalized)
+        with self.lock:
+            self._sync_invalidations()
+            count = len(self.entries)
+            if count:
+                similarities = self.vectors[:count] @ query
+                # Expired rows can never win
+                similarities[self.expires_at[:count] < time.time()] = -1.0
+                # Near-identical wording with the opposite polarity is a different question
+                similarities[self.negated[:count] != negated] = -1.0
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry = self.entries[best]
+                    entry["hits"] += 1
+                    self.stats["hits"] += 1
+                    print(f"🎯 Semantic cache hit ({similarities[best]:.2f}): '{entry['question']}'")
+                    return entry["response"]
+            self.stats["misses"] += 1
+        return None
+
+    def store(self, message: str, response: str, ttl: Optional[int] = None) -> bool:
+        """Cache a response for a context-independent message"""
+        if not SEMANTIC_CACHE_ENABLED or not response or not is_context_independent(message):
+            return False
+        normalized = normalize_message(message)
+        vector = vectorize(normalized)
+        with self.lock:
+            count = len(self.entries)
+            if count >= self.max_entries:
+                self._evict()
+                count = len(self.entries)
+            if count == len(self.vectors):
+                self.vectors = np.vstack([self.vectors, np.zeros_like(self.vectors)])
+                self.expires_at = np.concatenate([self.expires_at, np.zeros_like(self.expires_at)])
+                self.negated = np.concatenate([self.negated, np.zeros_like(self.negated)])
+            self.vectors[count] = vector
+            self.expires_at[count] = time.time() + (ttl or self.ttl)
+            self.negated[count] = is_negated(normalized)
+            self.entries.append({"question": normalized, "response": response, "hits": 0, "created_at": time.time()})
+            self.stats["stored"] += 1
+        return True
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the oldest tenth if still full"""
+        count = len(self.entries)
+        live = self.expires_at[:count] >= time.time()
+        self.stats["expired"] += count - int(live.sum())
+        if live.sum() >= self.max_entries:
+            oldest = np.flatnonzero(live)[:max(self.max_entries // 10, 1)]
+            live[oldest] = False
+        self._keep(live)
+
+    def invalidate(self, query: Optional[str] = None) -> int:
+        """Drop entries similar to query (or everything) in this and every other worker"""
+        with self.lock:
+            self._sync_invalidations()
+            removed = self._clear_local() if query is None else self._invalidate_local(query)
+            self.stats["invalidated"] += removed
+            generation = state_backend.incr(f"semantic_cache:{self.namespace}:generation")
+            log_key = f"semantic_cache:{self.namespace}:invalidations"
+            log = state_backend.get(log_key, [])
+            log.append({"generation": generation, "query": query})
+            state_backend.set(log_key, log[-50:])
+            self.generation = generation
+        print(f"🧹 Semantic cache invalidated {removed} entries" + (f" matching '{query}'" if query else ""))
+        return removed
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            live = int((self.expires_at[:len(self.entries)] >= time.time()).sum())
+            return {
+                **self.stats,
+                "enabled": SEMANTIC_CACHE_ENABLED,
+                "entries": live,
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl,
+            }
+
+
+bobby_cache = SemanticCache()
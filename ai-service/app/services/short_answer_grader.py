@@ -0,0 +1,396 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.prompts.quiz_prompts import SHORT_ANSWER_GRADING_PROMPT, SHORT_ANSWER_GRADING_QUESTION
+
+GRADING_VECTOR_DIMENSIONS = int(os.getenv("GRADING_VECTOR_DIMENSIONS", 4096))
+# Raw similarity at or above FULL earns full credit, at or below ZERO earns none, linear in between
+GRADING_FULL_CREDIT = float(os.getenv("GRADING_FULL_CREDIT", 0.7))
+GRADING_ZERO_CREDIT = float(os.getenv("GRADING_ZERO_CREDIT", 0.25))
+# Answers graded locally with less confidence than this are sent to the LLM
+GRADING_ESCALATE_BELOW = float(os.getenv("GRADING_ESCALATE_BELOW", 0.5))
+GRADING_MAX_ESCALATIONS = int(os.getenv("GRADING_MAX_ESCALATIONS", 200))
+GRADING_LLM_BATCH_SIZE = int(os.getenv("GRADING_LLM_BATCH_SIZE", 20))
+GRADING_LLM_CONCURRENCY = int(os.getenv("GRADING_LLM_CONCURRENCY", 4))
+GRADING_MAX_ANSWER_CHARS = 600
+MAX_CACHED_FEATURES = 200000
+
+# Share of the raw score from key-term recall, similarity to the expected answer and to the explanation
+_RECALL_WEIGHT = 0.5
+_REFERENCE_WEIGHT = 0.35
+_EXPLANATION_WEIGHT = 0.15
+_WORD_WEIGHT = 1.0
+_BIGRAM_WEIGHT = 0.75
+_TRIGRAM_WEIGHT = 0.3
+
+# Letters and digits split apart so "3x3" reads as "3 x 3"
+_WORD_RE = re.compile(r"[a-z]+|[0-9]+(?:\.[0-9]+)?")
+_STOPWORDS = set(
+    "a about also an and are as at be because been but by can could do does for from has have how i if in into "
+    "is it its just of on or so some than that the their them then there these they this to very was we were "
+    "what when where which who why will with would you your".split()
+)
+# "isn't" normalizes to "isn t", so contraction stems count as negations
+_NEGATIONS = set(
+    "not no never none nothing neither nor cannot isn aren doesn don didn wasn weren hasn haven wouldn "
+    "shouldn couldn".split()
+)
+
+
+def normalize_answer(text: str) -> str:
+    """Lowercase words and numbers separated by single spaces"""
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def _stem(word: str) -> str:
+    # Enough to line up plurals and tenses; character trigrams absorb the rest
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def content_terms(normalized: str) -> List[str]:
+    """Stemmed words that carry meaning: stopwords and negations dropped"""
+    return [_stem(w) for w in normalized.split()
+            if w not in _STOPWORDS and w not in _NEGATIONS and (len(w) > 1 or w.isdigit())]
+
+
+def _has_negation(normalized: str) -> bool:
+    return any(w in _NEGATIONS for w in normalized.split())
+
+
+class ShortAnswerGrader:
+    """
+    Grades a batch of short answers at once against each question's expected answer and explanation.
+    Answers become hashed word, bigram and character-trigram vectors weighted by the batch's IDF; cosine
+    similarities and key-term recall for every answer come out of a few NumPy passes over the whole batch.
+    """
+
+    def __init__(self, dimensions: int = GRADING_VECTOR_DIMENSIONS):
+        self.dimensions = dimensions
+        # term -> (word bucket, trigram buckets); shared across batches since the hash never changes
+        self.term_features: Dict[str, Tuple[int, Tuple[int, ...]]] = {}
+        self.bigram_buckets: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            "batches": 0, "submissions": 0, "unique_answers": 0, "exact": 0, "local": 0,
+            "escalated": 0, "llm_graded": 0, "local_ms": 0.0,
+        }
+
+    def _bucket(self, feature: str) -> int:
+        # blake2b rather than hash() so a batch grades the same in every worker
+        return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=4).digest(), "little") % self.dimensions
+
+    def _term(self, term: str) -> Tuple[int, Tuple[int, ...]]:
+        features = self.term_features.get(term)
+        if features is None:
+            padded = f" {term} "
+            features = (self._bucket(f"w:{term}"),
+                        tuple(self._bucket(f"c:{padded[i:i + 3]}") for i in range(len(padded) - 2)))
+            if len(self.term_features) >= MAX_CACHED_FEATURES:
+                self.term_features.clear()
+            self.term_features[term] = features
+        return features
+
+    def _bigram(self, bigram: str) -> int:
+        bucket = self.bigram_buckets.get(bigram)
+        if bucket is None:
+            bucket = self._bucket(f"b:{bigram}")
+            if len(self.bigram_buckets) >= MAX_CACHED_FEATURES:
+                self.bigram_buckets.clear()
+            self.bigram_buckets[bigram] = bucket
+        return bucket
+
+    def _features(self, texts: List[List[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sparse (row, column, weight) triplets for every text, summed per cell, plus a mask of the cells
+        that came from whole words (used for key-term recall)
+        """
+        rows, cols, weights, is_word = [], [], [], []
+        for row, terms in enumerate(texts):
+            for term in terms:
+                word_bucket, trigrams = self._term(term)
+                rows.append(row)
+                cols.append(word_bucket)
+                weights.append(_WORD_WEIGHT)
+                is_word.append(True)
+                rows.extend([row] * len(trigrams))
+                cols.extend(trigrams)
+                weights.extend([_TRIGRAM_WEIGHT] * len(trigrams))
+                is_word.extend([False] * len(trigrams))
+            for a, b in zip(terms, terms[1:]):
+                rows.append(row)
+                cols.append(self._bigram(f"{a} {b}"))
+                weights.append(_BIGRAM_WEIGHT)
+                is_word.append(False)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float32)
+        is_word = np.asarray(is_word, dtype=bool)
+        # Repeated features in one text (and hash collisions) collapse into one cell
+        cells, inverse = np.unique(rows * self.dimensions + cols, return_inverse=True)
+        summed = np.bincount(inverse, weights=weights, minlength=len(cells)).astype(np.float32)
+        word_cell = np.bincount(inverse, weights=is_word, minlength=len(cells)) > 0
+        return cells // self.dimensions, cells % self.dimensions, summed, word_cell
+
+    def grade(self, questions: List[Dict], submissions: List[Dict]) -> List[Dict]:
+        """
+        Local grade for every submission: score (0-1), points_awarded, confidence (0-1), method
+        ('exact' or 'local') and feedback. Raises ValueError for submissions to unknown questions.
+        """
+        started = time.perf_counter()
+        question_index = {q["question_id"]: i for i, q in enumerate(questions)}
+        unknown = sorted({s["question_id"] for s in submissions} - question_index.keys())
+        if unknown:
+            raise ValueError(f"Submissions reference unknown questions: {', '.join(unknown[:10])}")
+
+        # Identical answers to the same question are graded once
+        unique: Dict[Tuple[int, str], int] = {}
+        submission_rows = []
+        for submission in submissions:
+            key = (question_index[submission["question_id"]], normalize_answer(submission["answer"]))
+            submission_rows.append(unique.setdefault(key, len(unique)))
+        answer_question = np.fromiter((q for q, _ in unique), dtype=np.int64, count=len(unique))
+        answer_texts = [text for _, text in unique]
+        answer_terms = [content_terms(text) for text in answer_texts]
+
+        references = [normalize_answer(q["correct_answer"]) for q in questions]
+        reference_terms = [content_terms(text) for text in references]
+        explanation_terms = [content_terms(normalize_answer(q.get("explanation") or "")) for q in questions]
+        # Words the question already contains prove nothing when an answer repeats them
+        key_terms = []
+        for question, terms in zip(questions, reference_terms):
+            asked = set(content_terms(normalize_answer(question["question"])))
+            key_terms.append([t for t in terms if t not in asked] or terms)
+        answer_count, question_count = len(answer_terms), len(questions)
+
+        rows, cols, weights, word_cells = self._features(answer_terms + reference_terms + explanation_terms + key_terms)
+
+        # IDF over this batch: terms every student wrote say little about who understood the question
+        document_frequency = np.bincount(cols[rows < answer_count + 2 * question_count], minlength=self.dimensions)
+        idf = (np.log((answer_count + 2 * question_count + 1) / (document_frequency + 1)) + 1).astype(np.float32)
+        weights = weights * idf[cols]
+
+        answer_part = rows < answer_count
+        reference_part = (rows >= answer_count) & (rows < answer_count + question_count)
+        explanation_part = (rows >= answer_count + question_count) & (rows < answer_count + 2 * question_count)
+        key_part = (rows >= answer_count + 2 * question_count) & word_cells
+
+        def reference_table(part: np.ndarray, offset: int, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            """Sorted (question * dimensions + column) keys of a reference text's cells, with unit-length values"""
+            questions_of = rows[part] - offset
+            values = values[part]
+            norms = np.sqrt(np.bincount(questions_of, weights=values ** 2, minlength=question_count))
+            return questions_of * self.dimensions + cols[part], values / norms[questions_of]
+
+        def lookup(table: Tuple[np.ndarray, np.ndarray], keys: np.ndarray) -> np.ndarray:
+            table_keys, table_values = table
+            if not len(table_keys):
+                return np.zeros(len(keys), dtype=np.float32)
+            positions = np.minimum(np.searchsorted(table_keys, keys), len(table_keys) - 1)
+            return np.where(table_keys[positions] == keys, table_values[positions], 0)
+
+        # Cells come out of _features sorted by row then column, so each reference table is already sorted
+        references_table = reference_table(reference_part, answer_count, weights)
+        explanations_table = reference_table(explanation_part, answer_count + question_count, weights)
+        # Key terms count equally: the term most students got right should not weigh least because of IDF
+        key_questions = rows[key_part] - answer_count - 2 * question_count
+        key_terms_table = (key_questions * self.dimensions + cols[key_part], np.ones(int(key_part.sum())))
+        key_term_totals = np.bincount(key_questions, minlength=question_count).astype(np.float64)
+
+        a_rows, a_cols, a_weights = rows[answer_part], cols[answer_part], weights[answer_part]
+        a_keys = answer_question[a_rows] * self.dimensions + a_cols
+        answer_norms = np.sqrt(np.bincount(a_rows, weights=a_weights ** 2, minlength=answer_count))
+        safe_norms = np.where(answer_norms > 0, answer_norms, 1)
+        reference_cosine = np.bincount(
+            a_rows, weights=a_weights * lookup(references_table, a_keys), minlength=answer_count
+        ) / safe_norms
+        explanation_cosine = np.bincount(
+            a_rows, weights=a_weights * lookup(explanations_table, a_keys), minlength=answer_count
+        ) / safe_norms
+        a_words = word_cells[answer_part]
+        covered = np.bincount(
+            a_rows[a_words], weights=lookup(key_terms_table, a_keys[a_words]), minlength=answer_count
+        )
+        totals = key_term_totals[answer_question]
+        recall = np.divide(covered, totals, out=reference_cosine.copy(), where=totals > 0)
+
+        # Without an explanation its share of the score goes to the other two signals
+        has_explanation = (np.bincount(rows[explanation_part] - answer_count - question_count,
+                                       minlength=question_count) > 0)[answer_question]
+        raw = np.where(
+            has_explanation,
+            _RECALL_WEIGHT * recall + _REFERENCE_WEIGHT * reference_cosine + _EXPLANATION_WEIGHT * explanation_cosine,
+            (_RECALL_WEIGHT * recall + _REFERENCE_WEIGHT * reference_cosine) / (_RECALL_WEIGHT + _REFERENCE_WEIGHT),
+        )
+        band = GRADING_FULL_CREDIT - GRADING_ZERO_CREDIT
+        scores = np.clip((raw - GRADING_ZERO_CREDIT) / band, 0, 1)
+
+        # Confident far from the middle of the partial-credit band, less so when the signals disagree
+        confidence = np.clip(np.abs(raw - (GRADING_FULL_CREDIT + GRADING_ZERO_CREDIT) / 2) / (band / 2), 0, 1)
+        confidence *= 1 - 0.5 * np.minimum(np.abs(recall - reference_cosine), 1)
+        # One or two words leave a bag of words little to go on (synonyms, a bare number)
+        answer_lengths = np.fromiter((len(terms) for terms in answer_terms), dtype=np.float64, count=answer_count)
+        confidence *= 0.6 + 0.4 * np.minimum(answer_lengths / 3, 1)
+        reference_negated = np.fromiter((_has_negation(text) for text in references), dtype=bool, count=question_count)
+        answer_negated = np.fromiter((_has_negation(text) for text in answer_texts), dtype=bool, count=answer_count)
+        negation_mismatch = answer_negated != reference_negated[answer_question]
+        # Similar words with the opposite claim ("is not a prime") look right to a bag of words: half credit at
+        # low confidence, so the LLM settles it
+        flagged = negation_mismatch & (scores > 0)
+        scores = np.where(flagged, scores * 0.5, scores)
+        confidence = np.where(flagged, confidence * 0.3, confidence)
+        # Not a single key term or character trigram in common: as likely a synonym or formula ("CO2" for "carbon
+        # dioxide") as a wrong answer, which a bag of words cannot tell apart
+        no_overlap = (recall == 0) & (reference_cosine == 0)
+        confidence = np.where(no_overlap, confidence * 0.3, confidence)
+
+        # Same words as the expected answer in any order, with the same polarity. The normalized text is compared
+        # first: answers like "No" or "C" have no content terms left to compare
+        same_text = np.fromiter(
+            (bool(text) and text == references[q] for (q, text) in unique), dtype=bool, count=answer_count
+        )
+        exact = (np.fromiter(
+            (bool(terms) and sorted(terms) == sorted(reference_terms[q]) for (q, _), terms in zip(unique, answer_terms)),
+            dtype=bool, count=answer_count
+        ) & ~negation_mismatch) | same_text
+        empty = np.fromiter((not text for text in answer_texts), dtype=bool, count=answer_count)
+        scores = np.where(exact, 1.0, np.where(empty, 0.0, scores))
+        confidence = np.where(exact | empty, 1.0, confidence)
+        # Nothing to compare against when the expected answer is only a letter, a yes/no or stopwords: the LLM decides
+        termless_reference = np.fromiter((not terms for terms in reference_terms), dtype=bool,
+                                         count=question_count)[answer_question]
+        confidence = np.where(termless_reference & ~exact & ~empty, 0.0, confidence)
+
+        graded = []
+        for i, (q, _) in enumerate(unique):
+            if exact[i]:
+                method, feedback = "exact", "Matches the expected answer."
+            elif empty[i]:
+                method, feedback = "exact", "No answer was given."
+            else:
+                method, feedback = "local", self._feedback(scores[i], answer_terms[i], key_terms[q])
+            graded.append({"score": round(float(scores[i]), 2), "confidence": round(float(confidence[i]), 2),
+                           "method": method, "feedback": feedback})
+
+        results = []
+        for submission, row in zip(submissions, submission_rows):
+            question = questions[question_index[submission["question_id"]]]
+            results.append({
+                "submission_id": submission["submission_id"],
+                "question_id": submission["question_id"],
+                "answer_key": row,
+                **graded[row],
+                "points_awarded": round(graded[row]["score"] * question.get("points", 1), 2),
+            })
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.stats["batches"] += 1
+            self.stats["submissions"] += len(submissions)
+            self.stats["unique_answers"] += answer_count
+            self.stats["exact"] += int((exact | empty).sum())
+            self.stats["local"] += int(answer_count - (exact | empty).sum())
+            self.stats["local_ms"] += elapsed_ms
+        print(f"📝 Graded {len(submissions)} answers ({answer_count} unique) locally in {elapsed_ms:.0f}ms")
+        return results
+
+    @staticmethod
+    def _feedback(score: float, answer_terms: List[str], key_terms: List[str]) -> str:
+        if score >= 0.99:
+            return "Covers the expected answer."
+        verdict = "Mostly correct" if score >= 0.75 else "Partly correct" if score >= 0.25 else \
+            "Does not match the expected answer"
+        present = set(answer_terms)
+        missing = list(dict.fromkeys(term for term in key_terms if term not in present))[:3]
+        return f"{verdict}; a full answer mentions {', '.join(missing)}." if missing else f"{verdict}."
+
+    def escalation_candidates(self, results: List[Dict]) -> List[Dict]:
+        """One result per unique low-confidence answer, least confident first, capped at GRADING_MAX_ESCALATIONS"""
+        by_answer = {}
+        for result in results:
+            if result["method"] == "local" and result["confidence"] < GRADING_ESCALATE_BELOW:
+                by_answer.setdefault(result["answer_key"], result)
+        return sorted(by_answer.values(), key=lambda r: r["confidence"])[:GRADING_MAX_ESCALATIONS]
+
+    def apply_llm_grades(self, results: List[Dict], grades: Dict[int, Dict], points: Dict[str, float]) -> int:
+        """Overwrite local grades with the LLM's for every submission sharing a graded answer"""
+        updated = 0
+        for result in results:
+            grade = grades.get(result["answer_key"])
+            if grade is None:
+                continue
+            result.update(score=grade["score"], confidence=1.0, method="llm", feedback=grade["feedback"],
+                          points_awarded=round(grade["score"] * points.get(result["question_id"], 1), 2))
+            updated += 1
+        with self.lock:
+            self.stats["llm_graded"] += len(grades)
+        return updated
+
+    def record_escalations(self, count: int) -> None:
+        with self.lock:
+            self.stats["escalated"] += count
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "local_ms": round(stats["local_ms"], 1),
+            "cached_terms": len(self.term_features),
+            "escalate_below": GRADING_ESCALATE_BELOW,
+            "full_credit": GRADING_FULL_CREDIT,
+            "zero_credit": GRADING_ZERO_CREDIT,
+        }
+
+
+def build_grading_prompt(batch: List[Dict], questions: Dict[str, Dict], answers: Dict[int, str]) -> Tuple[str, Dict[str, int]]:
+    """Prompt grading a batch of answers grouped by question, and the prompt id -> answer key mapping"""
+    ids, sections = {}, []
+    by_question: Dict[str, List[Dict]] = {}
+    for result in batch:
+        by_question.setdefault(result["question_id"], []).append(result)
+    for question_id, items in by_question.items():
+        question = questions[question_id]
+        lines = []
+        for result in items:
+            prompt_id = f"a{len(ids) + 1}"
+            ids[prompt_id] = result["answer_key"]
+            lines.append(f"[{prompt_id}] {answers[result['answer_key']][:GRADING_MAX_ANSWER_CHARS]}")
+        sections.append(SHORT_ANSWER_GRADING_QUESTION.format(
+            question=question["question"], correct_answer=question["correct_answer"],
+            explanation=question.get("explanation") or "(none)", answers="\n".join(lines)
+        ))
+    return SHORT_ANSWER_GRADING_PROMPT.format(questions="\n".join(sections)), ids
+
+
+def parse_llm_grades(response_text: str, ids: Dict[str, int]) -> Dict[int, Dict]:
+    """Answer key -> {score, feedback} for every well-formed grade in the response"""
+    match = re.search(r"\[[\s\S]*\]", response_text)
+    if not match:
+        return {}
+    try:
+        items = json.loads(match.group())
+    except json.JSONDecodeError:
+        return {}
+    grades = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict) or str(item.get("id")) not in ids:
+            continue
+        try:
+            score = min(max(float(item.get("score")), 0.0), 1.0)
+        except (TypeError, ValueError):
+            continue
+        grades[ids[str(item["id"])]] = {"score": round(score, 2), "feedback": str(item.get("feedback") or "")[:300]}
+    return grades
+
+
+short_answer_grader = ShortAnswerGrader()
@@ -0,0 +1,264 @@
+import asyncio
+import os
+import re
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.prompts.video_prompts import STUDY_SESSION_PROMPT
+from app.services.health_prober import health_prober
+from app.services.transcript_store import transcript_cache
+from app.services.usage_tracker import usage_tracker, extract_usage
+from app.services.video_artifacts import video_artifacts, build_segment_index, select_windows, render_windows
+from app.utils.admission import admission_controller
+from app.utils.token_budget import QA_OUTPUT_TOKENS
+from app.utils.video_utils import generate_fallback_answer
+
+# Sessions are held in worker memory, so each worker caps its own
+STUDY_SESSION_MAX = int(os.getenv("STUDY_SESSION_MAX", 50))
+STUDY_SESSION_IDLE_SECONDS = float(os.getenv("STUDY_SESSION_IDLE_SECONDS", 300))
+# Earlier turns kept for follow-up questions
+STUDY_HISTORY_TURNS = int(os.getenv("STUDY_HISTORY_TURNS", 4))
+STUDY_CONTEXT_TOKENS = int(os.getenv("STUDY_CONTEXT_TOKENS", 2500))
+STUDY_ANSWER_TIMEOUT = float(os.getenv("STUDY_ANSWER_TIMEOUT", 30))
+
+_TIMESTAMPS_MARKER = "TIMESTAMPS:"
+_TIMESTAMP_RE = re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b")
+
+
+class AnswerStream:
+    """Splits streamed model text into answer text and the trailing TIMESTAMPS line"""
+
+    def __init__(self):
+        self.text = ""
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> str:
+        """Answer text that is safe to send now"""
+        self.text += chunk
+        marker = self.text.find(_TIMESTAMPS_MARKER)
+        # Hold back a possible partial marker at the end until the next chunk decides it
+        safe_end = marker if marker >= 0 else max(len(self.text) - len(_TIMESTAMPS_MARKER), self.emitted)
+        delta = self.text[self.emitted:safe_end]
+        self.emitted = max(self.emitted, safe_end)
+        return delta
+
+    def finish(self) -> Tuple[str, str, List[str]]:
+        """(remaining answer text, full answer, cited timestamps)"""
+        marker = self.text.find(_TIMESTAMPS_MARKER)
+        answer_end = marker if marker >= 0 else len(self.text)
+        delta = self.text[self.emitted:answer_end]
+        self.emitted = answer_end
+        timestamps = _TIMESTAMP_RE.findall(self.text[marker:]) if marker >= 0 else []
+        return delta, self.text[:answer_end].strip(), timestamps
+
+
+class StudySession:
+    """One student's Q&A session on one video: transcript index loaded once, short history for follow-ups"""
+
+    def __init__(self, video_id: str, course_id: str, user_id: str, digest: str, index: List[Dict]):
+        self.id = uuid.uuid4().hex[:12]
+        self.video_id = video_id
+        self.course_id = course_id
+        self.user_id = user_id
+        self.digest = digest
+        self.index = index
+        self.total_tokens = sum(window["tokens"] for window in index)
+        self.history: deque = deque(maxlen=STUDY_HISTORY_TURNS)
+        self.opened_at = time.monotonic()
+        self.questions = 0
+
+    def context_for(self, question: str) -> List[Dict]:
+        """Transcript windows for a question; follow-ups reuse the previous turn's terms and windows"""
+        if self.total_tokens + 4 * len(self.index) <= STUDY_CONTEXT_TOKENS:
+            return self.index
+        previous = self.history[-1] if self.history else None
+        query = f"{question} {previous['question']}" if previous else question
+        windows = select_windows(self.index, query, STUDY_CONTEXT_TOKENS)
+        if not windows and previous:
+            windows = previous["windows"]
+        return windows or self.index[:3]
+
+    def render_history(self) -> str:
+        if not self.history:
+            return "(this is the first question)"
+        return "\n".join(f"Q: {turn['question']}\nA: {turn['answer']}" for turn in self.history)
+
+
+class StudySessionManager:
+    """Open study sessions in this worker, with a cap and idle accounting"""
+
+    def __init__(self, video_service, max_sessions: int = STUDY_SESSION_MAX):
+        self.video_service = video_service
+        self.max_sessions = max_sessions
+        self.sessions: Dict[str, StudySession] = {}
+        # Slots held by connections still loading their transcript
+        self.reserved = 0
+        self.stats = {
+            "opened": 0, "rejected_full": 0, "not_found": 0, "idle_closed": 0,
+            "questions": 0, "ai_answers": 0, "fallback_answers": 0, "first_token_ms_total": 0.0,
+        }
+
+    def reserve(self) -> bool:
+        """
+        Hold a slot for a connection before it awaits its transcript, so concurrent connects cannot all pass
+        the cap; runs on the event loop without awaiting, so the check and the increment are atomic
+        """
+        if len(self.sessions) + self.reserved >= self.max_sessions:
+            return False
+        self.reserved += 1
+        return True
+
+    def release(self) -> None:
+        """Give back a reserved slot that did not become a session"""
+        self.reserved = max(self.reserved - 1, 0)
+
+    @staticmethod
+    def load(video_id: str, digest: Optional[str]):
+        """
+        (cached transcript, ingested segment index or None), or None when the transcript is unknown.
+        Both reads can go to Mongo, so callers run this in a thread.
+        """
+        transcript = transcript_cache.get(video_id, digest)
+        if transcript is None:
+            return None
+        artifacts = video_artifacts.lookup(video_id, transcript.digest)
+        return transcript, (artifacts or {}).get("segment_index")
+
+    def open(self, video_id: str, course_id: str, user_id: str, transcript, segment_index=None) -> StudySession:
+        """
+        Turn a reserved slot into a session, indexing the transcript unless ingestion already did
+        """
+        self.release()
+        index = segment_index or build_segment_index(transcript.segments)
+        session = StudySession(video_id, course_id, user_id, transcript.digest, index)
+        self.sessions[session.id] = session
+        self.stats["opened"] += 1
+        return session
+
+    def close(self, session: StudySession) -> None:
+        self.sessions.pop(session.id, None)
+
+    def _ai_ready(self, session: StudySession) -> bool:
+        service = self.video_service
+        # WebSocket messages bypass the admission middleware, so each question is admitted here
+        return service.gemini_available and service.model is not None and health_prober.is_ready("gemini") \
+            and service.circuit.allow_request() and not usage_tracker.over_budget(session.course_id) \
+            and admission_controller.decide("interactive") == "admit"
+
+    def _stream_model(self, prompt: str, result: Dict):
+        """Blocking iterator over Gemini's streamed text chunks; the response is left in result for usage"""
+        service = self.video_service
+        try:
+            with admission_controller.provider_call():
+                response = service.model.generate_content(
+                    prompt, generation_config={"max_output_tokens": QA_OUTPUT_TOKENS}, stream=True
+                )
+                chunks = []
+                if hasattr(response, "__iter__"):
+                    for chunk in response:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+                else:
+                    # Cassettes and stand-ins return the whole text at once
+                    chunks.append(response.text)
+                    yield response.text
+        except Exception:
+            service.circuit.record_failure()
+            raise
+        service.circuit.record_success()
+        result["response"], result["text"] = response, "".join(chunks)
+
+    async def _stream_text(self, prompt: str, result: Dict) -> AsyncIterator[str]:
+        """Run the blocking stream in a worker thread and hand chunks to the event loop as they arrive"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def produce():
+            try:
+                for text in self._stream_model(prompt, result):
+                    loop.call_soon_threadsafe(queue.put_nowait, ("chunk", text))
+                loop.call_soon_threadsafe(queue.put_nowait, ("done", None))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+
+        # produce() reports its own errors through the queue; a timed-out stream finishes unread in its thread
+        loop.run_in_executor(None, produce)
+        deadline = time.monotonic() + STUDY_ANSWER_TIMEOUT
+        while True:
+            kind, value = await asyncio.wait_for(queue.get(), timeout=max(deadline - time.monotonic(), 0))
+            if kind == "error":
+                raise value
+            if kind == "done":
+                return
+            yield value
+
+    async def answer(self, session: StudySession, question: str) -> AsyncIterator[Dict]:
+        """Events for one question: context, answer deltas as they are generated, then the final answer"""
+        started = time.perf_counter()
+        self.stats["questions"] += 1
+        session.questions += 1
+        windows = session.context_for(question)
+        # Candidate timestamps are known before the model starts, so the player can highlight them right away
+        yield {"type": "context", "relevant_timestamps": [w["start"] for w in windows if w.get("start")][:5]}
+
+        answer, timestamps, ai_powered = "", [], False
+        if self._ai_ready(session):
+            prompt = STUDY_SESSION_PROMPT.format(
+                excerpts=render_windows(windows), history=session.render_history(), question=question
+            )
+            stream, result = AnswerStream(), {}
+            first_token = None
+            try:
+                async for chunk in self._stream_text(prompt, result):
+                    delta = stream.feed(chunk)
+                    if delta:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                            self.stats["first_token_ms_total"] += (first_token - started) * 1000
+                        yield {"type": "answer_delta", "text": delta}
+                delta, answer, timestamps = stream.finish()
+                if delta:
+                    yield {"type": "answer_delta", "text": delta}
+                ai_powered = bool(answer)
+                prompt_tokens, completion_tokens, estimated = extract_usage(
+                    result.get("response"), prompt, result.get("text", stream.text)
+                )
+                usage_tracker.record(
+                    "video_qa_session", "gemini-1.5-flash", prompt_tokens, completion_tokens,
+                    session.course_id, session.user_id, estimated
+                )
+            except Exception as e:
+                print(f"❌ Study session answer failed: {e}")
+                if stream.emitted:
+                    # Part of the answer is already on screen; tell the client to replace it
+                    yield {"type": "answer_reset"}
+
+        if not ai_powered:
+            self.stats["fallback_answers"] += 1
+            fallback = generate_fallback_answer(question, render_windows(windows))
+            answer, timestamps = fallback["answer"], []
+            yield {"type": "answer_delta", "text": answer}
+        else:
+            self.stats["ai_answers"] += 1
+
+        session.history.append({"question": question, "answer": answer, "windows": windows})
+        yield {
+            "type": "answer_done",
+            "answer": answer,
+            "relevant_timestamps": timestamps or [w["start"] for w in windows if w.get("start")][:3],
+            "ai_powered": ai_powered,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def get_stats(self) -> Dict:
+        ai_answers = self.stats["ai_answers"] or 1
+        return {
+            **{k: v for k, v in self.stats.items() if k != "first_token_ms_total"},
+            "active": len(self.sessions),
+            "reserved": self.reserved,
+            "max_sessions": self.max_sessions,
+            "avg_first_token_ms": round(self.stats["first_token_ms_total"] / ai_answers, 1),
+            "context_tokens": STUDY_CONTEXT_TOKENS,
+        }
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import os
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.models.video_models import TranscriptSegment
+from app.utils.token_budget import estimate_tokens
+
+# Shorter transcripts fit one prompt and are summarized whole
+SUMMARY_TREE_MIN_TOKENS = int(os.getenv("SUMMARY_TREE_MIN_TOKENS", 6000))
+SUMMARY_CHUNK_MIN_TOKENS = int(os.getenv("SUMMARY_CHUNK_MIN_TOKENS", 800))
+SUMMARY_CHUNK_MAX_TOKENS = int(os.getenv("SUMMARY_CHUNK_MAX_TOKENS", 3000))
+# A segment ends a chunk (once past the minimum) when its hash is divisible by this: about one in 32
+SUMMARY_CHUNK_BOUNDARY_ODDS = int(os.getenv("SUMMARY_CHUNK_BOUNDARY_ODDS", 32))
+SUMMARY_GROUP_MIN = 3
+SUMMARY_GROUP_MAX = 12
+SUMMARY_GROUP_BOUNDARY_ODDS = 6
+# Notes are condensed a level further until they fit one final prompt
+SUMMARY_NOTES_BUDGET_TOKENS = int(os.getenv("SUMMARY_NOTES_BUDGET_TOKENS", 8000))
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha1("\x1e".join(parts).encode()).hexdigest()[:16]
+
+
+def _ends_here(key: str, odds: int) -> bool:
+    return int(key, 16) % odds == 0
+
+
+def chunk_transcript(transcript: List[TranscriptSegment]) -> List[Dict]:
+    """
+    Split a transcript into chunks whose boundaries are picked by the content of the segments themselves,
+    so editing or inserting a segment only moves the boundaries next to it and appending only touches the end
+    """
+    chunks, keys, tokens, first = [], [], 0, 0
+
+    def close(last: int) -> None:
+        chunks.append({
+            "hash": _hash("chunk", *keys), "first": first, "last": last, "tokens": tokens,
+            "start": transcript[first].timestamp or "", "end": transcript[last].timestamp or "",
+        })
+
+    for index, segment in enumerate(transcript):
+        key = _hash(segment.timestamp or "", segment.text.strip())
+        keys.append(key)
+        tokens += estimate_tokens(segment.text)
+        if tokens >= SUMMARY_CHUNK_MAX_TOKENS or (tokens >= SUMMARY_CHUNK_MIN_TOKENS and
+                                                   _ends_here(key, SUMMARY_CHUNK_BOUNDARY_ODDS)):
+            close(index)
+            keys, tokens, first = [], 0, index + 1
+    if keys:
+        close(len(transcript) - 1)
+    return chunks
+
+
+def group_nodes(nodes: List[Dict]) -> List[List[Dict]]:
+    """Consecutive runs of nodes for the next level, cut by node hash the same way chunks are"""
+    groups, current = [], []
+    for node in nodes:
+        current.append(node)
+        if len(current) >= SUMMARY_GROUP_MAX or (len(current) >= SUMMARY_GROUP_MIN and
+                                                  _ends_here(node["hash"], SUMMARY_GROUP_BOUNDARY_ODDS)):
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+
+def render_notes(nodes: List[Dict]) -> str:
+    """Notes of consecutive nodes as prompt text, each headed by its time range"""
+    parts = []
+    for node in nodes:
+        notes = node["notes"]
+        points = "\n".join(f"- {point}" for point in notes.get("key_points", []))
+        parts.append(f"[{node['start']} - {node['end']}] {notes.get('summary', '')}\n{points}".strip())
+    return "\n\n".join(parts)
+
+
+class SummaryTree:
+    """
+    Summaries of long transcripts built from partial results keyed by content hash, arranged as a Merkle tree:
+    notes per chunk at the leaves, condensed notes for runs of nodes above them, and each summary type written
+    from the top level. A node's hash covers everything under it, so after an edit only the changed chunks,
+    the nodes above them and the final summaries are generated again; every other node's notes are reused,
+    and the same notes serve every summary type.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {"builds": 0, "chunks": 0, "chunks_reused": 0, "merges": 0, "merges_reused": 0, "failed_nodes": 0}
+
+    def _count(self, **increments: int) -> None:
+        with self.lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    async def build(
+        self,
+        transcript: List[TranscriptSegment],
+        summary_types: Tuple[str, ...],
+        previous_nodes: Optional[Dict[str, Dict]],
+        run: Callable[..., Awaitable],
+        chunk_notes: Callable[[List[TranscriptSegment], str, str], Optional[Dict]],
+        merge_notes: Callable[[str, str, str], Optional[Dict]],
+        summarize: Callable[[str, str], object],
+    ) -> Dict:
+        """
+        Build every summary type. run(fn, *args) schedules one blocking provider call; chunk_notes and
+        merge_notes return notes or None, summarize(notes_text, summary_type) returns the summary.
+        Returns the summaries (None when some notes could not be generated), the nodes to store for the next
+        build - including any computed this time when the build did not finish - and what was reused.
+        """
+        previous_nodes = previous_nodes or {}
+        nodes: Dict[str, Dict] = {}
+        report = {"chunks": 0, "chunks_reused": 0, "merges": 0, "merges_reused": 0, "levels": 1, "errors": []}
+
+        async def resolve(node: Dict, kind: str, fn, *args) -> Dict:
+            cached = previous_nodes.get(node["hash"])
+            if cached:
+                report[f"{kind}_reused"] += 1
+                return {**node, "notes": cached["notes"]}
+            report[kind] += 1
+            try:
+                notes = await run(fn, *args)
+            except Exception as e:
+                notes = None
+                report["errors"].append(f"{node['start']}-{node['end']}: {e}")
+            return {**node, "notes": notes}
+
+        chunks = chunk_transcript(transcript)
+        level = await asyncio.gather(*(
+            resolve(chunk, "chunks", chunk_notes, transcript[chunk["first"]:chunk["last"] + 1], chunk["start"], chunk["end"])
+            for chunk in chunks
+        ))
+        while True:
+            nodes.update({node["hash"]: {"notes": node["notes"]} for node in level if node["notes"]})
+            missing = sum(1 for node in level if not node["notes"])
+            if missing:
+                self._count(failed_nodes=missing)
+                break
+            text = render_notes(level)
+            if len(level) == 1 or estimate_tokens(text) <= SUMMARY_NOTES_BUDGET_TOKENS:
+                break
+            parents = []
+            for group in group_nodes(level):
+                parent = {"hash": _hash("node", *(child["hash"] for child in group)),
+                          "start": group[0]["start"], "end": group[-1]["end"]}
+                parents.append(resolve(parent, "merges", merge_notes, render_notes(group), parent["start"], parent["end"]))
+            level = await asyncio.gather(*parents)
+            report["levels"] += 1
+
+        summaries = None
+        if not missing:
+            outcomes = await asyncio.gather(
+                *(run(summarize, text, summary_type) for summary_type in summary_types), return_exceptions=True
+            )
+            summaries = {}
+            for summary_type, outcome in zip(summary_types, outcomes):
+                if isinstance(outcome, Exception):
+                    report["errors"].append(f"{summary_type}: {outcome}")
+                else:
+                    summaries[summary_type] = outcome
+
+        self._count(builds=1, chunks=report["chunks"], chunks_reused=report["chunks_reused"],
+                    merges=report["merges"], merges_reused=report["merges_reused"])
+        print(f"🌳 Summary tree: {len(chunks)} chunks ({report['chunks_reused']} reused), "
+              f"{report['merges'] + report['merges_reused']} merged nodes ({report['merges_reused']} reused), "
+              f"{report['levels']} levels")
+        return {
+            "summaries": summaries,
+            "nodes": nodes,
+            "root": _hash("root", *(node["hash"] for node in level)),
+            "report": report,
+        }
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.stats)
+        generated = stats["chunks"] + stats["merges"]
+        reused = stats["chunks_reused"] + stats["merges_reused"]
+        return {
+            **stats,
+            "reuse_rate": round(reused / (generated + reused), 3) if generated + reused else 0.0,
+            "min_tokens": SUMMARY_TREE_MIN_TOKENS,
+            "chunk_tokens": [SUMMARY_CHUNK_MIN_TOKENS, SUMMARY_CHUNK_MAX_TOKENS],
+        }
+
+
+summary_tree = SummaryTree()
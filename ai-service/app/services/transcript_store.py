@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from app.services.health_prober import health_prober, MONGO_CLIENT_OPTIONS
+from app.utils.deadline import mongo_timeout
+from app.services.video_artifacts import transcript_digest
+
+# Database the Node server's mongoose connection uses (MONGODB_URI + "/lms")
+TRANSCRIPT_DB = os.getenv("TRANSCRIPT_DB", "lms")
+TRANSCRIPT_CACHE_SIZE = int(os.getenv("TRANSCRIPT_CACHE_SIZE", 200))
+# Requests without a digest cannot detect edits, so entries are re-read after this long
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", 600))
+
+
+class CompactSegment(NamedTuple):
+    """Read-only stand-in for TranscriptSegment: same attributes, a fraction of the memory, no validation"""
+    timestamp: Optional[str]
+    text: str
+    speaker: Optional[str] = None
+
+
+class CachedTranscript(NamedTuple):
+    digest: str
+    segments: List[CompactSegment]
+    loaded_at: float
+    # Digests callers sent that resolved to this version (e.g. computed slightly differently by Node)
+    aliases: frozenset = frozenset()
+
+
+def transcripts_collection():
+    """The Node server's videotranscripts collection, or None without MONGODB_URI"""
+    uri = os.getenv("MONGODB_URI")
+    if not uri:
+        return None
+    return MongoClient(uri, **MONGO_CLIENT_OPTIONS)[TRANSCRIPT_DB].videotranscripts
+
+
+def compact_segments(segments) -> List[CompactSegment]:
+    """Compact copies of TranscriptSegment models or raw Mongo segment dicts"""
+    if segments and isinstance(segments[0], dict):
+        return [CompactSegment(s.get("timestamp"), s["text"], s.get("speaker")) for s in segments]
+    return [CompactSegment(s.timestamp, s.text, s.speaker) for s in segments]
+
+
+class TranscriptCache:
+    """LRU of parsed transcripts by video id, loaded from Mongo on a miss or a digest mismatch"""
+
+    def __init__(self, collection=None, max_entries: int = TRANSCRIPT_CACHE_SIZE, ttl: int = TRANSCRIPT_CACHE_TTL):
+        self._collection = collection
+        self._collection_ready = collection is not None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, CachedTranscript]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "loads": 0, "not_found": 0, "evictions": 0, "mismatches": 0}
+
+    @property
+    def collection(self):
+        if not self._collection_ready:
+            self._collection = transcripts_collection()
+            self._collection_ready = True
+        return self._collection
+
+    def put(self, video_id: str, segments, digest: Optional[str] = None) -> CachedTranscript:
+        """Cache a transcript the caller already has (inline requests, ingestion)"""
+        compact = compact_segments(segments)
+        entry = CachedTranscript(digest or transcript_digest(compact), compact, time.monotonic())
+        with self.lock:
+            self.entries[video_id] = entry
+            self.entries.move_to_end(video_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    def _cached(self, video_id: str, expected_digest: Optional[str]) -> Optional[CachedTranscript]:
+        with self.lock:
+            entry = self.entries.get(video_id)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if expected_digest:
+                fresh = expected_digest == entry.digest or expected_digest in entry.aliases
+            else:
+                fresh = time.monotonic() - entry.loaded_at < self.ttl
+            if not fresh:
+                self.stats["refreshes"] += 1
+                return None
+            self.entries.move_to_end(video_id)
+            self.stats["hits"] += 1
+            return entry
+
+    def _load(self, video_id: str) -> Optional[Dict]:
+        if self.collection is None or not health_prober.is_ready("mongo"):
+            return None
+        try:
+            with mongo_timeout():
+                return self.collection.find_one(
+                    {"videoId": video_id}, {"_id": 0, "transcript.timestamp": 1, "transcript.text": 1}
+                )
+        except PyMongoError as e:
+            health_prober.mark_failure("mongo", e)
+            print(f"⚠️ Transcript load failed for video {video_id}: {e}")
+            return None
+
+    def get(self, video_id: str, expected_digest: Optional[str] = None) -> Optional[CachedTranscript]:
+        """The transcript for video_id, current as of expected_digest when one is given"""
+        entry = self._cached(video_id, expected_digest)
+        if entry:
+            return entry
+
+        document = self._load(video_id)
+        if not document or not document.get("transcript"):
+            with self.lock:
+                self.stats["not_found"] += 1
+            return None
+        with self.lock:
+            self.stats["loads"] += 1
+        entry = self.put(video_id, document["transcript"])
+        if expected_digest and expected_digest != entry.digest:
+            # The stored transcript is the source of truth; remember the caller's digest so we do not reload every call
+            print(f"⚠️ Transcript digest for video {video_id} is {entry.digest}, caller sent {expected_digest}")
+            with self.lock:
+                self.stats["mismatches"] += 1
+                entry = entry._replace(aliases=entry.aliases | {expected_digest})
+                self.entries[video_id] = entry
+        print(f"📼 Loaded transcript for video {video_id} ({len(entry.segments)} segments)")
+        return entry
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["refreshes"]
+            return {
+                **self.stats,
+                "entries": len(self.entries),
+                "segments": sum(len(entry.segments) for entry in self.entries.values()),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+transcript_cache = TranscriptCache()
+
+
+def resolve_transcript(request) -> bool:
+    """
+    Fill in request.transcript and request.transcript_digest for summarize/Q&A requests.
+    Inline transcripts are cached for later by-reference calls; returns False if the transcript cannot be found.
+    """
+    if request.transcript:
+        entry = transcript_cache.put(request.video_id, request.transcript)
+    else:
+        entry = transcript_cache.get(request.video_id, request.transcript_digest)
+        if entry is None:
+            return False
+        request.transcript = entry.segments
+    request.transcript_digest = entry.digest
+    return True
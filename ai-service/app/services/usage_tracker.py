@@ -0,0 +1,147 @@
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from app.utils.shared_state import state_backend
+from app.utils.token_budget import estimate_cost, estimate_tokens
+
+# Spend per course allowed in each window before generation switches to the local engines (0 disables)
+COURSE_BUDGET_USD = float(os.getenv("COURSE_BUDGET_USD", 0))
+COURSE_BUDGET_WINDOW_HOURS = float(os.getenv("COURSE_BUDGET_WINDOW_HOURS", 24))
+
+DIMENSIONS = ("route", "course", "user")
+COUNTERS = ("calls", "estimated_calls", "prompt_tokens", "cached_prompt_tokens", "completion_tokens", "cost_micro_usd")
+
+
+def extract_usage(response, prompt_text: str, completion_text: str) -> Tuple[int, int, bool]:
+    """(prompt_tokens, completion_tokens, estimated) from provider usage data or a local estimate"""
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        return usage.prompt_tokens, usage.completion_tokens or 0, False
+    # Gemini reports usage as usage_metadata on SDK versions that support it
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None and getattr(metadata, "prompt_token_count", None):
+        return metadata.prompt_token_count, getattr(metadata, "candidates_token_count", 0) or 0, False
+    return estimate_tokens(prompt_text), estimate_tokens(completion_text), True
+
+
+def extract_cached_tokens(response) -> int:
+    """Prompt tokens the provider served from a context cache"""
+    metadata = getattr(response, "usage_metadata", None)
+    return getattr(metadata, "cached_content_token_count", 0) or 0
+
+
+class UsageTracker:
+    """Token and cost counters by route, course and user, kept in the shared state backend"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.known = set()
+        self.lock = threading.Lock()
+
+    @property
+    def _backend(self):
+        return self.backend or state_backend
+
+    def _register(self, dimension: str, name: str) -> None:
+        """Add a name to the dimension's index the first time this worker sees it"""
+        with self.lock:
+            if (dimension, name) in self.known:
+                return
+            self.known.add((dimension, name))
+        # Atomic set-add: two workers registering different names at once must not overwrite each other
+        self._backend.update(
+            f"usage:index:{dimension}", lambda names: names if name in names else names + [name], []
+        )
+
+    def record(
+        self,
+        route: str,
+        model_name: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        course_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        estimated: bool = False,
+        cached_prompt_tokens: int = 0
+    ) -> float:
+        """Record one provider call and return its estimated cost in USD"""
+        cost = estimate_cost(model_name, prompt_tokens, completion_tokens, cached_prompt_tokens)
+        # Integer micro-dollars so the backend's atomic incr can be used across workers
+        values = {
+            "calls": 1,
+            "estimated_calls": int(estimated),
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_micro_usd": round(cost * 1_000_000),
+        }
+        for dimension, name in (("route", route), ("course", course_id), ("user", user_id)):
+            if not name:
+                continue
+            self._register(dimension, name)
+            for counter, value in values.items():
+                if value:
+                    self._backend.incr(f"usage:{dimension}:{name}:{counter}", value)
+
+        if course_id and values["cost_micro_usd"]:
+            self._backend.incr(
+                f"usage:budget:{course_id}:cost_micro_usd",
+                values["cost_micro_usd"],
+                ttl=COURSE_BUDGET_WINDOW_HOURS * 3600
+            )
+        print(
+            f"🧾 {route} {model_name}: {prompt_tokens} prompt"
+            f"{f' ({cached_prompt_tokens} cached)' if cached_prompt_tokens else ''} + {completion_tokens} completion tokens"
+            f"{' (estimated)' if estimated else ''} ≈ ${cost:.6f}"
+        )
+        return cost
+
+    def get_totals(self, dimension: str, name: str) -> Dict:
+        totals = {counter: self._backend.get(f"usage:{dimension}:{name}:{counter}", 0) for counter in COUNTERS}
+        totals["cost_usd"] = round(totals.pop("cost_micro_usd") / 1_000_000, 6)
+        return totals
+
+    def get_report(self, dimension: Optional[str] = None) -> Dict:
+        """Totals for every route, course and user seen so far"""
+        dimensions = [dimension] if dimension else DIMENSIONS
+        return {
+            d: {name: self.get_totals(d, name) for name in self._backend.get(f"usage:index:{d}", [])}
+            for d in dimensions
+        }
+
+    def course_budget(self, course_id: str) -> float:
+        return self._backend.get(f"usage:budget:{course_id}:limit_usd", COURSE_BUDGET_USD)
+
+    def set_course_budget(self, course_id: str, budget_usd: float) -> None:
+        self._backend.set(f"usage:budget:{course_id}:limit_usd", budget_usd)
+
+    def course_spend(self, course_id: str) -> float:
+        """USD spent by a course in the current budget window"""
+        return self._backend.get(f"usage:budget:{course_id}:cost_micro_usd", 0) / 1_000_000
+
+    def over_budget(self, course_id: Optional[str]) -> bool:
+        """True once a course has used its budget for the window"""
+        if not course_id:
+            return False
+        budget = self.course_budget(course_id)
+        if budget <= 0:
+            return False
+        if self.course_spend(course_id) >= budget:
+            print(f"💸 Course {course_id} is over its ${budget} budget - using local engines")
+            return True
+        return False
+
+    def get_course_budget_status(self, course_id: str) -> Dict:
+        budget = self.course_budget(course_id)
+        spent = self.course_spend(course_id)
+        return {
+            "course_id": course_id,
+            "budget_usd": budget,
+            "spent_usd": round(spent, 6),
+            "window_hours": COURSE_BUDGET_WINDOW_HOURS,
+            "over_budget": budget > 0 and spent >= budget,
+        }
+
+
+usage_tracker = UsageTracker()
@@ -1,32 +1,122 @@
-import os
+import asyncio
 from datetime import datetime
-from typing import Dict
-import google.generativeai as genai
+from typing import Dict, List, Optional, Tuple
 from app.models.video_models import SummarizationRequest, QARequest, SummaryResponse, QAResponse, TranscriptSegment
-from app.prompts.video_prompts import SUMMARIZATION_PROMPTS, QA_PROMPT
+from app.prompts.video_prompts import (
+    VIDEO_CONTEXT_INSTRUCTIONS, VIDEO_CONTEXT_PREFIX, VIDEO_PROMPT_BUDGET_TEMPLATE, SUMMARIZATION_TASKS, QA_TASK,
+    SECTION_NOTES_PROMPT, MERGE_NOTES_PROMPT, SUMMARY_FROM_NOTES_PREFIX
+)
 from app.utils.video_utils import extract_transcript_text, parse_ai_response, generate_fallback_summary, generate_fallback_answer
+from app.utils.token_budget import (
+    fit_transcript_to_budget, compress_transcript_lines, pack_lines, log_prompt_report, summary_output_tokens,
+    estimate_tokens, QA_OUTPUT_TOKENS
+)
+from app.services.usage_tracker import usage_tracker, extract_usage, extract_cached_tokens
+from app.services.health_prober import health_prober
+from app.services.provider_cassette import wrap_gemini_model
+from app.utils.shared_state import CircuitBreaker
+from app.utils.http_transport import get_gemini_model
+from app.utils.deadline import call_with_deadline, has_time_for_llm, DeadlineExceeded
+from app.utils.admission import admission_controller, provider_admitted
+from app.services.video_artifacts import video_artifacts, transcript_digest, select_windows, render_windows
+from app.services.context_cache import context_cache, CONTEXT_CACHE_MAX_TOKENS
+from app.services.summary_tree import summary_tree
 
 class VideoAIService:
     def __init__(self):
         self.model = None
         self.gemini_available = False
+        # Same circuit name as quiz generation: both routes call the same provider
+        self.circuit = CircuitBreaker("gemini")
         self._initialize_ai()
     
     def _initialize_ai(self):
         """Initialize Gemini AI"""
         try:
-            api_key = os.getenv("GEMINI_API_KEY")
-            if api_key and api_key != "your_gemini_api_key_here":
-                genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
+            # Same model object as quiz generation, so both share one gRPC channel
+            self.model = get_gemini_model('gemini-1.5-flash')
+            if self.model is not None:
                 print("✅ Video AI - Gemini configured successfully")
                 self.gemini_available = True
             else:
                 print("⚠️ Video AI - Gemini API key not found, using fallback mode")
         except Exception as e:
             print(f"⚠️ Video AI - Gemini configuration error: {e}")
+        
+        # Record/replay provider responses when PROVIDER_CASSETTE_MODE is set
+        self.model = wrap_gemini_model(self.model, "gemini-1.5-flash")
+        self.gemini_available = self.model is not None
+    
+    def _generate(self, prompt: str, route: str, request, max_output_tokens: int,
+                  cached: Optional[Tuple[object, int]] = None):
+        """Call Gemini, record the outcome on the shared circuit and account for usage"""
+        model, context_tokens = cached or (self.model, 0)
+        try:
+            with admission_controller.provider_call():
+                response = call_with_deadline(
+                    model.generate_content, prompt, generation_config={"max_output_tokens": max_output_tokens}
+                )
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            self.circuit.record_failure()
+            raise
+        self.circuit.record_success()
+        prompt_tokens, completion_tokens, estimated = extract_usage(response, prompt, response.text)
+        cached_tokens = extract_cached_tokens(response)
+        if estimated and context_tokens:
+            # The local estimate only sees the task suffix; the cached prefix is billed too
+            prompt_tokens, cached_tokens = prompt_tokens + context_tokens, context_tokens
+        usage_tracker.record(
+            route, "gemini-1.5-flash", prompt_tokens, completion_tokens,
+            request.course_id, request.user_id, estimated, cached_tokens
+        )
+        return response
+
+    @staticmethod
+    def _context_content(segments: List) -> Tuple[str, int]:
+        """The transcript part of the cached prefix, packed to the cache's larger budget"""
+        content = "TRANSCRIPT:\n" + pack_lines(compress_transcript_lines(segments), CONTEXT_CACHE_MAX_TOKENS)
+        return content, estimate_tokens(content)
+
+    def register_context(self, video_id: str, digest: str, segments: List) -> bool:
+        """Register a video's prefix with the provider cache ahead of its first summary or question"""
+        if not (self.gemini_available and context_cache.enabled):
+            return False
+        content, tokens = self._context_content(segments)
+        if not context_cache.eligible(tokens):
+            return False
+        return context_cache.register(video_id, digest, VIDEO_CONTEXT_INSTRUCTIONS, content, tokens) is not None
+
+    def _cached_context(self, request) -> Optional[Tuple[object, int]]:
+        """(model bound to the video's cached prefix, prefix tokens), or None to send the prefix inline"""
+        if not context_cache.enabled:
+            return None
+        content, tokens = self._context_content(request.transcript)
+        model = context_cache.cached_model(
+            request.video_id, request.transcript_digest or transcript_digest(request.transcript),
+            VIDEO_CONTEXT_INSTRUCTIONS, content, tokens
+        )
+        if model is None:
+            return None
+        print(f"📌 Using cached context for video {request.video_id} ({tokens} prefix tokens)")
+        return model, tokens
     
     async def summarize_transcript(self, request: SummarizationRequest) -> SummaryResponse:
+        """Serve the summary precomputed at ingestion, or generate it now"""
+        if not request.focus_area:
+            artifacts = await asyncio.to_thread(
+                video_artifacts.lookup, request.video_id, request.transcript_digest or transcript_digest(request.transcript)
+            )
+            cached = (artifacts or {}).get("summaries", {}).get(request.summary_type)
+            if cached:
+                print(f"📦 Serving precomputed {request.summary_type} summary for video {request.video_id}")
+                return SummaryResponse(**cached)
+        # build_summary blocks on Mongo and Gemini; a worker thread keeps the loop free for other requests, and
+        # to_thread copies the request deadline's contextvars along with it
+        return await asyncio.to_thread(self.build_summary, request)
+    
+    def build_summary(self, request: SummarizationRequest) -> SummaryResponse:
         """Generate summary from video transcript"""
         
         print(f"\n🎥 Summarizing video: {request.video_id}")
@@ -38,16 +128,29 @@ class VideoAIService:
         ai_powered = False
         
         # Try AI first if available
-        if self.gemini_available and self.model:
+        # Readiness is probed under the "gemini" name registered by the quiz generator
+        if self.gemini_available and self.model and health_prober.is_ready("gemini") and self.circuit.allow_request() \
+                and not usage_tracker.over_budget(request.course_id) and has_time_for_llm() and provider_admitted():
             try:
-                prompt_template = SUMMARIZATION_PROMPTS.get(
+                task = SUMMARIZATION_TASKS.get(
                     request.summary_type, 
-                    SUMMARIZATION_PROMPTS["detailed"]
-                )
-                prompt = prompt_template.format(transcript=transcript_text[:4000])
+                    SUMMARIZATION_TASKS["detailed"]
+                ).format()
+                cached = self._cached_context(request)
+                if cached:
+                    prompt = task
+                else:
+                    prompt_transcript, prompt_report = fit_transcript_to_budget(
+                        request.transcript, "gemini-1.5-flash", VIDEO_PROMPT_BUDGET_TEMPLATE
+                    )
+                    log_prompt_report("Summary", prompt_report)
+                    prompt = VIDEO_CONTEXT_PREFIX.format(transcript=prompt_transcript) + task
                 
                 print("🧠 Calling Gemini AI for summarization...")
-                response = self.model.generate_content(prompt)
+                response = self._generate(
+                    prompt, "video_summary", request, summary_output_tokens("gemini-1.5-flash", request.summary_type),
+                    cached
+                )
                 response_text = response.text
                 
                 summary_data = parse_ai_response(response_text)
@@ -80,6 +183,60 @@ class VideoAIService:
             ai_powered=ai_powered
         )
     
+    def _ai_ready(self, request) -> bool:
+        return self.gemini_available and self.model and health_prober.is_ready("gemini") and self.circuit.allow_request() \
+            and not usage_tracker.over_budget(request.course_id) and has_time_for_llm() and provider_admitted()
+
+    def _notes(self, prompt: str, request) -> Optional[Dict]:
+        """Section notes from Gemini, or None when it is unavailable or returns something unusable"""
+        if not self._ai_ready(request):
+            return None
+        response = self._generate(prompt, "video_summary", request, summary_output_tokens("gemini-1.5-flash", "section_notes"))
+        notes = parse_ai_response(response.text)
+        return notes if notes and notes.get("summary") else None
+
+    def section_notes(self, segments: List[TranscriptSegment], start: str, end: str, request) -> Optional[Dict]:
+        """Notes for one chunk of a long transcript"""
+        return self._notes(SECTION_NOTES_PROMPT.format(
+            start=start or "start", end=end or "end", transcript="\n".join(compress_transcript_lines(segments))
+        ), request)
+
+    def merge_section_notes(self, notes: str, start: str, end: str, request) -> Optional[Dict]:
+        """Condensed notes for a run of consecutive sections"""
+        return self._notes(MERGE_NOTES_PROMPT.format(notes=notes, start=start or "start", end=end or "end"), request)
+
+    def summary_from_notes(self, notes: str, summary_type: str, request) -> SummaryResponse:
+        """A summary of the requested type written from the whole video's section notes"""
+        if not self._ai_ready(request):
+            raise RuntimeError("Gemini is unavailable")
+        task = SUMMARIZATION_TASKS.get(summary_type, SUMMARIZATION_TASKS["detailed"]).format()
+        response = self._generate(
+            SUMMARY_FROM_NOTES_PREFIX.format(notes=notes) + task, "video_summary", request,
+            summary_output_tokens("gemini-1.5-flash", summary_type)
+        )
+        summary_data = parse_ai_response(response.text)
+        if not summary_data:
+            raise ValueError("unparseable summary")
+        return SummaryResponse(
+            video_id=request.video_id,
+            summary_type=summary_type,
+            summary=summary_data.get("summary", "Summary generated successfully"),
+            key_points=summary_data.get("key_points", []),
+            duration_covered="Full video",
+            generated_at=datetime.now().isoformat(),
+            ai_powered=True
+        )
+
+    async def build_summaries_incremental(self, request: SummarizationRequest, summary_types, previous_nodes: Optional[Dict],
+                                          run) -> Dict:
+        """Every summary type for a long transcript from the summary tree, reusing previous_nodes where unchanged"""
+        return await summary_tree.build(
+            request.transcript, summary_types, previous_nodes, run,
+            lambda segments, start, end: self.section_notes(segments, start, end, request),
+            lambda notes, start, end: self.merge_section_notes(notes, start, end, request),
+            lambda notes, summary_type: self.summary_from_notes(notes, summary_type, request),
+        )
+    
     async def answer_question(self, request: QARequest) -> QAResponse:
         """Answer questions based on video transcript"""
         
@@ -92,15 +249,40 @@ class VideoAIService:
         ai_powered = False
         
         # Try AI first if available
-        if self.gemini_available and self.model:
+        # Readiness is probed under the "gemini" name registered by the quiz generator
+        if self.gemini_available and self.model and health_prober.is_ready("gemini") and self.circuit.allow_request() \
+                and not usage_tracker.over_budget(request.course_id) and has_time_for_llm() and provider_admitted():
             try:
-                prompt = QA_PROMPT.format(
-                    transcript=transcript_text[:4000],
-                    question=request.question
-                )
+                task = QA_TASK.format(question=request.question)
+                # The cached prefix already covers up to CONTEXT_CACHE_MAX_TOKENS of transcript, so windows are
+                # only selected for the inline prefix
+                cached = await asyncio.to_thread(self._cached_context, request)
+                if cached:
+                    prompt = task
+                else:
+                    prompt_transcript, prompt_report = fit_transcript_to_budget(
+                        request.transcript, "gemini-1.5-flash", VIDEO_PROMPT_BUDGET_TEMPLATE
+                    )
+                    if prompt_report["compressed_tokens"] > prompt_report["budget_tokens"]:
+                        # Too long to send whole: use the ingested segment index to send the relevant
+                        # windows rather than only the opening minutes
+                        artifacts = await asyncio.to_thread(
+                            video_artifacts.lookup, request.video_id,
+                            request.transcript_digest or transcript_digest(request.transcript)
+                        )
+                        windows = select_windows(
+                            (artifacts or {}).get("segment_index", []), request.question, prompt_report["budget_tokens"]
+                        )
+                        if windows:
+                            prompt_transcript = render_windows(windows)
+                            prompt_report["final_tokens"] = estimate_tokens(prompt_transcript)
+                            print(f"🔎 Using {len(windows)} indexed transcript windows relevant to the question")
+                    log_prompt_report("Q&A", prompt_report)
+                    prompt = VIDEO_CONTEXT_PREFIX.format(transcript=prompt_transcript) + task
                 
                 print("🧠 Calling Gemini AI for Q&A...")
-                response = self.model.generate_content(prompt)
+                # Off the event loop, as in build_summary; to_thread keeps the request deadline's contextvars
+                response = await asyncio.to_thread(self._generate, prompt, "video_qa", request, QA_OUTPUT_TOKENS, cached)
                 response_text = response.text
                 
                 qa_data = parse_ai_response(response_text)
@@ -139,5 +321,6 @@ class VideoAIService:
             "service": "Video AI Service",
             "ai_available": self.gemini_available,
             "model": "gemini-1.5-flash" if self.gemini_available else "intelligent_fallback",
+            "circuit": self.circuit.get_state(),
             "features": ["summarization", "question-answering", "key-points-extraction"]
         }
\ No newline at end of file
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from app.models.video_models import TranscriptSegment
+from app.utils.token_budget import estimate_tokens, remove_fillers
+from app.services.health_prober import health_prober, MONGO_CLIENT_OPTIONS
+from app.utils.deadline import mongo_timeout
+
+# Transcript windows in the segment index; small enough that a few of them answer one question
+SEGMENT_WINDOW_TOKENS = int(os.getenv("SEGMENT_WINDOW_TOKENS", 150))
+TERMS_PER_WINDOW = 15
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = set(
+    "a an and are as at be been but by can could do does for from had has have how i if in into is it its "
+    "just like me more my no not now of on one or our so some such than that the their them then there these "
+    "they this to too up us very was we were what when where which who why will with would you your "
+    "going gonna want okay right really actually basically let see look today".split()
+)
+
+
+def transcript_digest(transcript: List[TranscriptSegment]) -> str:
+    """Stable digest of a transcript's timestamps and text, so edits invalidate precomputed artifacts"""
+    digest = hashlib.sha1()
+    for segment in transcript:
+        digest.update(f"{segment.timestamp or ''}\x1f{segment.text.strip()}\x1e".encode())
+    return digest.hexdigest()[:16]
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 2]
+
+
+def build_segment_index(transcript: List[TranscriptSegment], window_tokens: int = SEGMENT_WINDOW_TOKENS) -> List[Dict]:
+    """Group consecutive segments into windows with their time range and most frequent terms"""
+    windows, current, used = [], [], 0
+
+    def flush():
+        text = " ".join(remove_fillers(segment.text) for segment in current).strip()
+        if text:
+            windows.append({
+                "start": current[0].timestamp,
+                "end": current[-1].timestamp,
+                "text": text,
+                "tokens": estimate_tokens(text),
+                "terms": [term for term, _ in Counter(_terms(text)).most_common(TERMS_PER_WINDOW)],
+            })
+
+    for segment in transcript:
+        cost = estimate_tokens(segment.text)
+        if current and used + cost > window_tokens:
+            flush()
+            current, used = [], 0
+        current.append(segment)
+        used += cost
+    if current:
+        flush()
+    return windows
+
+
+def select_windows(index: List[Dict], question: str, max_tokens: int) -> List[Dict]:
+    """Windows most relevant to question that fit max_tokens, returned in playback order"""
+    query = set(_terms(question))
+    if not query:
+        return []
+    scored = []
+    for position, window in enumerate(index):
+        terms = set(window["terms"])
+        # Index terms weigh more than incidental mentions in the window text
+        score = 2 * len(query & terms) + len(query & set(_terms(window["text"])))
+        if score:
+            scored.append((score, position))
+
+    chosen, used = set(), 0
+    ranked = [position for _, position in sorted(scored, key=lambda item: (-item[0], item[1]))]
+    # Matching windows first, then their neighbours so answers keep the surrounding context
+    neighbours = [n for position in ranked for n in (position - 1, position + 1) if 0 <= n < len(index)]
+    for position in ranked + neighbours:
+        cost = index[position]["tokens"] + 4
+        if position in chosen or used + cost > max_tokens:
+            continue
+        chosen.add(position)
+        used += cost
+    return [index[position] for position in sorted(chosen)]
+
+
+def render_windows(windows: List[Dict]) -> str:
+    return "\n".join(f"[{w['start']}] {w['text']}" if w.get("start") else w["text"] for w in windows)
+
+
+class InMemoryArtifactStore:
+    """Local stand-in for the Mongo artifact store"""
+
+    def __init__(self):
+        self.documents: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        with self.lock:
+            document = self.documents.get(video_id)
+            return dict(document) if document else None
+
+    def save(self, document: Dict) -> None:
+        with self.lock:
+            self.documents[document["video_id"]] = dict(document)
+
+    def count(self) -> int:
+        with self.lock:
+            return len(self.documents)
+
+
+class MongoArtifactStore:
+    """Precomputed artifacts in Mongo, one document per video"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexes_ready = False
+
+    def _ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        self.collection.create_index("video_id", unique=True)
+        self._indexes_ready = True
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        self._ensure_indexes()
+        return self.collection.find_one({"video_id": video_id}, {"_id": 0})
+
+    def save(self, document: Dict) -> None:
+        self._ensure_indexes()
+        self.collection.replace_one({"video_id": document["video_id"]}, document, upsert=True)
+
+    def count(self) -> int:
+        return self.collection.count_documents({})
+
+
+def initialize_artifact_store():
+    """Use Mongo when configured, otherwise the in-memory stand-in"""
+    backend = os.getenv("VIDEO_ARTIFACT_BACKEND", "mongo" if os.getenv("MONGODB_URI") else "memory")
+    if backend == "mongo":
+        try:
+            client = MongoClient(os.getenv("MONGODB_URI"), **MONGO_CLIENT_OPTIONS)
+            print("✅ Video artifacts using MongoDB")
+            return MongoArtifactStore(client.video_ai_db.video_artifacts)
+        except Exception as e:
+            print(f"⚠️ Video artifact MongoDB error: {e} - using in-memory store")
+    else:
+        print("⚠️ Video artifacts using in-memory store")
+    return InMemoryArtifactStore()
+
+
+class VideoArtifacts:
+    """Summaries, segment index and starter questions precomputed for each transcript version"""
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else initialize_artifact_store()
+        self.stats = {"lookups": 0, "hits": 0, "stale": 0, "saved": 0}
+
+    def _usable(self) -> bool:
+        return isinstance(self.store, InMemoryArtifactStore) or health_prober.is_ready("mongo")
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        if not self._usable():
+            return None
+        try:
+            with mongo_timeout():
+                return self.store.get(video_id)
+        except PyMongoError as e:
+            health_prober.mark_failure("mongo", e)
+            print(f"⚠️ Video artifact lookup failed: {e}")
+            return None
+
+    def lookup(self, video_id: str, digest: str) -> Optional[Dict]:
+        """Artifacts for this exact transcript version, or None"""
+        self.stats["lookups"] += 1
+        document = self.get(video_id)
+        if not document:
+            return None
+        if document.get("transcript_digest") != digest:
+            # The transcript changed since ingestion; the next ingest run refreshes it
+            self.stats["stale"] += 1
+            return None
+        self.stats["hits"] += 1
+        return document
+
+    def save(self, document: Dict) -> bool:
+        document = {**document, "updated_at": datetime.now(timezone.utc).isoformat()}
+        try:
+            with mongo_timeout():
+                self.store.save(document)
+            self.stats["saved"] += 1
+            return True
+        except PyMongoError as e:
+            health_prober.mark_failure("mongo", e)
+            print(f"⚠️ Failed to save video artifacts: {e}")
+            return False
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["lookups"] or 1
+        return {**self.stats, "hit_rate": round(self.stats["hits"] / lookups, 3)}
+
+
+video_artifacts = VideoArtifacts()
@@ -0,0 +1,178 @@
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Provider calls in flight in this worker before interactive requests are answered locally
+ADMISSION_MAX_PROVIDER_CALLS = int(os.getenv("ADMISSION_MAX_PROVIDER_CALLS", 24))
+# Batch work is turned away earlier, leaving the remaining headroom to students
+ADMISSION_BATCH_MAX_PROVIDER_CALLS = int(os.getenv("ADMISSION_BATCH_MAX_PROVIDER_CALLS", 12))
+# Latency objective for interactive requests; degradation starts once the predicted latency nears it
+ADMISSION_SLO_MS = float(os.getenv("ADMISSION_SLO_MS", 8000))
+ADMISSION_SLO_RISK = float(os.getenv("ADMISSION_SLO_RISK", 0.8))
+# Queue wait above this sheds batch work even while the SLO still holds
+ADMISSION_BATCH_QUEUE_WAIT_MS = float(os.getenv("ADMISSION_BATCH_QUEUE_WAIT_MS", 500))
+ADMISSION_WINDOW_SECONDS = float(os.getenv("ADMISSION_WINDOW_SECONDS", 10))
+ADMISSION_MIN_SAMPLES = int(os.getenv("ADMISSION_MIN_SAMPLES", 5))
+# Share of interactive requests still sent to the providers while degraded, so recovery is noticed
+ADMISSION_PROBE_RATE = float(os.getenv("ADMISSION_PROBE_RATE", 0.1))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 15))
+LOOP_LAG_INTERVAL = 0.05
+
+DEGRADED_HEADER = "X-Degraded-Mode"
+INTERACTIVE_PATHS = (
+    "/api/ai/generate-quiz",
+    "/api/ai/generate-quiz-from-file",
+    # Degraded grading still returns every local grade; only the LLM regrading is skipped
+    "/api/ai/grade-short-answers",
+    "/api/chatbot/chat",
+    "/api/video-ai/summarize",
+    "/api/video-ai/ask-question",
+)
+BATCH_PATHS = ("/api/video-ai/ingest",)
+
+_degraded: contextvars.ContextVar[bool] = contextvars.ContextVar("admission_degraded", default=False)
+
+
+def request_class(method: str, path: str) -> Optional[str]:
+    """'interactive', 'batch' or None for requests that never call a provider"""
+    if method != "POST":
+        return None
+    path = path.rstrip("/")
+    if path in INTERACTIVE_PATHS:
+        return "interactive"
+    if path in BATCH_PATHS:
+        return "batch"
+    return None
+
+
+def _p90(values) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * 0.9), len(ordered) - 1)] if ordered else 0.0
+
+
+class AdmissionController:
+    """
+    Per-worker admission decisions from in-flight provider calls, queue wait (provider calls waiting
+    for a thread, and event-loop lag) and recent provider latency.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.calls: Deque[Tuple[float, float]] = deque(maxlen=2000)
+        self.waits: Deque[Tuple[float, float]] = deque(maxlen=2000)
+        self.lock = threading.Lock()
+        self.monitor_task: Optional[asyncio.Task] = None
+        self.stats = {"admitted": 0, "degraded": 0, "probes": 0, "shed": 0}
+
+    @contextmanager
+    def provider_call(self):
+        """Count a provider call as in flight and record how long it took"""
+        started = time.monotonic()
+        with self.lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            with self.lock:
+                self.in_flight -= 1
+                self.calls.append((finished, finished - started))
+
+    def record_queue_wait(self, seconds: float) -> None:
+        with self.lock:
+            self.waits.append((time.monotonic(), seconds))
+
+    async def _monitor_loop_lag(self) -> None:
+        """Lag of a short sleep is how long a new request waits for the event loop"""
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self.record_queue_wait(max(time.monotonic() - started - LOOP_LAG_INTERVAL, 0))
+
+    async def start(self) -> None:
+        if ADMISSION_ENABLED and self.monitor_task is None:
+            self.monitor_task = asyncio.create_task(self._monitor_loop_lag())
+
+    async def stop(self) -> None:
+        if self.monitor_task is not None:
+            self.monitor_task.cancel()
+            self.monitor_task = None
+
+    def pressure(self) -> Dict:
+        cutoff = time.monotonic() - ADMISSION_WINDOW_SECONDS
+        with self.lock:
+            latencies = [seconds for at, seconds in self.calls if at >= cutoff]
+            waits = [seconds for at, seconds in self.waits if at >= cutoff]
+            in_flight = self.in_flight
+        queue_wait_ms = _p90(waits) * 1000
+        latency_ms = _p90(latencies) * 1000
+        # Too few recent calls to predict from; the in-flight cap still applies
+        predicted_ms = queue_wait_ms + latency_ms if len(latencies) >= ADMISSION_MIN_SAMPLES else queue_wait_ms
+        return {
+            "in_flight": in_flight,
+            "queue_wait_p90_ms": round(queue_wait_ms, 1),
+            "provider_latency_p90_ms": round(latency_ms, 1),
+            "recent_provider_calls": len(latencies),
+            "predicted_ms": round(predicted_ms, 1),
+            "slo_at_risk": predicted_ms >= ADMISSION_SLO_MS * ADMISSION_SLO_RISK,
+        }
+
+    def decide(self, kind: str) -> str:
+        """'admit', 'degrade' (answer from the local engines) or 'shed' (503) for a request class"""
+        if not ADMISSION_ENABLED:
+            return "admit"
+        pressure = self.pressure()
+        if kind == "batch":
+            if pressure["slo_at_risk"] or pressure["in_flight"] >= ADMISSION_BATCH_MAX_PROVIDER_CALLS \
+                    or pressure["queue_wait_p90_ms"] >= ADMISSION_BATCH_QUEUE_WAIT_MS:
+                self.stats["shed"] += 1
+                return "shed"
+        elif pressure["slo_at_risk"] or pressure["in_flight"] >= ADMISSION_MAX_PROVIDER_CALLS:
+            if random.random() >= ADMISSION_PROBE_RATE or pressure["in_flight"] >= ADMISSION_MAX_PROVIDER_CALLS:
+                self.stats["degraded"] += 1
+                return "degrade"
+            self.stats["probes"] += 1
+        self.stats["admitted"] += 1
+        return "admit"
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            **self.pressure(),
+            "enabled": ADMISSION_ENABLED,
+            "slo_ms": ADMISSION_SLO_MS,
+            "max_provider_calls": ADMISSION_MAX_PROVIDER_CALLS,
+            "batch_max_provider_calls": ADMISSION_BATCH_MAX_PROVIDER_CALLS,
+        }
+
+
+admission_controller = AdmissionController()
+
+
+def degraded_mode() -> bool:
+    """True when admission control routed this request to the local engines"""
+    return _degraded.get()
+
+
+def provider_admitted() -> bool:
+    """Gate for provider calls next to the circuit and deadline checks"""
+    if _degraded.get():
+        print("🚦 Worker is under load - answering with the local engine")
+        return False
+    return True
+
+
+@contextmanager
+def degraded_scope(degraded: bool):
+    token = _degraded.set(degraded)
+    try:
+        yield
+    finally:
+        _degraded.reset(token)
@@ -0,0 +1,172 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+import pymongo
+
+from app.utils.admission import admission_controller
+
+# Budget in milliseconds sent by the caller (the Node server sets it just under its own axios timeout)
+DEADLINE_HEADER = "x-request-timeout-ms"
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("DEFAULT_DEADLINE_SECONDS", 30))
+MAX_DEADLINE_SECONDS = float(os.getenv("MAX_DEADLINE_SECONDS", 120))
+# Per-route defaults when the caller sends no header
+ROUTE_DEADLINES = {
+    "/api/ai/generate-quiz": float(os.getenv("QUIZ_DEADLINE_SECONDS", 45)),
+    "/api/ai/generate-quiz-from-file": float(os.getenv("QUIZ_FILE_DEADLINE_SECONDS", 90)),
+    "/api/ai/grade-short-answers": float(os.getenv("GRADING_DEADLINE_SECONDS", 60)),
+    "/api/chatbot/chat": float(os.getenv("CHAT_DEADLINE_SECONDS", 25)),
+    "/api/video-ai/summarize": float(os.getenv("SUMMARY_DEADLINE_SECONDS", 30)),
+    "/api/video-ai/ask-question": float(os.getenv("QA_DEADLINE_SECONDS", 20)),
+}
+# Work that is meant to outlive the request
+UNBOUNDED_PATHS = ("/api/video-ai/ingest", "/api/admin/profile")
+# Least time worth starting a provider call with; below this the local fallback answers instead
+LLM_ATTEMPT_SECONDS = float(os.getenv("DEADLINE_LLM_ATTEMPT_SECONDS", 4))
+# Held back from every provider timeout so the fallback can still be built and sent
+RESPONSE_RESERVE_SECONDS = float(os.getenv("DEADLINE_RESERVE_SECONDS", 0.5))
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_HTTP_READ_TIMEOUT", 60))
+# Same per-operation limit the Mongo clients are configured with (MONGO_CLIENT_OPTIONS)
+MONGO_OPERATION_SECONDS = int(os.getenv("MONGO_TIMEOUT_MS", 2000)) / 1000
+
+deadline_stats = {"requests": 0, "from_header": 0, "early_fallbacks": 0, "provider_timeouts": 0, "expired": 0}
+_stats_lock = threading.Lock()
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the work finished"""
+
+
+class Deadline:
+    def __init__(self, seconds: float, source: str):
+        self.seconds = seconds
+        self.source = source
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("request_deadline", default=None)
+# SDKs without a per-call timeout (google-generativeai 0.3.1) run here so the caller can stop waiting
+_deadline_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DEADLINE_POOL_WORKERS", 16)), thread_name_prefix="deadline-call"
+)
+
+
+def record_deadline_event(event: str) -> None:
+    with _stats_lock:
+        deadline_stats[event] += 1
+
+
+def get_deadline_stats() -> Dict:
+    with _stats_lock:
+        return dict(deadline_stats)
+
+
+def resolve_deadline(path: str, header_value: Optional[str]) -> Optional[Deadline]:
+    """The deadline for a request: the caller's header, else the route default"""
+    if path.startswith(UNBOUNDED_PATHS):
+        return None
+    if header_value:
+        try:
+            seconds = float(header_value) / 1000
+            if seconds > 0:
+                return Deadline(min(seconds, MAX_DEADLINE_SECONDS), "header")
+        except ValueError:
+            pass
+    return Deadline(ROUTE_DEADLINES.get(path.rstrip("/"), DEFAULT_DEADLINE_SECONDS), "default")
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def remaining_seconds() -> Optional[float]:
+    """Seconds left for work in this request after the response reserve, or None outside a deadline"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline.remaining() - RESPONSE_RESERVE_SECONDS
+
+
+def deadline_expired() -> bool:
+    """True once a deadline is set and nothing is left of it but the response reserve"""
+    remaining = remaining_seconds()
+    return remaining is not None and remaining <= 0
+
+
+def has_time_for_llm(seconds: float = LLM_ATTEMPT_SECONDS) -> bool:
+    """False once the remaining budget cannot fit another provider attempt"""
+    remaining = remaining_seconds()
+    if remaining is None or remaining >= seconds:
+        return True
+    record_deadline_event("early_fallbacks")
+    print(f"⏱️ {max(remaining, 0):.1f}s left in the request budget - skipping the provider call")
+    return False
+
+
+def provider_timeout(default: float = PROVIDER_TIMEOUT_SECONDS) -> float:
+    """Timeout for one provider call: the default, cut to what is left of the deadline"""
+    remaining = remaining_seconds()
+    if remaining is None:
+        return default
+    if remaining <= 0:
+        record_deadline_event("provider_timeouts")
+        raise DeadlineExceeded("request deadline passed before the provider call")
+    return min(default, remaining)
+
+
+def call_with_deadline(fn, *args, **kwargs):
+    """Run a blocking SDK call that takes no timeout, and stop waiting for it when the deadline passes"""
+    if _current_deadline.get() is None:
+        return fn(*args, **kwargs)
+    timeout = provider_timeout()
+    submitted = time.monotonic()
+
+    def run():
+        # Time spent waiting for a pool thread is queue wait for admission control
+        admission_controller.record_queue_wait(time.monotonic() - submitted)
+        return fn(*args, **kwargs)
+
+    # The abandoned call finishes in the background; the request has already moved on to its fallback
+    future = _deadline_pool.submit(contextvars.copy_context().run, run)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        record_deadline_event("provider_timeouts")
+        raise DeadlineExceeded(f"provider call did not finish within {timeout:.1f}s")
+
+
+def mongo_timeout():
+    """
+    pymongo.timeout for the operations in the block: the usual Mongo limit, cut to what is left of the deadline.
+    Scoped per operation because a pymongo timeout also replaces serverSelectionTimeoutMS, so a request-wide
+    one would make an unreachable Mongo hang for the whole budget instead of failing fast.
+    """
+    remaining = remaining_seconds()
+    if remaining is None:
+        return nullcontext()
+    return pymongo.timeout(max(min(remaining, MONGO_OPERATION_SECONDS), 0.001))
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """Apply a deadline to this context and the threads it starts"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def release_deadline() -> None:
+    """Lift the deadline for the rest of this context, e.g. background tasks that run after the response"""
+    _current_deadline.set(None)
@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+# Per-host pool limits: each provider host gets its own pool so a slow one cannot starve the others
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("PROVIDER_HTTP_MAX_CONNECTIONS", 20))
+MAX_KEEPALIVE_PER_HOST = int(os.getenv("PROVIDER_HTTP_MAX_KEEPALIVE", 10))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("PROVIDER_HTTP_KEEPALIVE_EXPIRY", 60))
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_HTTP_READ_TIMEOUT", 60))
+POOL_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_HTTP_POOL_TIMEOUT", 10))
+HTTP2_REQUESTED = os.getenv("PROVIDER_HTTP2", "true").lower() == "true"
+
+PROVIDER_HOSTS = ("https://api.groq.com", "https://api.openai.com")
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class TransportStats:
+    """Connection reuse and pool wait counters per host, fed by httpcore trace events"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, Dict] = {}
+
+    def _host(self, host: str) -> Dict:
+        return self.hosts.setdefault(host, {
+            "requests": 0, "reused_connections": 0, "new_connections": 0, "tls_handshakes": 0,
+            "saturated_requests": 0, "failed_connects": 0, "pool_wait_ms_total": 0.0, "pool_wait_ms_max": 0.0,
+        })
+
+    def start_request(self, host: str, saturated: bool) -> None:
+        with self.lock:
+            stats = self._host(host)
+            stats["requests"] += 1
+            stats["saturated_requests"] += int(saturated)
+
+    def record_connect(self, host: str, event: str) -> None:
+        with self.lock:
+            self._host(host)[event] += 1
+
+    def record_dispatch(self, host: str, reused: bool, waited_ms: float) -> None:
+        """A request got a connection: reused from the pool or freshly opened"""
+        with self.lock:
+            stats = self._host(host)
+            stats["reused_connections" if reused else "new_connections"] += 1
+            stats["pool_wait_ms_total"] += waited_ms
+            stats["pool_wait_ms_max"] = max(stats["pool_wait_ms_max"], waited_ms)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            report = {}
+            for host, stats in self.hosts.items():
+                dispatched = stats["reused_connections"] + stats["new_connections"]
+                report[host] = {
+                    **stats,
+                    "pool_wait_ms_total": round(stats["pool_wait_ms_total"], 1),
+                    "pool_wait_ms_max": round(stats["pool_wait_ms_max"], 1),
+                    "reuse_ratio": round(stats["reused_connections"] / dispatched, 3) if dispatched else 0.0,
+                }
+            return report
+
+    def reset(self) -> None:
+        with self.lock:
+            self.hosts = {}
+
+
+transport_stats = TransportStats()
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def _pool_for(client: httpx.Client, url: httpx.URL):
+    """The httpcore pool that will serve url (private attributes, so best effort)"""
+    try:
+        return client._transport_for_url(url)._pool
+    except AttributeError:
+        return None
+
+
+def _pool_usage(pool) -> Dict:
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for c in connections if c.is_idle())
+    return {
+        "connections": len(connections),
+        "idle": idle,
+        "active": len(connections) - idle,
+        "queued_requests": sum(1 for r in getattr(pool, "_requests", []) if r.is_queued()),
+        "max_connections": pool._max_connections,
+    }
+
+
+def _trace_request(client: httpx.Client, stats: TransportStats, request: httpx.Request) -> None:
+    """Request hook: count saturation now and hand httpcore a trace callback for this request"""
+    host = request.url.host
+    pool = _pool_for(client, request.url)
+    saturated = False
+    if pool is not None:
+        connections = list(pool.connections)
+        saturated = sum(1 for c in connections if not c.is_idle()) >= pool._max_connections
+    stats.start_request(host, saturated)
+
+    started = time.perf_counter()
+    state = {"dispatched": False}
+
+    def trace(event_name: str, info: dict) -> None:
+        # Whichever comes first tells us how the request was served: a new TCP connect or a pooled one
+        if event_name == "connection.connect_tcp.started" and not state["dispatched"]:
+            state["dispatched"] = True
+            stats.record_dispatch(host, False, (time.perf_counter() - started) * 1000)
+        elif event_name == "connection.connect_tcp.failed":
+            stats.record_connect(host, "failed_connects")
+        elif event_name == "connection.start_tls.complete":
+            stats.record_connect(host, "tls_handshakes")
+        elif event_name.endswith("send_request_headers.started") and not state["dispatched"]:
+            state["dispatched"] = True
+            stats.record_dispatch(host, True, (time.perf_counter() - started) * 1000)
+
+    request.extensions["trace"] = trace
+
+
+def _build_transport(http2: bool, verify: bool) -> httpx.HTTPTransport:
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections=MAX_KEEPALIVE_PER_HOST,
+        keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+    )
+    return httpx.HTTPTransport(limits=limits, http2=http2, retries=1, verify=verify)
+
+
+def build_http_client(stats: TransportStats = transport_stats, verify: bool = True) -> httpx.Client:
+    """A client with one keep-alive pool per provider host"""
+    http2 = HTTP2_REQUESTED and HTTP2_AVAILABLE
+    if HTTP2_REQUESTED and not HTTP2_AVAILABLE:
+        print("⚠️ PROVIDER_HTTP2 is on but the h2 package is missing - provider calls use HTTP/1.1 keep-alive")
+    timeout = httpx.Timeout(READ_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS, pool=POOL_TIMEOUT_SECONDS)
+    client = httpx.Client(
+        timeout=timeout,
+        transport=_build_transport(http2, verify),
+        mounts={host: _build_transport(http2, verify) for host in PROVIDER_HOSTS},
+    )
+    client.event_hooks = {"request": [lambda request: _trace_request(client, stats, request)]}
+    return client
+
+
+def get_http_client() -> httpx.Client:
+    """The process-wide client every provider SDK is given, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = build_http_client()
+            print(
+                f"🔌 Shared provider HTTP pool ready ({MAX_CONNECTIONS_PER_HOST} connections/host, "
+                f"{'HTTP/2' if HTTP2_REQUESTED and HTTP2_AVAILABLE else 'HTTP/1.1'})"
+            )
+        return _client
+
+
+def close_http_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def get_transport_stats() -> Dict:
+    """Reuse counters plus current pool occupancy for every provider host seen so far"""
+    report = {
+        "http2": HTTP2_REQUESTED and HTTP2_AVAILABLE,
+        "max_connections_per_host": MAX_CONNECTIONS_PER_HOST,
+        "keepalive_expiry_seconds": KEEPALIVE_EXPIRY_SECONDS,
+        "hosts": transport_stats.snapshot(),
+    }
+    client = _client
+    if client is not None and not client.is_closed:
+        for host, stats in report["hosts"].items():
+            pool = _pool_for(client, httpx.URL(f"https://{host}"))
+            if pool is not None:
+                stats["pool"] = _pool_usage(pool)
+    return report
+
+
+_gemini_models: Dict[str, object] = {}
+
+
+def get_gemini_model(model_name: str = "gemini-1.5-flash"):
+    """
+    One shared GenerativeModel per model name, or None without an API key.
+    Gemini talks gRPC, which already multiplexes calls over a single HTTP/2 channel; configuring
+    the SDK once keeps every route on that channel instead of rebuilding it per service object.
+    """
+    with _client_lock:
+        if model_name in _gemini_models:
+            return _gemini_models[model_name]
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key or api_key == "your_gemini_api_key_here":
+            return None
+        import google.generativeai as genai
+        if not _gemini_models:
+            genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(model_name)
+        _gemini_models[model_name] = model
+        return model
@@ -0,0 +1,283 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from app.utils.deadline import mongo_timeout
+
+# memory (single worker) | sqlite (workers on one host) | mongo (across nodes)
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "memory").lower()
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "/tmp/skillnest_ai_state.db")
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+
+class InProcessBackend:
+    """Plain dictionary state, only valid for a single worker"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.data: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self.data[key]
+                return default
+            return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self.lock:
+            self.data[key] = (_encode(value), expires_at)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self.lock:
+            entry = self.data.get(key)
+            current = 0
+            expires_at = time.time() + ttl if ttl else None
+            if entry is not None and (entry[1] is None or entry[1] >= time.time()):
+                current = json.loads(entry[0])
+                expires_at = entry[1]
+            current += amount
+            self.data[key] = (json.dumps(current), expires_at)
+            return current
+
+    def update(self, key: str, fn: Callable[[Any], Any], default: Any = None, ttl: Optional[float] = None) -> Any:
+        """Store fn(current value) atomically and return it"""
+        with self.lock:
+            entry = self.data.get(key)
+            expired = entry is None or (entry[1] is not None and entry[1] < time.time())
+            value = fn(default if expired else json.loads(entry[0]))
+            self.data[key] = (_encode(value), time.time() + ttl if ttl else None)
+            return value
+
+
+class SQLiteBackend:
+    """State in a WAL-mode SQLite file shared by every worker on the host"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM state WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, _encode(value), time.time() + ttl if ttl else None),
+        )
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        connection = self._connection()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock so concurrent workers cannot lose increments
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT value, expires_at FROM state WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                current, expires_at = 0, now + ttl if ttl else None
+            else:
+                current, expires_at = json.loads(row[0]), row[1]
+            current += amount
+            connection.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(current), expires_at),
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return current
+
+    def update(self, key: str, fn: Callable[[Any], Any], default: Any = None, ttl: Optional[float] = None) -> Any:
+        """Store fn(current value) atomically and return it"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT value, expires_at FROM state WHERE key = ?", (key,)).fetchone()
+            expired = row is None or (row[1] is not None and row[1] < time.time())
+            value = fn(default if expired else json.loads(row[0]))
+            connection.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, _encode(value), time.time() + ttl if ttl else None),
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+
+class MongoBackend:
+    """State in a Mongo collection with a TTL index, shared across nodes"""
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.collection.create_index("expiresAt", expireAfterSeconds=0)
+
+    @staticmethod
+    def _expires_at(ttl: Optional[float]) -> Optional[datetime]:
+        # Mongo's TTL monitor reads dates as UTC
+        return datetime.now(timezone.utc) + timedelta(seconds=ttl) if ttl else None
+
+    @staticmethod
+    def _expired(document: Optional[Dict]) -> bool:
+        # The TTL monitor runs once a minute, so expiry is also checked on read
+        expires_at = document.get("expiresAt") if document else None
+        if expires_at is None:
+            return False
+        # pymongo returns naive datetimes that hold UTC unless the client is tz_aware
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at < datetime.now(timezone.utc)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with mongo_timeout():
+            document = self.collection.find_one({"_id": key})
+        if document is None or self._expired(document):
+            return default
+        # Counters written by incr keep their number in a field of their own
+        return json.loads(document["value"]) if "value" in document else document.get("counter", default)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = self._expires_at(ttl)
+        with mongo_timeout():
+            self.collection.replace_one(
+                {"_id": key}, {"_id": key, "value": _encode(value), "expiresAt": expires_at}, upsert=True
+            )
+
+    def delete(self, key: str) -> None:
+        with mongo_timeout():
+            self.collection.delete_one({"_id": key})
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        from pymongo import ReturnDocument
+        with mongo_timeout():
+            document = self.collection.find_one_and_update(
+                {"_id": key},
+                {"$inc": {"counter": amount},
+                 "$setOnInsert": {"expiresAt": self._expires_at(ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        if self._expired(document):
+            self.delete(key)
+            return self.incr(key, amount, ttl)
+        return document["counter"]
+
+    def update(self, key: str, fn: Callable[[Any], Any], default: Any = None, ttl: Optional[float] = None) -> Any:
+        """Store fn(current value) atomically and return it. fn may run more than once when workers race."""
+        from pymongo.errors import DuplicateKeyError
+        while True:
+            with mongo_timeout():
+                document = self.collection.find_one({"_id": key})
+            expired = document is None or self._expired(document)
+            value = fn(default if expired else json.loads(document["value"]))
+            replacement = {"_id": key, "value": _encode(value), "expiresAt": self._expires_at(ttl)}
+            with mongo_timeout():
+                if document is None:
+                    try:
+                        self.collection.insert_one(replacement)
+                        return value
+                    except DuplicateKeyError:
+                        continue
+                # Compare-and-swap on the value that was read; another worker's write makes this match nothing
+                if self.collection.replace_one({"_id": key, "value": document["value"]}, replacement).matched_count:
+                    return value
+
+
+def initialize_state_backend():
+    """Create the configured shared state backend"""
+    try:
+        if SHARED_STATE_BACKEND == "sqlite":
+            backend = SQLiteBackend(SHARED_STATE_PATH)
+            print(f"✅ Shared state using SQLite at {SHARED_STATE_PATH}")
+            return backend
+        if SHARED_STATE_BACKEND == "mongo":
+            from pymongo import MongoClient
+            client = MongoClient(os.getenv("MONGODB_URI"), serverSelectionTimeoutMS=3000)
+            backend = MongoBackend(client.ai_service_state.state)
+            print("✅ Shared state using MongoDB")
+            return backend
+    except Exception as e:
+        print(f"⚠️ Shared state backend '{SHARED_STATE_BACKEND}' error: {e} - using in-process state")
+    return InProcessBackend()
+
+
+state_backend = initialize_state_backend()
+
+
+class CircuitBreaker:
+    """Provider circuit breaker whose failure count and open state live in the shared backend"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30, backend=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.backend = backend
+
+    @property
+    def _backend(self):
+        return self.backend or state_backend
+
+    def allow_request(self) -> bool:
+        """False while the circuit is open"""
+        return self._backend.get(f"circuit:{self.name}:open") is None
+
+    def record_success(self) -> None:
+        self._backend.delete(f"circuit:{self.name}:failures")
+
+    def record_failure(self) -> None:
+        failures = self._backend.incr(f"circuit:{self.name}:failures", ttl=self.reset_seconds)
+        if failures >= self.failure_threshold:
+            print(f"🔌 Circuit for {self.name} opened after {failures} failures")
+            self._backend.set(f"circuit:{self.name}:open", True, ttl=self.reset_seconds)
+            self._backend.delete(f"circuit:{self.name}:failures")
+
+    def get_state(self) -> Dict:
+        return {
+            "open": not self.allow_request(),
+            "recent_failures": self._backend.get(f"circuit:{self.name}:failures", 0),
+        }
@@ -0,0 +1,297 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from app.models.video_models import TranscriptSegment
+from app.utils.video_utils import extract_transcript_text
+
+# Per-model context windows, default prompt budgets and pricing (USD per 1K tokens)
+MODEL_PROFILES: Dict[str, Dict] = {
+    "gemini-1.5-flash": {
+        "context_tokens": 1_000_000,
+        "max_output_tokens": 8192,
+        "prompt_budget_tokens": 12000,
+        "input_cost_per_1k": 0.000075,
+        # Prompt tokens served from a context cache are billed at a quarter of the input price
+        "cached_input_cost_per_1k": 0.00001875,
+        "cache_storage_cost_per_1m_token_hour": 1.0,
+        "output_cost_per_1k": 0.0003,
+    },
+    "llama-3.1-8b-instant": {
+        "context_tokens": 131072,
+        "max_output_tokens": 8192,
+        "prompt_budget_tokens": 6000,
+        "input_cost_per_1k": 0.00005,
+        "output_cost_per_1k": 0.00008,
+    },
+    "gpt-3.5-turbo": {
+        "context_tokens": 16385,
+        "max_output_tokens": 4096,
+        "prompt_budget_tokens": 8000,
+        "input_cost_per_1k": 0.0005,
+        "output_cost_per_1k": 0.0015,
+    },
+}
+
+# Output tokens one generated question needs, including JSON keys and the explanation
+OUTPUT_TOKENS_PER_QUESTION = {"mcq": 130, "true_false": 75, "short_answer": 95}
+SUMMARY_OUTPUT_TOKENS = {"brief": 350, "key_points": 600, "detailed": 1000, "section_notes": 300}
+QA_OUTPUT_TOKENS = 400
+CHAT_OUTPUT_TOKENS = {"short": 160, "default": 300, "explain": 500}
+OUTPUT_HEADROOM = 1.25
+
+DEFAULT_PROFILE = {
+    "context_tokens": 8192,
+    "max_output_tokens": 2048,
+    "prompt_budget_tokens": 4000,
+    "input_cost_per_1k": 0.0,
+    "output_cost_per_1k": 0.0,
+}
+
+# Word pieces of up to 4 characters approximate BPE tokenizers closely enough for budgeting
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_PLACEHOLDER_RE = re.compile(r"(?<!\{)\{[a-z_]+\}(?!\})")
+_FILLER_RE = re.compile(
+    r"\b(?:um+|uh+|erm+|hmm+|ah+|you know|i mean|basically|so yeah)\b[,]?\s*",
+    re.IGNORECASE,
+)
+
+
+def get_model_profile(model_name: str) -> Dict:
+    """Get context and cost profile for a model"""
+    return MODEL_PROFILES.get(model_name, DEFAULT_PROFILE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate without a tokenizer"""
+    if not text:
+        return 0
+    return len(_TOKEN_RE.findall(text))
+
+
+def estimate_cost(model_name: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> float:
+    """Estimate USD cost of a call from token counts; cached_prompt_tokens are part of prompt_tokens"""
+    profile = get_model_profile(model_name)
+    cached_rate = profile.get("cached_input_cost_per_1k", profile["input_cost_per_1k"])
+    return ((prompt_tokens - cached_prompt_tokens) / 1000) * profile["input_cost_per_1k"] + \
+        (cached_prompt_tokens / 1000) * cached_rate + \
+        (completion_tokens / 1000) * profile["output_cost_per_1k"]
+
+
+def _cap_output(model_name: str, tokens: float) -> int:
+    return min(int(tokens), get_model_profile(model_name)["max_output_tokens"])
+
+
+def quiz_output_tokens(model_name: str, question_count: int, question_types: List[str]) -> int:
+    """max_tokens sized to the number and types of questions requested"""
+    types = question_types or ["mcq"]
+    per_question = sum(OUTPUT_TOKENS_PER_QUESTION.get(t, 130) for t in types) / len(types)
+    return _cap_output(model_name, question_count * per_question * OUTPUT_HEADROOM + 64)
+
+
+def summary_output_tokens(model_name: str, summary_type: str) -> int:
+    """max_tokens for a video summary of the given type"""
+    return _cap_output(model_name, SUMMARY_OUTPUT_TOKENS.get(summary_type, SUMMARY_OUTPUT_TOKENS["detailed"]) * OUTPUT_HEADROOM)
+
+
+def chat_output_tokens(model_name: str, message: str) -> int:
+    """max_tokens for a chat reply: short for small talk, longer when asked to explain"""
+    lowered = message.lower()
+    if re.search(r"\b(explain|step by step|steps|example|examples|compare|difference|describe|why)\b", lowered):
+        kind = "explain"
+    elif len(lowered.split()) <= 6:
+        kind = "short"
+    else:
+        kind = "default"
+    return _cap_output(model_name, CHAT_OUTPUT_TOKENS[kind])
+
+
+def content_budget(model_name: str, template: str = "", reserved_output_tokens: Optional[int] = None) -> int:
+    """Tokens available for content once the template and output are accounted for"""
+    profile = get_model_profile(model_name)
+    if reserved_output_tokens is None:
+        reserved_output_tokens = min(profile["max_output_tokens"], 2048)
+
+    template_tokens = estimate_tokens(_PLACEHOLDER_RE.sub("", template))
+    window = min(profile["prompt_budget_tokens"], profile["context_tokens"] - reserved_output_tokens)
+    return max(window - template_tokens, 256)
+
+
+def remove_fillers(text: str) -> str:
+    """Strip spoken filler words from transcript text"""
+    cleaned = _FILLER_RE.sub("", text)
+    return re.sub(r"\s{2,}", " ", cleaned).strip()
+
+
+def _timestamp_seconds(timestamp: Optional[str]) -> Optional[int]:
+    """Convert HH:MM:SS or MM:SS timestamps to seconds"""
+    if not timestamp:
+        return None
+    try:
+        seconds = 0
+        for part in timestamp.strip().split(":"):
+            seconds = seconds * 60 + int(float(part))
+        return seconds
+    except ValueError:
+        return None
+
+
+def compress_transcript_lines(
+    transcript_segments: List[TranscriptSegment],
+    timestamp_interval: int = 30
+) -> List[str]:
+    """Render transcript segments compactly, one line per kept segment group"""
+    lines: List[str] = []
+    last_speaker = None
+    last_emitted_seconds = None
+
+    for segment in transcript_segments:
+        text = remove_fillers(segment.text)
+        if not text:
+            continue
+
+        seconds = _timestamp_seconds(segment.timestamp)
+        emit_timestamp = segment.timestamp and (
+            last_emitted_seconds is None
+            or seconds is None
+            or seconds - last_emitted_seconds >= timestamp_interval
+        )
+        speaker_changed = segment.speaker and segment.speaker != last_speaker
+
+        # Merge into the previous line when neither a timestamp nor a speaker label is needed
+        if lines and not emit_timestamp and not speaker_changed:
+            lines[-1] = f"{lines[-1]} {text}"
+            continue
+
+        timestamp_info = f"[{segment.timestamp}] " if emit_timestamp else ""
+        speaker_info = f"{segment.speaker}: " if speaker_changed else ""
+        lines.append(f"{timestamp_info}{speaker_info}{text}")
+
+        if emit_timestamp and seconds is not None:
+            last_emitted_seconds = seconds
+        if segment.speaker:
+            last_speaker = segment.speaker
+
+    return lines
+
+
+def pack_sentences(text: str, max_tokens: int) -> str:
+    """Pack whole sentences from the start of text up to max_tokens"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    packed: List[str] = []
+    used = 0
+    for sentence in _SENTENCE_RE.split(text):
+        cost = estimate_tokens(sentence)
+        if used + cost > max_tokens:
+            break
+        packed.append(sentence)
+        used += cost
+
+    if packed:
+        return " ".join(packed)
+
+    # A single oversized sentence - cut at a word boundary instead of mid-word
+    words: List[str] = []
+    for word in text.split():
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens:
+            break
+        words.append(word)
+        used += cost
+    return " ".join(words)
+
+
+def pack_lines(lines: List[str], max_tokens: int) -> str:
+    """Pack whole lines up to max_tokens, splitting the last one on sentences"""
+    packed: List[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            remainder = pack_sentences(line, max_tokens - used - 1)
+            if remainder:
+                packed.append(remainder)
+            break
+        packed.append(line)
+        used += cost
+    return "\n".join(packed)
+
+
+def split_text_evenly(text: str, parts: int, max_tokens: Optional[int] = None) -> List[str]:
+    """Split text on sentence boundaries into up to `parts` consecutive chunks of similar size"""
+    sentences = [s for s in _SENTENCE_RE.split(re.sub(r"\s+", " ", text).strip()) if s]
+    if not sentences:
+        return []
+    parts = max(1, min(parts, len(sentences)))
+    target = estimate_tokens(" ".join(sentences)) / parts
+
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for position, sentence in enumerate(sentences):
+        current.append(sentence)
+        used += estimate_tokens(sentence)
+        # Close a chunk once it reaches its share, leaving at least one sentence for each chunk still to come
+        remaining_chunks = parts - len(chunks) - 1
+        if remaining_chunks and used >= target and len(sentences) - position - 1 >= remaining_chunks:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+    if current:
+        chunks.append(" ".join(current))
+    if max_tokens is not None:
+        chunks = [pack_sentences(chunk, max_tokens) for chunk in chunks]
+    return chunks
+
+
+def fit_text_to_budget(
+    text: str,
+    model_name: str,
+    template: str = "",
+    reserved_output_tokens: Optional[int] = None
+) -> Tuple[str, Dict]:
+    """Fit free text into a prompt budget on sentence boundaries"""
+    budget = content_budget(model_name, template, reserved_output_tokens)
+    original_tokens = estimate_tokens(text)
+    normalized = re.sub(r"\s+", " ", text).strip()
+    packed = pack_sentences(normalized, budget)
+
+    return packed, {
+        "model": model_name,
+        "budget_tokens": budget,
+        "original_tokens": original_tokens,
+        "compressed_tokens": estimate_tokens(normalized),
+        "final_tokens": estimate_tokens(packed),
+    }
+
+
+def fit_transcript_to_budget(
+    transcript_segments: List[TranscriptSegment],
+    model_name: str,
+    template: str = "",
+    reserved_output_tokens: Optional[int] = None
+) -> Tuple[str, Dict]:
+    """Compress transcript segments and pack whole segments into a prompt budget"""
+    budget = content_budget(model_name, template, reserved_output_tokens)
+    original_tokens = estimate_tokens(extract_transcript_text(transcript_segments))
+    lines = compress_transcript_lines(transcript_segments)
+    compressed_tokens = estimate_tokens("\n".join(lines))
+    packed = pack_lines(lines, budget)
+
+    return packed, {
+        "model": model_name,
+        "budget_tokens": budget,
+        "original_tokens": original_tokens,
+        "compressed_tokens": compressed_tokens,
+        "final_tokens": estimate_tokens(packed),
+    }
+
+
+def log_prompt_report(label: str, report: Dict) -> None:
+    """Print prompt size before and after compression"""
+    original = report["original_tokens"] or 1
+    saved = 100 * (1 - report["final_tokens"] / original)
+    print(
+        f"📉 {label} prompt content: {report['original_tokens']} → {report['compressed_tokens']} (compressed) "
+        f"→ {report['final_tokens']} tokens (budget {report['budget_tokens']}, {saved:.0f}% saved)"
+    )
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import tempfile
+from typing import Dict, Optional
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "100")) * 1024 * 1024
+# Form fields are buffered in memory, so each one is kept small
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class StreamedUpload:
+    """A multipart upload streamed to a temporary file on disk"""
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.size = 0
+        self.fields: Dict[str, str] = {}
+
+    def cleanup(self) -> None:
+        """Remove the temporary file"""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def stream_multipart_to_disk(request: Request, file_field: str = "file", max_bytes: int = MAX_UPLOAD_BYTES) -> StreamedUpload:
+    """Parse a multipart body chunk by chunk, writing the file part straight to disk"""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    upload = StreamedUpload()
+    state = {"headers": {}, "header_name": b"", "header_value": b"", "name": None, "is_file": False, "data": b"",
+             "field_bytes": 0}
+    pending_writes = []
+    temp_file = None
+
+    def on_part_begin():
+        state.update(headers={}, name=None, is_file=False, data=b"")
+
+    def on_header_field(data, start, end):
+        state["header_name"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_name"].lower()] = state["header_value"]
+        state["header_name"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        state["name"] = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options:
+            # Only one file part is streamed to disk; any other would have to be buffered in memory
+            if state["name"] != file_field or upload.filename is not None:
+                raise HTTPException(status_code=400, detail=f"Send exactly one file, in field '{file_field}'")
+            state["is_file"] = True
+            upload.filename = options[b"filename"].decode("utf-8", "replace")
+            upload.content_type = state["headers"].get(b"content-type", b"").decode("latin-1") or None
+
+    def on_part_data(data, start, end):
+        if state["is_file"]:
+            pending_writes.append(data[start:end])
+        else:
+            if len(state["data"]) + end - start > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Form field '{state['name']}' exceeds {MAX_FIELD_BYTES // 1024} KB")
+            state["field_bytes"] += end - start
+            if upload.size + state["field_bytes"] > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit")
+            state["data"] += data[start:end]
+
+    def on_part_end():
+        if not state["is_file"] and state["name"]:
+            upload.fields[state["name"]] = state["data"].decode("utf-8", "replace")
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if not pending_writes:
+                continue
+
+            data = b"".join(pending_writes)
+            pending_writes.clear()
+            upload.size += len(data)
+            if upload.size + state["field_bytes"] > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit")
+
+            if temp_file is None:
+                suffix = os.path.splitext(upload.filename or "")[1]
+                temp_file = tempfile.NamedTemporaryFile(prefix="upload-", suffix=suffix, delete=False)
+                upload.path = temp_file.name
+            # Disk writes happen off the event loop
+            await asyncio.to_thread(temp_file.write, data)
+        parser.finalize()
+    except Exception:
+        if temp_file is not None:
+            temp_file.close()
+        upload.cleanup()
+        raise
+
+    if temp_file is not None:
+        temp_file.close()
+
+    if upload.path is None:
+        raise HTTPException(status_code=400, detail=f"No file uploaded in field '{file_field}'")
+
+    return upload
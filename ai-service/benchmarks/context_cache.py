@@ -0,0 +1,133 @@
+# /ai-service/benchmarks/context_cache.py
+# Compares summaries and repeated questions on one video with the transcript prefix sent inline (uncached)
+# against the prefix registered once as provider cached content. The fake provider charges prefill time per
+# prompt token it reads, with cached tokens at a fraction of that; --live uses Gemini itself when the
+# installed SDK supports caching and GEMINI_API_KEY is set.
+#   python -m benchmarks.context_cache --segments 4000 --questions 10 --prefill-ms 20
+#   python -m benchmarks.context_cache --segments 800 --min-tokens 4096
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_providers import FakeContextCacheProvider, FakeProviderConfig, LatencyProfile
+from benchmarks.loadtest import install_fakes, save_report, summarize_latencies
+from benchmarks.study_session import QUESTIONS, build_transcript
+from app.utils.token_budget import get_model_profile
+
+
+def run_mode(service, usage_tracker, transcript, questions: int) -> Dict:
+    """Three summaries then a run of questions; latencies and the usage tracker's token totals"""
+    from app.models.video_models import QARequest, SummarizationRequest, TranscriptSegment
+    from app.utils.shared_state import InProcessBackend
+
+    usage_tracker.backend = InProcessBackend()
+    segments = [TranscriptSegment(**segment) for segment in transcript]
+    video_id = "bench-context-cache"
+    summary_latencies, question_latencies = [], []
+    for summary_type in ("detailed", "brief", "key_points"):
+        started = time.perf_counter()
+        service.build_summary(SummarizationRequest(video_id=video_id, transcript=segments, summary_type=summary_type))
+        summary_latencies.append(time.perf_counter() - started)
+    for i in range(questions):
+        started = time.perf_counter()
+        asyncio.run(service.answer_question(QARequest(
+            video_id=video_id, transcript=segments, question=QUESTIONS[i % len(QUESTIONS)]
+        )))
+        question_latencies.append(time.perf_counter() - started)
+
+    report = {"summaries": summarize_latencies(summary_latencies), "questions": summarize_latencies(question_latencies)}
+    for route in ("video_summary", "video_qa"):
+        totals = usage_tracker.get_totals("route", route)
+        calls = totals["calls"] or 1
+        report[route] = {
+            "calls": totals["calls"],
+            "prompt_tokens_per_call": round(totals["prompt_tokens"] / calls),
+            "cached_tokens_per_call": round(totals["cached_prompt_tokens"] / calls),
+            "uncached_tokens_per_call": round((totals["prompt_tokens"] - totals["cached_prompt_tokens"]) / calls),
+            "cost_usd_per_call": round(totals["cost_usd"] / calls, 6),
+        }
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare uncached and provider-cached video prompt prefixes")
+    parser.add_argument("--segments", type=int, default=4000, help="transcript segments in the video")
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=150, help="fake per-call latency before prefill")
+    parser.add_argument("--prefill-ms", type=float, default=20, help="fake latency per 1K uncached prompt tokens")
+    parser.add_argument("--min-tokens", type=int, default=None, help="override CONTEXT_CACHE_MIN_TOKENS")
+    parser.add_argument("--live", action="store_true", help="call Gemini instead of the fakes")
+    parser.add_argument("--label", default="context-cache", help="name used in the saved results file")
+    args = parser.parse_args()
+
+    os.environ.pop("MONGODB_URI", None)
+    from app.services import context_cache as context_cache_module
+    from app.services.usage_tracker import usage_tracker
+
+    if args.live:
+        from app.api.routes.video_routes import video_ai_service
+        provider = context_cache_module.context_cache.provider
+        if provider is None or not video_ai_service.gemini_available:
+            print(f"❌ Live run needs GEMINI_API_KEY and context caching: "
+                  f"{context_cache_module.context_cache.disabled_reason() or 'Gemini is not configured'}")
+            return 1
+    else:
+        _, fakes = install_fakes(FakeProviderConfig(
+            latency=LatencyProfile("fixed", args.latency_ms), prefill_ms_per_1k=args.prefill_ms
+        ))
+        from app.api.routes.video_routes import video_ai_service
+        provider = FakeContextCacheProvider(fakes["gemini"])
+    if args.min_tokens is not None:
+        context_cache_module.CONTEXT_CACHE_MIN_TOKENS = args.min_tokens
+
+    cache = context_cache_module.context_cache
+    transcript = build_transcript(args.segments)
+    report = {"segments": args.segments, "questions": args.questions, "live": args.live, "modes": {}}
+
+    cache.provider = None
+    report["modes"]["uncached"] = run_mode(video_ai_service, usage_tracker, transcript, args.questions)
+
+    cache.provider = provider
+    from app.models.video_models import TranscriptSegment
+    from app.services.video_artifacts import transcript_digest
+    segments = [TranscriptSegment(**segment) for segment in transcript]
+    started = time.perf_counter()
+    registered = video_ai_service.register_context("bench-context-cache", transcript_digest(segments), segments)
+    report["register_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if not registered:
+        print(f"⚠️ Prefix was not cached (min {context_cache_module.CONTEXT_CACHE_MIN_TOKENS} tokens) - "
+              f"raise --segments or lower --min-tokens")
+    report["modes"]["cached"] = run_mode(video_ai_service, usage_tracker, transcript, args.questions)
+    report["context_cache"] = cache.get_stats()
+
+    # Caches are also billed for storage while they live; calls per hour needed to pay for it
+    cached_tokens = report["modes"]["cached"]["video_qa"]["cached_tokens_per_call"]
+    storage_per_hour = cached_tokens / 1_000_000 * get_model_profile("gemini-1.5-flash").get(
+        "cache_storage_cost_per_1m_token_hour", 0)
+    saving_per_call = report["modes"]["uncached"]["video_qa"]["cost_usd_per_call"] - \
+        report["modes"]["cached"]["video_qa"]["cost_usd_per_call"]
+    report["storage_usd_per_hour"] = round(storage_per_hour, 6)
+    report["break_even_calls_per_hour"] = round(storage_per_hour / saving_per_call) if saving_per_call > 0 else None
+
+    print(f"\n📊 {args.segments}-segment video, 3 summaries + {args.questions} questions "
+          f"(register {report['register_ms']}ms)")
+    for mode, stats in report["modes"].items():
+        print(f"  {mode:<9} summary p50={stats['summaries']['p50_ms']}ms question p50={stats['questions']['p50_ms']}ms")
+        for route in ("video_summary", "video_qa"):
+            usage = stats[route]
+            print(f"            {route:<13} {usage['prompt_tokens_per_call']} prompt tokens/call "
+                  f"({usage['cached_tokens_per_call']} cached, {usage['uncached_tokens_per_call']} uncached) "
+                  f"${usage['cost_usd_per_call']}/call")
+    print(f"  storage ${report['storage_usd_per_hour']}/hour per cached video, "
+          f"break-even at {report['break_even_calls_per_hour']} calls/hour")
+    print(f"💾 Saved {save_report(report, args.label)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+# /ai-service/benchmarks/fake_app.py
+# Importable app with fake providers, so real uvicorn/gunicorn workers can serve it:
+#   uvicorn benchmarks.fake_app:app --workers 4
+# Fake latency and error settings come from LOADTEST_* environment variables.
+import os
+
+from benchmarks.fake_providers import FakeProviderConfig, LatencyProfile
+from benchmarks.loadtest import install_fakes
+
+config = FakeProviderConfig(
+    latency=LatencyProfile(
+        os.getenv("LOADTEST_LATENCY_DISTRIBUTION", "lognormal"),
+        float(os.getenv("LOADTEST_LATENCY_MS", 400)),
+        float(os.getenv("LOADTEST_LATENCY_SPREAD", 0.5)),
+    ),
+    error_rate=float(os.getenv("LOADTEST_ERROR_RATE", 0)),
+    # Each worker gets its own stream of fake outcomes
+    seed=int(os.getenv("LOADTEST_SEED", 42)) + os.getpid(),
+)
+
+app, fakes = install_fakes(config)
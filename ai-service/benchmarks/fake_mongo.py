@@ -0,0 +1,153 @@
+import copy
+import threading
+from typing import Dict, List, Optional
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+def _matches(document: Dict, query: Dict) -> bool:
+    for key, condition in query.items():
+        value = document.get(key)
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$gt" and not (value is not None and value > operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(document: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return copy.deepcopy(document)
+    result = copy.deepcopy(document)
+    for key, include in projection.items():
+        if include == 0:
+            result.pop(key, None)
+        elif isinstance(include, dict) and "$slice" in include:
+            values = result.get(key, [])
+            spec = include["$slice"]
+            if isinstance(spec, list):
+                start, count = spec
+                start = max(len(values) + start, 0) if start < 0 else start
+                result[key] = values[start:start + count]
+            else:
+                result[key] = values[spec:] if spec < 0 else values[:spec]
+    return result
+
+
+def _evaluate_expression(document: Dict, expression):
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, dict):
+        if "$literal" in expression:
+            return expression["$literal"]
+        if "$size" in expression:
+            return len(_evaluate_expression(document, expression["$size"]) or [])
+        if "$slice" in expression:
+            values, *spec = expression["$slice"]
+            values = _evaluate_expression(document, values) or []
+            if len(spec) == 1:
+                return values[spec[0]:] if spec[0] < 0 else values[:spec[0]]
+            start = max(len(values) + spec[0], 0) if spec[0] < 0 else spec[0]
+            return values[start:start + spec[1]]
+    return expression
+
+
+def _evaluate_projection(document: Dict, projection: Dict) -> Dict:
+    result = {}
+    for key, value in projection.items():
+        if value == 0:
+            continue
+        if value == 1:
+            if key in document:
+                result[key] = document[key]
+        else:
+            result[key] = _evaluate_expression(document, value)
+    return result
+
+
+class InMemoryCollection:
+    """Thread-safe stand-in for the subset of pymongo Collection the service uses"""
+
+    def __init__(self):
+        self.documents: List[Dict] = []
+        self.lock = threading.Lock()
+
+    def create_index(self, *args, **kwargs):
+        return "index"
+
+    def find_one(self, query: Dict, projection: Optional[Dict] = None):
+        with self.lock:
+            for document in self.documents:
+                if _matches(document, query):
+                    return _project(document, projection)
+        return None
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None):
+        with self.lock:
+            return [_project(d, projection) for d in self.documents if _matches(d, query or {})]
+
+    def count_documents(self, query: Dict) -> int:
+        with self.lock:
+            return sum(1 for d in self.documents if _matches(d, query))
+
+    def insert_one(self, document: Dict):
+        with self.lock:
+            self.documents.append(copy.deepcopy({k: v for k, v in document.items() if k != "_id"}))
+
+    def delete_one(self, query: Dict):
+        with self.lock:
+            for i, document in enumerate(self.documents):
+                if _matches(document, query):
+                    del self.documents[i]
+                    return
+
+    def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        with self.lock:
+            target = next((d for d in self.documents if _matches(d, query)), None)
+            if target is None:
+                if not upsert:
+                    return
+                target = {k: v for k, v in query.items() if not isinstance(v, dict)}
+                target.update(copy.deepcopy(update.get("$setOnInsert", {})))
+                self.documents.append(target)
+            for key, value in update.get("$set", {}).items():
+                target[key] = copy.deepcopy(value)
+            for key, value in update.get("$inc", {}).items():
+                target[key] = target.get(key, 0) + value
+            for key, value in update.get("$push", {}).items():
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                target.setdefault(key, []).extend(copy.deepcopy(items))
+
+    def aggregate(self, pipeline: List[Dict]):
+        """$match, $limit and $project with $size, $slice and $literal"""
+        with self.lock:
+            documents = copy.deepcopy(self.documents)
+        for stage in pipeline:
+            if "$match" in stage:
+                documents = [d for d in documents if _matches(d, stage["$match"])]
+            elif "$limit" in stage:
+                documents = documents[:stage["$limit"]]
+            elif "$project" in stage:
+                documents = [_evaluate_projection(d, stage["$project"]) for d in documents]
+        return iter(documents)
+
+    def bulk_write(self, operations, ordered: bool = True):
+        for operation in operations:
+            # pymongo UpdateOne keeps its arguments in private attributes
+            self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+
+
+def make_collection():
+    """Use mongomock when installed, otherwise the local stand-in"""
+    if mongomock is not None:
+        return mongomock.MongoClient().loadtest_db.collection
+    return InMemoryCollection()
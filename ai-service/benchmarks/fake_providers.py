@@ -0,0 +1,221 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+_WORDS = (
+    "osmosis diffusion mitosis meiosis enzyme protein ribosome membrane nucleus chloroplast "
+    "vacuole lysosome cytoplasm gene allele mutation photosynthesis respiration glucose lipid"
+).split()
+
+
+# Share of the per-token prefill time a cached prompt token still costs
+CACHED_PREFILL_FRACTION = 0.1
+
+
+class FakeProviderError(Exception):
+    """Simulated provider failure"""
+
+
+class LatencyProfile:
+    """Deterministic latency sampler: fixed, uniform, exponential or lognormal"""
+
+    def __init__(self, distribution: str = "lognormal", mean_ms: float = 400, spread: float = 0.5):
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.spread = spread
+
+    def sample(self, rng: random.Random) -> float:
+        """Sample a latency in seconds"""
+        if self.distribution == "fixed":
+            ms = self.mean_ms
+        elif self.distribution == "uniform":
+            ms = rng.uniform(self.mean_ms * (1 - self.spread), self.mean_ms * (1 + self.spread))
+        elif self.distribution == "exponential":
+            ms = rng.expovariate(1 / self.mean_ms)
+        else:
+            # Lognormal with the requested mean, spread is sigma
+            mu = math.log(self.mean_ms) - self.spread ** 2 / 2
+            ms = rng.lognormvariate(mu, self.spread)
+        return max(ms, 0) / 1000
+
+
+class FakeProviderConfig:
+    """Latency, error and output-shape settings shared by the fake providers"""
+
+    def __init__(
+        self,
+        latency: Optional[LatencyProfile] = None,
+        error_rate: float = 0.0,
+        short_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = 42,
+        prefill_ms_per_1k: float = 0.0
+    ):
+        self.latency = latency or LatencyProfile()
+        self.error_rate = error_rate
+        self.short_rate = short_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        # Extra latency per 1K prompt tokens the provider has to read; cached tokens cost a fraction of it
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+
+
+class _FakeProvider:
+    def __init__(self, config: FakeProviderConfig, name: str):
+        self.config = config
+        self.name = name
+        self.rng = random.Random(f"{config.seed}:{name}")
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _simulate(self, prefill_tokens: float = 0) -> Dict:
+        """Sleep like a blocking SDK call and decide the outcome"""
+        with self.lock:
+            self.calls += 1
+            delay = self.config.latency.sample(self.rng) + prefill_tokens / 1000 * self.config.prefill_ms_per_1k / 1000
+            roll = self.rng.random()
+            seed = self.rng.random()
+        # The real SDKs are synchronous, so the fake blocks the calling thread too
+        time.sleep(delay)
+
+        if roll < self.config.error_rate:
+            with self.lock:
+                self.errors += 1
+            raise FakeProviderError(f"{self.name}: simulated provider error")
+        roll -= self.config.error_rate
+        if roll < self.config.malformed_rate:
+            return {"shape": "malformed", "seed": seed}
+        roll -= self.config.malformed_rate
+        if roll < self.config.short_rate:
+            return {"shape": "short", "seed": seed}
+        return {"shape": "valid", "seed": seed}
+
+
+class FakeGeminiModel(_FakeProvider):
+    """Stand-in for google.generativeai.GenerativeModel"""
+
+    def __init__(self, config: FakeProviderConfig):
+        super().__init__(config, "gemini")
+
+    def generate_content(self, prompt: str, **kwargs):
+        cached_tokens = kwargs.pop("cached_tokens", 0)
+        outcome = self._simulate(len(prompt) / 4 + cached_tokens * CACHED_PREFILL_FRACTION)
+        if outcome["shape"] == "malformed":
+            return SimpleNamespace(text="Sorry, here is some text that is not JSON at all.")
+
+        rng = random.Random(outcome["seed"])
+        count_match = re.search(r"EXACTLY (\d+)", prompt)
+        if count_match:
+            count = int(count_match.group(1))
+            if outcome["shape"] == "short":
+                count = max(count - 1, 0)
+            return SimpleNamespace(text=json.dumps([_fake_question(rng) for _ in range(count)]))
+
+        if "GRADE EACH ANSWER" in prompt:
+            return SimpleNamespace(text=json.dumps([
+                {"id": answer_id, "score": rng.choice([0.0, 0.5, 1.0]), "feedback": "Graded by the fake provider."}
+                for answer_id in re.findall(r"^\[(a\d+)\]", prompt, re.MULTILINE)
+            ]))
+
+        if "SESSION QUESTION" in prompt:
+            text = (f"The lecture explains {rng.choice(_WORDS)} in relation to {rng.choice(_WORDS)}, "
+                    f"building on the earlier point about {rng.choice(_WORDS)}.\nTIMESTAMPS: 00:30, 01:00")
+            if kwargs.get("stream"):
+                words = text.split(" ")
+                return iter([SimpleNamespace(text=" ".join(words[i:i + 4]) + " ") for i in range(0, len(words), 4)])
+            return SimpleNamespace(text=text)
+
+        if "STUDENT QUESTION" in prompt:
+            return SimpleNamespace(text=json.dumps({
+                "answer": f"The video explains {rng.choice(_WORDS)} in relation to {rng.choice(_WORDS)}.",
+                "relevant_timestamps": ["00:30", "01:00"],
+                "confidence": "high",
+                "additional_info": "Generated by the fake provider.",
+            }))
+
+        return SimpleNamespace(text=json.dumps({
+            "summary": " ".join(f"The lecture covers {rng.choice(_WORDS)}." for _ in range(6)),
+            "key_points": [f"Key point about {rng.choice(_WORDS)}" for _ in range(5)],
+            "main_topics": [rng.choice(_WORDS) for _ in range(3)],
+        }))
+
+
+class FakeCachedGeminiModel:
+    """A FakeGeminiModel bound to cached content: only the suffix is sent, the prefix is read from cache"""
+
+    def __init__(self, model: FakeGeminiModel, handle):
+        self.model = model
+        self.handle = handle
+
+    def generate_content(self, prompt: str, **kwargs):
+        return self.model.generate_content(prompt, cached_tokens=self.handle.tokens, **kwargs)
+
+
+class FakeContextCacheProvider:
+    """Stand-in for Gemini CachedContent, with the interface app.services.context_cache expects"""
+
+    def __init__(self, model: FakeGeminiModel, create_ms: float = 300):
+        self.model = model
+        self.create_ms = create_ms
+        self.caches: Dict[str, SimpleNamespace] = {}
+        self.lock = threading.Lock()
+        self.created = 0
+        self.renewed = 0
+
+    def create(self, display_name: str, instructions: str, content: str, ttl_seconds: float):
+        time.sleep(self.create_ms / 1000)
+        with self.lock:
+            self.created += 1
+            handle = SimpleNamespace(name=f"cachedContents/fake-{self.created}", display_name=display_name,
+                                     tokens=(len(instructions) + len(content)) / 4)
+            self.caches[handle.name] = handle
+        return handle
+
+    def get(self, name: str):
+        return self.caches[name]
+
+    def renew(self, handle, ttl_seconds: float) -> None:
+        with self.lock:
+            self.renewed += 1
+
+    def model_for(self, handle):
+        return FakeCachedGeminiModel(self.model, handle)
+
+
+class FakeGroqClient(_FakeProvider):
+    """Stand-in for groq.Groq exposing chat.completions.create"""
+
+    def __init__(self, config: FakeProviderConfig):
+        super().__init__(config, "groq")
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+
+    def _create_completion(self, messages, model: str = "", max_tokens: int = 300, **kwargs):
+        outcome = self._simulate()
+        rng = random.Random(outcome["seed"])
+        content = "" if outcome["shape"] == "malformed" else \
+            f"Great question! 😊 Let's study {rng.choice(_WORDS)} and {rng.choice(_WORDS)} together."
+        prompt_tokens = sum(len(m["content"]) // 4 for m in messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(content) // 4,
+                                  total_tokens=prompt_tokens + len(content) // 4),
+        )
+
+
+def _fake_question(rng: random.Random) -> Dict:
+    a, b, c = rng.sample(_WORDS, 3)
+    return {
+        "question": f"How does {a} relate to {b} and {c}?",
+        "type": "mcq",
+        "options": [a, b, c, "none of these"],
+        "correct_answer": a,
+        "explanation": f"{a} is what drives {b}.",
+        "difficulty": "medium",
+        "points": 1,
+    }
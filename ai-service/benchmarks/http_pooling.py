@@ -0,0 +1,173 @@
+# /ai-service/benchmarks/http_pooling.py
+# Measures per-call HTTP overhead with a fresh client per call (what each SDK object did on its own)
+# against the shared pooled client from app.utils.http_transport.
+#   python -m benchmarks.http_pooling --calls 200 --tls
+#   python -m benchmarks.http_pooling --url https://api.groq.com/openai/v1/models --calls 20
+import argparse
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.utils.http_transport import TransportStats, build_http_client
+from benchmarks.loadtest import save_report, summarize_latencies
+
+
+class ProviderStubHandler(BaseHTTPRequestHandler):
+    """Answers every request with a small JSON body after a fixed delay"""
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, delayed ACKs add ~40ms to every call
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        body = b'{"object": "list", "data": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+def self_signed_context(workdir: str) -> ssl.SSLContext:
+    """Server TLS context from a throwaway certificate made with the openssl CLI"""
+    if not shutil.which("openssl"):
+        raise RuntimeError("--tls needs the openssl command line tool")
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def start_stub(delay_ms: float, tls: bool, workdir: str):
+    ProviderStubHandler.delay = delay_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ProviderStubHandler)
+    server.daemon_threads = True
+    scheme = "http"
+    if tls:
+        server.socket = self_signed_context(workdir).wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/models"
+
+
+def timed_calls(call: Callable[[], None], calls: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def one(_):
+        started = time.perf_counter()
+        call()
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(one, range(calls)))
+    wall = time.perf_counter() - started
+    return {**summarize_latencies(latencies), "wall_seconds": round(wall, 3), "calls_per_second": round(calls / wall, 1)}
+
+
+def run(args) -> Dict:
+    verify = not args.tls
+    headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else {}
+
+    def fresh_client_call():
+        # A new client per call pays the TCP (and TLS) handshake every time
+        with httpx.Client(verify=verify, timeout=30) as client:
+            client.get(args.url, headers=headers).raise_for_status()
+
+    stats = TransportStats()
+    pooled = build_http_client(stats, verify=verify)
+
+    def pooled_call():
+        pooled.get(args.url, headers=headers).raise_for_status()
+
+    # One warm-up call each so neither side pays DNS or import costs in the measurement
+    fresh_client_call()
+    pooled_call()
+    stats.reset()
+
+    report = {
+        "url": args.url,
+        "calls": args.calls,
+        "concurrency": args.concurrency,
+        "tls": args.url.startswith("https"),
+        "fresh_client": timed_calls(fresh_client_call, args.calls, args.concurrency),
+        "shared_pool": timed_calls(pooled_call, args.calls, args.concurrency),
+    }
+    report["shared_pool"]["transport"] = stats.snapshot()
+    pooled.close()
+
+    fresh, shared = report["fresh_client"], report["shared_pool"]
+    report["overhead_saved_ms_per_call"] = round(fresh["mean_ms"] - shared["mean_ms"], 2)
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n📊 {report['calls']} calls to {report['url']} (concurrency {report['concurrency']})")
+    for name in ("fresh_client", "shared_pool"):
+        stats = report[name]
+        print(f"  {name:<13} mean={stats['mean_ms']}ms p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms "
+              f"{stats['calls_per_second']} calls/s")
+    for host, stats in report["shared_pool"]["transport"].items():
+        print(f"  pool {host}: {stats['new_connections']} new / {stats['reused_connections']} reused connections, "
+              f"{stats['tls_handshakes']} TLS handshakes, {stats['saturated_requests']} saturated requests")
+    print(f"  ⏱️ pooling saves {report['overhead_saved_ms_per_call']}ms per call")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare per-call HTTP overhead with and without connection pooling")
+    parser.add_argument("--url", help="endpoint to call instead of the local stub (e.g. a provider's model list)")
+    parser.add_argument("--api-key", help="bearer token sent with --url")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--delay-ms", type=float, default=0, help="server-side delay of the local stub")
+    parser.add_argument("--tls", action="store_true", help="serve the local stub over TLS with a self-signed certificate")
+    parser.add_argument("--label", default="http-pooling", help="name used in the saved results file")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None
+        if not args.url:
+            server, args.url = start_stub(args.delay_ms, args.tls, workdir)
+        else:
+            args.tls = False
+        try:
+            report = run(args)
+        finally:
+            if server:
+                server.shutdown()
+    print_report(report)
+    print(f"💾 Saved {save_report(report, args.label)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
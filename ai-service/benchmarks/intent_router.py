@@ -0,0 +1,149 @@
+# /ai-service/benchmarks/intent_router.py
+# Scores Bobby's local intent router on a labelled sample of chat messages kept apart from its training
+# examples: intent accuracy, how often the local/LLM routing decision is right, questions wrongly answered from
+# a template, and the share of Groq calls avoided. --sweep repeats the routing numbers over a range of thresholds.
+#   python -m benchmarks.intent_router
+#   python -m benchmarks.intent_router --sweep
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import save_report
+
+LLM = "llm"
+SAMPLE: List[Tuple[str, str]] = [
+    ("Hello!", "greeting"), ("hey hey", "greeting"), ("Hi Bobby 👋", "greeting"), ("good afternoon", "greeting"),
+    ("hello bobby, how are you today?", "greeting"), ("heyy", "greeting"), ("morning bobby", "greeting"),
+    ("hi there, nice to meet you", "greeting"),
+    ("Thank you!", "thanks"), ("thanks so much bobby", "thanks"), ("ty", "thanks"), ("that helps, thanks", "thanks"),
+    ("great explanation, thank you", "thanks"), ("thanks a ton", "thanks"), ("appreciate it", "thanks"),
+    ("bye bobby", "goodbye"), ("see you tomorrow", "goodbye"), ("ok bye", "goodbye"), ("I have to go now, bye", "goodbye"),
+    ("goodnight", "goodbye"),
+    ("who are you?", "bot_identity"), ("what can you help me with?", "bot_identity"), ("are you a real person", "bot_identity"),
+    ("what kind of things can you do", "bot_identity"), ("are you chatgpt", "bot_identity"),
+    ("how do I enroll?", "faq_enroll"), ("how can I enroll in the python course", "faq_enroll"),
+    ("where do I click to join a course", "faq_enroll"), ("how to purchase a course", "faq_enroll"),
+    ("how do i sign up for a class", "faq_enroll"),
+    ("where can I see my progress", "faq_progress"), ("where are my enrolled courses", "faq_progress"),
+    ("how do I get back to my course", "faq_progress"), ("where can i track my course progress", "faq_progress"),
+    ("how do I see which lectures I finished", "faq_progress"),
+    ("can I become an instructor", "faq_educator"), ("how do I create my own course", "faq_educator"),
+    ("I want to teach a course here", "faq_educator"), ("how to become an educator on skillnest", "faq_educator"),
+    ("forgot my password", "faq_account"), ("how do I change my password", "faq_account"),
+    ("how do I sign up for an account", "faq_account"), ("how can i edit my profile", "faq_account"),
+    ("I can't sign in", "faq_account"),
+    ("what's the weather like in paris", "off_topic"), ("who won the nba finals", "off_topic"),
+    ("suggest a good restaurant near me", "off_topic"), ("what's the price of tesla stock", "off_topic"),
+    ("recommend a netflix show", "off_topic"), ("what's the best pizza in town", "off_topic"),
+    ("who is going to win the super bowl", "off_topic"), ("book a hotel for me", "off_topic"),
+    ("explain photosynthesis", LLM), ("hi, what is a closure in javascript?", LLM), ("what is a derivative in calculus", LLM),
+    ("thanks! what is an integral?", LLM), ("how do I prepare for the final exam", LLM), ("what is an algorithm", LLM),
+    ("explain the difference between a list and a tuple", LLM), ("can you help me understand recursion better", LLM),
+    ("what is the pythagorean theorem", LLM), ("how does dna replication work", LLM), ("what's newton's second law", LLM),
+    ("summarize the key ideas of the french revolution", LLM), ("why do we need databases", LLM),
+    ("can you give me a practice question on fractions", LLM), ("I don't get how pointers work", LLM),
+    ("what are good note taking methods", LLM), ("how many hours should I study per day", LLM),
+    ("what is machine learning", LLM), ("hello, can you explain binary search", LLM), ("ok, and why is that?", LLM),
+    ("can you explain it more simply", LLM), ("what was the second point", LLM), ("sure", LLM), ("yes", LLM),
+    ("which course should I take after intro to python", LLM), ("is the data science course good for beginners", LLM),
+    ("my video keeps buffering", LLM), ("I got 3/10 on the quiz, how can I improve", LLM),
+    ("what is the weather system called el nino", LLM), ("how is statistics used in sports analytics", LLM),
+    ("what's the chemical formula of water", LLM), ("tell me about the causes of world war 1", LLM),
+    ("write a haiku about learning", LLM), ("what is the capital of italy", LLM), ("what does html stand for", LLM),
+    ("how do I enroll in a course and also what are prerequisites for calculus 2", LLM),
+    ("who won the world war 2", LLM), ("how do i create an account in django", LLM),
+    ("how do I log in to mysql from terminal", LLM), ("how do I change my email signature in outlook", LLM),
+    ("how do I reset my password in linux", LLM), ("how do i sign in to google colab", LLM),
+    ("who won the battle of waterloo", LLM), ("how do I register a domain name", LLM),
+    ("how do i create a new branch in git", LLM), ("who won the spanish civil war", LLM),
+]
+
+
+def evaluate(router, sample: List[Tuple[str, str]]) -> Dict:
+    counts = {"intent_correct": 0, "route_correct": 0, "avoided": 0, "wrong_template": 0, "missed_local": 0}
+    errors = []
+    for message, label in sample:
+        classified = router.classify(message)
+        local = router.local_intent(classified)
+        counts["intent_correct"] += classified["intent"] == label
+        if local:
+            counts["avoided"] += 1
+            if classified["intent"] == label:
+                counts["route_correct"] += 1
+            else:
+                # Answered from the wrong template, or a real question refused or brushed off
+                counts["wrong_template"] += 1
+                errors.append({"message": message, "label": label, **classified})
+        elif label == LLM:
+            counts["route_correct"] += 1
+        else:
+            counts["missed_local"] += 1
+    total = len(sample)
+    local_labelled = sum(1 for _, label in sample if label != LLM)
+    return {
+        "messages": total,
+        "intent_accuracy": round(counts["intent_correct"] / total, 3),
+        "routing_accuracy": round(counts["route_correct"] / total, 3),
+        "llm_calls_avoided": round(counts["avoided"] / total, 3),
+        "local_recall": round((counts["avoided"] - counts["wrong_template"]) / local_labelled, 3),
+        "wrong_template": counts["wrong_template"],
+        "missed_local": counts["missed_local"],
+        "errors": errors,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure Bobby's local intent routing on a labelled sample")
+    parser.add_argument("--sweep", action="store_true", help="also report routing at other thresholds")
+    parser.add_argument("--label", default="intent-router", help="name used in the saved results file")
+    args = parser.parse_args()
+
+    from app.services import intent_router as intent_router_module
+
+    started = time.perf_counter()
+    router = intent_router_module.IntentRouter()
+    training_ms = (time.perf_counter() - started) * 1000
+    overlap = {text for text, _ in intent_router_module.TRAINING_EXAMPLES} & {text.lower() for text, _ in SAMPLE}
+
+    report = evaluate(router, SAMPLE)
+    report["training_ms"] = round(training_ms, 1)
+    report["training_examples"] = len(intent_router_module.TRAINING_EXAMPLES)
+    report["overlap_with_training"] = sorted(overlap)
+
+    started = time.perf_counter()
+    for _ in range(20):
+        for message, _ in SAMPLE:
+            router.classify(message)
+    report["classify_us"] = round((time.perf_counter() - started) / (20 * len(SAMPLE)) * 1e6, 1)
+
+    if args.sweep:
+        report["sweep"] = []
+        for threshold in (0.5, 0.6, 0.7, 0.8, 0.9):
+            intent_router_module.INTENT_ROUTER_THRESHOLD = threshold
+            swept = evaluate(router, SAMPLE)
+            swept.pop("errors")
+            report["sweep"].append({"threshold": threshold, **swept})
+
+    print(f"\n📊 {report['messages']} labelled messages ({report['training_examples']} training examples, "
+          f"trained in {report['training_ms']}ms, {report['classify_us']}µs per message)")
+    print(f"  intent accuracy  {report['intent_accuracy']}")
+    print(f"  routing accuracy {report['routing_accuracy']}")
+    print(f"  LLM calls avoided {report['llm_calls_avoided']} (local recall {report['local_recall']})")
+    print(f"  wrong template   {report['wrong_template']}  missed local {report['missed_local']}")
+    for error in report["errors"]:
+        print(f"    ❌ {error['message']!r} labelled {error['label']} -> {error['intent']} ({error['confidence']})")
+    for row in report.get("sweep", []):
+        print(f"  threshold {row['threshold']}: routing {row['routing_accuracy']} avoided {row['llm_calls_avoided']} "
+              f"wrong template {row['wrong_template']}")
+    if overlap:
+        print(f"⚠️ {len(overlap)} sample messages also appear in the training examples")
+    print(f"💾 Saved {save_report(report, args.label)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
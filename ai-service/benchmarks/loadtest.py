@@ -0,0 +1,294 @@
+# /ai-service/benchmarks/loadtest.py
+# Boots main.app in-process with fake providers and drives it at a target request rate.
+#   python -m benchmarks.loadtest --rps 20 --duration 30 --latency-ms 400 --label baseline
+#   python -m benchmarks.loadtest --rps 20 --duration 30 --compare benchmarks/results/<baseline>.json
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_providers import FakeGeminiModel, FakeGroqClient, FakeProviderConfig, LatencyProfile
+from benchmarks.fake_mongo import make_collection
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SAMPLE_CONTENT = (
+    "Photosynthesis is the process by which plants convert light energy into chemical energy. "
+    "Chlorophyll in the chloroplasts absorbs light, mostly in the blue and red wavelengths. "
+    "The light-dependent reactions produce ATP and NADPH, releasing oxygen as a by-product. "
+    "The Calvin cycle then uses ATP and NADPH to fix carbon dioxide into glucose. "
+    "Cellular respiration reverses this, breaking glucose down to release usable energy. "
+)
+
+SAMPLE_TRANSCRIPT = [
+    {"timestamp": f"{i // 2:02d}:{(i % 2) * 30:02d}", "text": sentence.strip()}
+    for i, sentence in enumerate(SAMPLE_CONTENT.split(". ") * 8) if sentence.strip()
+]
+
+SCENARIOS = {
+    "quiz": ("POST", "/api/ai/generate-quiz"),
+    "chat": ("POST", "/api/chatbot/chat"),
+    "summarize": ("POST", "/api/video-ai/summarize"),
+    "ask": ("POST", "/api/video-ai/ask-question"),
+}
+
+
+def install_fakes(config: FakeProviderConfig):
+    """Import the service and swap every provider and Mongo collection for fakes"""
+    os.environ.setdefault("QUESTION_BANK_BACKEND", "memory")
+    import main
+    from app.api.routes import quiz_routes, chatbot_routes, video_routes
+    from app.services import question_bank as question_bank_module
+    from app.services import video_artifacts as video_artifacts_module
+    from app.services.provider_cassette import wrap_gemini_model, wrap_groq_client
+
+    gemini = FakeGeminiModel(config)
+    groq = FakeGroqClient(config)
+
+    # Fakes sit behind the cassette wrappers so replay runs exercise the real parsing paths
+    gemini_model = wrap_gemini_model(gemini, "gemini-1.5-flash")
+    quiz_routes.model = gemini_model
+    quiz_routes.GEMINI_AVAILABLE = True
+    video_routes.video_ai_service.model = gemini_model
+    video_routes.video_ai_service.gemini_available = True
+    chatbot_routes.groq_client = wrap_groq_client(groq, "llama-3.1-8b-instant")
+    chatbot_routes.GROQ_AVAILABLE = True
+    chatbot_routes.conversations_collection = make_collection()
+    chatbot_routes.MONGO_AVAILABLE = True
+    question_bank_module.question_bank.store = question_bank_module.InMemoryQuestionStore()
+    video_artifacts_module.video_artifacts.store = video_artifacts_module.InMemoryArtifactStore()
+
+    return main.app, {"gemini": gemini, "groq": groq}
+
+
+def build_payload(scenario: str, rng: random.Random) -> Dict:
+    """Build a request body for a scenario"""
+    if scenario == "quiz":
+        # Vary content so the question bank does not serve every request
+        return {
+            "content": SAMPLE_CONTENT + f" Variant {rng.randint(0, 10 ** 6)}.",
+            "settings": {"question_count": rng.choice([5, 10]), "difficulty": "medium"},
+            "course_id": f"course-{rng.randint(1, 5)}",
+            "user_id": f"user-{rng.randint(1, 100)}",
+        }
+    if scenario == "chat":
+        return {
+            "message": rng.choice(["How do I prepare for the quiz?", "Explain photosynthesis briefly",
+                                   "What is the Calvin cycle?", "Any study tips for biology?"]),
+            "sessionId": f"session-{rng.randint(1, 50)}",
+        }
+    if scenario == "summarize":
+        return {"video_id": f"video-{rng.randint(1, 20)}", "transcript": SAMPLE_TRANSCRIPT,
+                "summary_type": rng.choice(["detailed", "brief", "key_points"])}
+    return {"video_id": f"video-{rng.randint(1, 20)}", "transcript": SAMPLE_TRANSCRIPT,
+            "question": rng.choice(["What does chlorophyll absorb?", "What is produced by the Calvin cycle?"])}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(values: List[float]) -> Dict:
+    """Latency percentiles in milliseconds"""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(statistics.mean(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p90_ms": round(percentile(values, 90) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2),
+    }
+
+
+async def monitor_loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    """Record how late the event loop wakes up from a fixed sleep"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run_load(client, scenarios: List[str], rps: float, duration: float, seed: int, timeout: float) -> Dict:
+    """Open-loop load: requests are started on schedule regardless of completions"""
+    rng = random.Random(seed)
+    results: Dict[str, Dict[str, list]] = {name: {"latencies": [], "errors": [], "degraded": []} for name in scenarios}
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+
+    async def one_request(scenario: str, payload: Dict) -> None:
+        method, path = SCENARIOS[scenario]
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(client.request(method, path, json=payload), timeout)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                results[scenario]["errors"].append(f"HTTP {response.status_code}")
+            else:
+                results[scenario]["latencies"].append(elapsed)
+                # Answered by the local engines under admission control
+                if response.headers.get("x-degraded-mode"):
+                    results[scenario]["degraded"].append(elapsed)
+        except Exception as e:
+            results[scenario]["errors"].append(type(e).__name__)
+
+    tasks = []
+    started = time.perf_counter()
+    total = int(rps * duration)
+    for i in range(total):
+        # Sleep until the scheduled start of request i
+        delay = started + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        scenario = scenarios[i % len(scenarios)]
+        tasks.append(asyncio.create_task(one_request(scenario, build_payload(scenario, rng))))
+
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - started
+    stop.set()
+    await lag_task
+
+    report = {"wall_seconds": round(wall, 3), "requests": total, "endpoints": {}}
+    completed = 0
+    for scenario, data in results.items():
+        completed += len(data["latencies"])
+        report["endpoints"][scenario] = {
+            **summarize_latencies(data["latencies"]),
+            "errors": len(data["errors"]),
+            "error_kinds": sorted(set(data["errors"])),
+            "degraded": len(data["degraded"]),
+            "throughput_rps": round(len(data["latencies"]) / wall, 2),
+        }
+    report["throughput_rps"] = round(completed / wall, 2)
+    report["event_loop_lag"] = summarize_latencies(lag_samples)
+    return report
+
+
+def compare_reports(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """List regressions in p50/p99 latency, throughput and loop lag beyond tolerance"""
+    regressions = []
+    for scenario, stats in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(scenario)
+        if not base or not stats.get("count") or not base.get("count"):
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if stats[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{scenario} {key}: {base[key]} → {stats[key]}")
+        if stats["errors"] > base["errors"]:
+            regressions.append(f"{scenario} errors: {base['errors']} → {stats['errors']}")
+    if current["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput_rps: {baseline['throughput_rps']} → {current['throughput_rps']}")
+    lag, base_lag = current["event_loop_lag"], baseline.get("event_loop_lag", {})
+    if lag.get("p99_ms") and base_lag.get("p99_ms") and lag["p99_ms"] > base_lag["p99_ms"] * (1 + tolerance):
+        regressions.append(f"event_loop_lag p99_ms: {base_lag['p99_ms']} → {lag['p99_ms']}")
+    return regressions
+
+
+def save_report(report: Dict, label: str) -> str:
+    """Write a report to benchmarks/results and return its path"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(RESULTS_DIR, f"{stamp}-{label}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n📊 {report['requests']} requests in {report['wall_seconds']}s → {report['throughput_rps']} req/s")
+    for scenario, stats in report["endpoints"].items():
+        if stats.get("count"):
+            print(f"  {scenario:<10} n={stats['count']:<5} p50={stats['p50_ms']}ms p90={stats['p90_ms']}ms "
+                  f"p99={stats['p99_ms']}ms errors={stats['errors']} degraded={stats.get('degraded', 0)}")
+        else:
+            print(f"  {scenario:<10} no successful requests, errors={stats['errors']} {stats['error_kinds']}")
+    lag = report["event_loop_lag"]
+    if lag.get("count"):
+        print(f"  loop lag   p50={lag['p50_ms']}ms p99={lag['p99_ms']}ms max={lag['max_ms']}ms")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the AI service with in-process fake providers")
+    parser.add_argument("--rps", type=float, default=10, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--scenarios", default="quiz,chat,summarize,ask", help="comma-separated scenario mix")
+    parser.add_argument("--latency-distribution", default="lognormal", choices=["fixed", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--latency-ms", type=float, default=400, help="mean fake provider latency")
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of provider calls that raise")
+    parser.add_argument("--short-rate", type=float, default=0.0, help="fraction of quiz outputs with too few questions")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of outputs that are not JSON")
+    parser.add_argument("--timeout", type=float, default=60, help="client-side timeout per request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="run", help="name used in the saved results file")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--cassette-mode", choices=["off", "record", "replay", "replay_then_live"],
+                        help="wrap fake providers in provider cassettes")
+    parser.add_argument("--cassette-path", help="cassette file to record to or replay from")
+    parser.add_argument("--verbose", action="store_true", help="show the service's own request logging")
+    return parser.parse_args(argv)
+
+
+async def main_async(args) -> int:
+    import httpx
+
+    # Cassette settings are read when the service modules are imported
+    if args.cassette_mode:
+        os.environ["PROVIDER_CASSETTE_MODE"] = args.cassette_mode
+    if args.cassette_path:
+        os.environ["PROVIDER_CASSETTE_PATH"] = args.cassette_path
+
+    config = FakeProviderConfig(
+        latency=LatencyProfile(args.latency_distribution, args.latency_ms, args.latency_spread),
+        error_rate=args.error_rate,
+        short_rate=args.short_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    app, fakes = install_fakes(config)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip() in SCENARIOS]
+
+    transport = httpx.ASGITransport(app=app)
+    service_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with service_output:
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            report = await run_load(client, scenarios, args.rps, args.duration, args.seed, args.timeout)
+
+    report["config"] = {k: v for k, v in vars(args).items() if k != "compare"}
+    report["provider_calls"] = {name: {"calls": fake.calls, "errors": fake.errors} for name, fake in fakes.items()}
+    print_report(report)
+    print(f"💾 Saved results to {save_report(report, args.label)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main_async(parse_args())))
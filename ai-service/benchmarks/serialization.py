@@ -0,0 +1,147 @@
+# /ai-service/benchmarks/serialization.py
+# Times response serialization for large quizzes, summaries and history pages: FastAPI's default
+# response_model path against model_response, plus payload size raw, gzipped and (if installed) brotli.
+#   python -m benchmarks.serialization --questions 50 --repeat 200
+import argparse
+import asyncio
+import os
+import sys
+import time
+import zlib
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.middleware.compression import BROTLI_AVAILABLE, BROTLI_QUALITY, GZIP_LEVEL
+from app.api.responses import ORJSON_AVAILABLE, FastJSONResponse, model_response
+from app.api.routes.chatbot_routes import ConversationHistory
+from app.api.routes.quiz_routes import QuizGenerationResponse
+from app.models.video_models import SummaryResponse
+from benchmarks.loadtest import SAMPLE_CONTENT, save_report
+
+
+def build_quiz(questions: int) -> QuizGenerationResponse:
+    sentences = [s.strip() for s in SAMPLE_CONTENT.split(". ") if s.strip()]
+    return QuizGenerationResponse(
+        quiz_id="ai-quiz-12345",
+        questions=[
+            {
+                "question": f"Question {i + 1}: which statement about '{sentences[i % len(sentences)][:60]}' is correct?",
+                "type": "mcq",
+                "options": [f"{sentences[(i + j) % len(sentences)]} (option {j})" for j in range(4)],
+                "correct_answer": f"{sentences[i % len(sentences)]} (option 0)",
+                "explanation": " ".join(sentences[:3]),
+                "difficulty": "medium",
+                "points": 1,
+            }
+            for i in range(questions)
+        ],
+        status="completed",
+        ai_powered=True,
+    )
+
+
+def build_summary(key_points: int) -> SummaryResponse:
+    sentences = [s.strip() for s in SAMPLE_CONTENT.split(". ") if s.strip()]
+    return SummaryResponse(
+        video_id="video-001",
+        summary_type="detailed",
+        summary=" ".join(sentences * 12),
+        key_points=[f"{sentences[i % len(sentences)]} ({i})" for i in range(key_points)],
+        duration_covered="45:00",
+        generated_at="2026-01-01T00:00:00",
+        ai_powered=True,
+    )
+
+
+def build_history(messages: int) -> ConversationHistory:
+    return ConversationHistory(
+        messages=[
+            {"id": str(i), "role": "user" if i % 2 == 0 else "assistant",
+             "content": SAMPLE_CONTENT, "timestamp": "2026-01-01T00:00:00"}
+            for i in range(messages)
+        ],
+        total=messages,
+    )
+
+
+def time_per_call(fn: Callable[[], bytes], repeat: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def measure(name: str, model, repeat: int, loop) -> Dict:
+    field = create_response_field(name=f"Response_{name}", type_=type(model))
+
+    def default_path() -> bytes:
+        # What FastAPI does with response_model: dump, validate the dump, encode with the stdlib encoder
+        content = loop.run_until_complete(serialize_response(field=field, response_content=model, is_coroutine=True))
+        return JSONResponse(content).body
+
+    def fast_default_class() -> bytes:
+        # response_model kept, only the response class swapped
+        content = loop.run_until_complete(serialize_response(field=field, response_content=model, is_coroutine=True))
+        return FastJSONResponse(content).body
+
+    def fast_path() -> bytes:
+        return model_response(model).body
+
+    body = fast_path()
+    result = {
+        "default_ms": round(time_per_call(default_path, repeat), 3),
+        "fast_json_class_ms": round(time_per_call(fast_default_class, repeat), 3),
+        "model_response_ms": round(time_per_call(fast_path, repeat), 3),
+        "raw_bytes": len(body),
+        "default_bytes": len(default_path()),
+    }
+    gzip = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    result["gzip_bytes"] = len(gzip.compress(body) + gzip.flush())
+    result["gzip_ms"] = round(time_per_call(lambda: zlib.compress(body, GZIP_LEVEL), repeat), 3)
+    if BROTLI_AVAILABLE:
+        import brotli
+        result["brotli_bytes"] = len(brotli.compress(body, quality=BROTLI_QUALITY))
+        result["brotli_ms"] = round(time_per_call(lambda: brotli.compress(body, quality=BROTLI_QUALITY), repeat), 3)
+    result["speedup"] = round(result["default_ms"] / result["model_response_ms"], 1)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmark response serialization and compression")
+    parser.add_argument("--questions", type=int, default=50, help="questions in the quiz payload")
+    parser.add_argument("--key-points", type=int, default=40, help="key points in the summary payload")
+    parser.add_argument("--messages", type=int, default=100, help="messages in the history payload")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--label", default="serialization", help="name used in the saved results file")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    payloads = {
+        "quiz": build_quiz(args.questions),
+        "summary": build_summary(args.key_points),
+        "history": build_history(args.messages),
+    }
+    report = {"orjson": ORJSON_AVAILABLE, "brotli": BROTLI_AVAILABLE, "payloads": {}}
+    for name, model in payloads.items():
+        report["payloads"][name] = measure(name, model, args.repeat, loop)
+    loop.close()
+
+    print(f"\n📊 Serialization per response (orjson={ORJSON_AVAILABLE}, brotli={BROTLI_AVAILABLE})")
+    for name, stats in report["payloads"].items():
+        sizes = f"{stats['raw_bytes']}B raw, {stats['gzip_bytes']}B gzip"
+        if "brotli_bytes" in stats:
+            sizes += f", {stats['brotli_bytes']}B br"
+        print(f"  {name:<8} default={stats['default_ms']}ms fast_class={stats['fast_json_class_ms']}ms "
+              f"model_response={stats['model_response_ms']}ms ({stats['speedup']}x) | {sizes}")
+    print(f"💾 Saved {save_report(report, args.label)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
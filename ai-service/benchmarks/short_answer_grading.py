@@ -0,0 +1,159 @@
+# /ai-service/benchmarks/short_answer_grading.py
+# Grades a synthetic class of short answers: the local vectorized grader on its own, then the endpoint with
+# low-confidence answers escalated to the fake Gemini. Answers are generated as known variants of the expected
+# answer (exact, reworded, typos, partial, negated, another question's answer, blank) so the local scores can be
+# checked against what each variant should earn.
+#   python -m benchmarks.short_answer_grading --answers 10000 --questions 25
+#   python -m benchmarks.short_answer_grading --answers 50000 --unique-ratio 0.3 --latency-ms 800
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_providers import FakeProviderConfig, LatencyProfile
+from benchmarks.loadtest import install_fakes, save_report
+
+FACTS = [
+    ("What does the mitochondria produce?", "ATP, which the cell uses as its energy currency",
+     "Cellular respiration in the mitochondria turns glucose and oxygen into ATP"),
+    ("Where are proteins assembled?", "On ribosomes, which translate messenger RNA into amino acid chains",
+     "Ribosomes read mRNA codons and join the matching amino acids"),
+    ("What is the role of an enzyme?", "It speeds up a chemical reaction by lowering its activation energy",
+     "Enzymes are catalysts that are not used up by the reaction"),
+    ("What makes up the cell membrane?", "A lipid bilayer of phospholipids with embedded proteins",
+     "Hydrophobic tails face inward and hydrophilic heads face the water"),
+    ("What is an allele?", "One of the alternative versions of a gene at the same locus",
+     "Different alleles produce variations of the same inherited trait"),
+    ("Why do plants need chlorophyll?", "Chlorophyll absorbs light energy for photosynthesis",
+     "The absorbed light drives the conversion of carbon dioxide and water into glucose"),
+    ("What does DNA polymerase do?", "It copies DNA by adding nucleotides to the new strand during replication",
+     "Polymerase reads the template strand and pairs complementary bases"),
+    ("What is osmosis?", "Diffusion of water across a semipermeable membrane toward higher solute concentration",
+     "Water moves without energy input until concentrations balance"),
+]
+SYNONYMS = {"produces": "makes", "copies": "duplicates", "absorbs": "captures", "speeds": "accelerates",
+            "energy": "power", "versions": "forms", "across": "through"}
+# Score each variant should earn, for the accuracy check
+EXPECTED = {"exact": 1.0, "reworded": 1.0, "typos": 1.0, "partial": 0.5, "negated": 0.0, "wrong": 0.0, "blank": 0.0}
+VARIANT_WEIGHTS = {"exact": 0.15, "reworded": 0.25, "typos": 0.15, "partial": 0.2, "negated": 0.05, "wrong": 0.15, "blank": 0.05}
+
+
+def build_questions(count: int) -> List[Dict]:
+    return [
+        {"question_id": f"q{i}", "question": FACTS[i % len(FACTS)][0], "correct_answer": FACTS[i % len(FACTS)][1],
+         "explanation": FACTS[i % len(FACTS)][2], "points": 2}
+        for i in range(count)
+    ]
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def make_answer(question: Dict, questions: List[Dict], variant: str, rng: random.Random) -> str:
+    words = question["correct_answer"].split()
+    if variant == "exact":
+        return question["correct_answer"]
+    if variant == "reworded":
+        return "I think " + " ".join(SYNONYMS.get(w, w) for w in words) + rng.choice(["", ".", " basically"])
+    if variant == "typos":
+        return " ".join(_typo(w, rng) if rng.random() < 0.3 else w for w in words)
+    if variant == "partial":
+        return " ".join(words[:max(len(words) // 2, 1)])
+    if variant == "negated":
+        return "It does not do this: " + question["correct_answer"].lower()
+    if variant == "wrong":
+        other = rng.choice([q for q in questions if q["correct_answer"] != question["correct_answer"]] or questions)
+        return other["correct_answer"]
+    return ""
+
+
+def build_submissions(questions: List[Dict], count: int, unique_ratio: float, seed: int) -> List[Tuple[Dict, str]]:
+    """(submission, variant) pairs; unique_ratio below 1 repeats earlier answers the way a class often does"""
+    rng = random.Random(seed)
+    variants, weights = list(VARIANT_WEIGHTS), list(VARIANT_WEIGHTS.values())
+    pairs = []
+    for i in range(count):
+        if pairs and rng.random() > unique_ratio:
+            previous, variant = rng.choice(pairs)
+            pairs.append(({**previous, "submission_id": f"s{i}"}, variant))
+            continue
+        question = rng.choice(questions)
+        variant = rng.choices(variants, weights)[0]
+        answer = make_answer(question, questions, variant, rng)
+        pairs.append(({"submission_id": f"s{i}", "question_id": question["question_id"], "answer": answer}, variant))
+    return pairs
+
+
+def accuracy(results: List[Dict], variants: List[str]) -> Dict:
+    """Mean absolute error against each variant's expected score"""
+    by_variant: Dict[str, List[float]] = {}
+    for result, variant in zip(results, variants):
+        by_variant.setdefault(variant, []).append(abs(result["score"] - EXPECTED[variant]))
+    report = {variant: round(sum(errors) / len(errors), 3) for variant, errors in sorted(by_variant.items())}
+    report["overall"] = round(sum(sum(e) for e in by_variant.values()) / max(len(results), 1), 3)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time local short-answer grading and LLM escalation")
+    parser.add_argument("--answers", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=25)
+    parser.add_argument("--unique-ratio", type=float, default=1.0, help="share of answers not copied from another")
+    parser.add_argument("--latency-ms", type=float, default=400, help="fake Gemini latency per grading batch")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default="short-answer-grading", help="name used in the saved results file")
+    args = parser.parse_args()
+
+    os.environ.pop("MONGODB_URI", None)
+    app, _ = install_fakes(FakeProviderConfig(latency=LatencyProfile("fixed", args.latency_ms)))
+    from app.services.short_answer_grader import ShortAnswerGrader
+
+    questions = build_questions(args.questions)
+    pairs = build_submissions(questions, args.answers, args.unique_ratio, args.seed)
+    submissions = [submission for submission, _ in pairs]
+    variants = [variant for _, variant in pairs]
+    report = {"answers": args.answers, "questions": args.questions, "unique_ratio": args.unique_ratio}
+
+    # A fresh grader pays for hashing every term; the second run shows the warm feature cache
+    grader = ShortAnswerGrader()
+    for run in ("cold", "warm"):
+        started = time.perf_counter()
+        results = grader.grade(questions, submissions)
+        report[f"local_{run}_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    report["local_answers_per_second"] = round(args.answers / (report["local_warm_ms"] / 1000))
+    report["local_error"] = accuracy(results, variants)
+    confidences = sorted(result["confidence"] for result in results)
+    report["local_confidence_p10"] = confidences[len(confidences) // 10]
+
+    client = TestClient(app)
+    started = time.perf_counter()
+    response = client.post("/api/ai/grade-short-answers", json={"questions": questions, "submissions": submissions})
+    response.raise_for_status()
+    body = response.json()
+    report["endpoint_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    report["endpoint_stats"] = body["stats"]
+    report["escalated_error"] = accuracy(body["results"], variants)
+
+    print(f"\n📊 {args.answers} answers to {args.questions} questions (unique ratio {args.unique_ratio})")
+    print(f"  local grading   cold={report['local_cold_ms']}ms warm={report['local_warm_ms']}ms "
+          f"({report['local_answers_per_second']} answers/s)")
+    print(f"  local error     {report['local_error']}")
+    stats = body["stats"]
+    print(f"  endpoint        {report['endpoint_ms']}ms, {stats['escalated']} escalated in {stats['llm_batches']} "
+          f"batches, methods {stats['methods']}")
+    print(f"💾 Saved {save_report(report, args.label)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
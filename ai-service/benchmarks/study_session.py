@@ -0,0 +1,102 @@
+# /ai-service/benchmarks/study_session.py
+# Times a run of questions on one video three ways: HTTP ask-question carrying the whole transcript each
+# time, HTTP ask-question by reference, and one WebSocket study session. Providers are the in-process fakes.
+#   python -m benchmarks.study_session --questions 15 --segments 2000 --latency-ms 50
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_providers import FakeProviderConfig, LatencyProfile
+from benchmarks.loadtest import install_fakes, save_report, summarize_latencies
+
+QUESTIONS = [
+    "What is ATP used for?", "How does the mitochondria make it?", "Why does that matter for muscles?",
+    "What is a ribosome?", "Where are proteins folded?", "Can you explain the lipid bilayer again?",
+    "What was the example about enzymes?", "How do mutations change an allele?",
+]
+
+
+def build_transcript(segments: int) -> List[Dict]:
+    topics = ["ATP", "mitochondria", "ribosome", "lipid bilayer", "enzyme", "allele", "mutation", "protein"]
+    return [
+        {"timestamp": f"{i // 60:02d}:{i % 60:02d}",
+         "text": f"In this part we look at {topics[i % len(topics)]} and how it connects to step {i}."}
+        for i in range(segments)
+    ]
+
+
+def run_questions(ask: Callable[[str], None], questions: int) -> Dict:
+    latencies = []
+    cpu_started = time.process_time()
+    for i in range(questions):
+        started = time.perf_counter()
+        ask(QUESTIONS[i % len(QUESTIONS)])
+        latencies.append(time.perf_counter() - started)
+    cpu_ms = (time.process_time() - cpu_started) * 1000
+    return {**summarize_latencies(latencies), "cpu_ms_per_question": round(cpu_ms / questions, 2)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare per-question cost of HTTP Q&A and WebSocket study sessions")
+    parser.add_argument("--questions", type=int, default=15)
+    parser.add_argument("--segments", type=int, default=2000, help="transcript segments in the video")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake model latency per call")
+    parser.add_argument("--label", default="study-session", help="name used in the saved results file")
+    args = parser.parse_args()
+
+    os.environ.pop("MONGODB_URI", None)
+    app, _ = install_fakes(FakeProviderConfig(latency=LatencyProfile("fixed", args.latency_ms)))
+    client = TestClient(app)
+    transcript = build_transcript(args.segments)
+    video_id = "bench-study-session"
+
+    def ask_inline(question: str) -> None:
+        client.post("/api/video-ai/ask-question", json={
+            "video_id": video_id, "question": question, "transcript": transcript
+        }).raise_for_status()
+
+    def ask_by_reference(question: str) -> None:
+        client.post("/api/video-ai/ask-question", json={
+            "video_id": video_id, "question": question
+        }).raise_for_status()
+
+    report = {"questions": args.questions, "segments": args.segments, "latency_ms": args.latency_ms, "modes": {}}
+    report["modes"]["http_inline"] = run_questions(ask_inline, args.questions)
+    report["modes"]["http_by_reference"] = run_questions(ask_by_reference, args.questions)
+
+    with client.websocket_connect(f"/api/video-ai/session/{video_id}") as websocket:
+        websocket.receive_json()
+        first_tokens = []
+
+        def ask_session(question: str) -> None:
+            started = time.perf_counter()
+            first_delta = None
+            websocket.send_json({"type": "question", "question": question})
+            while True:
+                event = websocket.receive_json()
+                if event["type"] == "answer_delta" and first_delta is None:
+                    first_delta = time.perf_counter() - started
+                    first_tokens.append(first_delta)
+                if event["type"] == "answer_done":
+                    return
+
+        report["modes"]["websocket_session"] = run_questions(ask_session, args.questions)
+        report["modes"]["websocket_session"]["first_delta"] = summarize_latencies(first_tokens)
+
+    print(f"\n📊 {args.questions} questions on a {args.segments}-segment video (model latency {args.latency_ms}ms)")
+    for mode, stats in report["modes"].items():
+        print(f"  {mode:<18} p50={stats['p50_ms']}ms p90={stats['p90_ms']}ms cpu={stats['cpu_ms_per_question']}ms/q")
+    first = report["modes"]["websocket_session"]["first_delta"]
+    print(f"  first streamed text p50={first['p50_ms']}ms")
+    print(f"💾 Saved {save_report(report, args.label)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# /ai-service/benchmarks/summary_tree.py
+# Re-ingests a long transcript after edits of different sizes and counts the summarization work each one costs:
+# Gemini calls and prompt tokens, chunk and merged notes reused, against summarizing the same transcript from
+# scratch. With the summary tree the cost of a re-ingest should follow the size of the edit, not of the video.
+#   python -m benchmarks.summary_tree --segments 4000
+#   python -m benchmarks.summary_tree --segments 12000 --latency-ms 20
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_providers import FakeProviderConfig, LatencyProfile
+from benchmarks.loadtest import install_fakes, save_report
+from benchmarks.study_session import build_transcript
+
+
+def _edit(segments: List[Dict], indexes: List[int]) -> List[Dict]:
+    edited = [dict(segment) for segment in segments]
+    for i in indexes:
+        edited[i]["text"] = edited[i]["text"] + " (corrected)"
+    return edited
+
+
+def _append(segments: List[Dict], count: int) -> List[Dict]:
+    extra = build_transcript(len(segments) + count)[len(segments):]
+    return segments + [{**segment, "text": "Bonus section: " + segment["text"]} for segment in extra]
+
+
+def _insert(segments: List[Dict], at: int, count: int) -> List[Dict]:
+    inserted = [{"timestamp": segments[at]["timestamp"], "text": f"An aside on lab safety, part {i}."} for i in range(count)]
+    return segments[:at] + inserted + segments[at:]
+
+
+def build_scenarios(segments: List[Dict], seed: int) -> Dict[str, Callable[[], List[Dict]]]:
+    rng = random.Random(seed)
+    total = len(segments)
+    scattered = {count: sorted(rng.sample(range(total), count)) for count in (5, 100)}
+    return {
+        "unchanged": lambda: segments,
+        "edit_1": lambda: _edit(segments, [total // 2]),
+        "edit_5_scattered": lambda: _edit(segments, scattered[5]),
+        "edit_20_contiguous": lambda: _edit(segments, list(range(total // 3, total // 3 + 20))),
+        "edit_100_scattered": lambda: _edit(segments, scattered[100]),
+        "append_50": lambda: _append(segments, 50),
+        "insert_10": lambda: _insert(segments, total // 4, 10),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure incremental re-summarization cost against edit size")
+    parser.add_argument("--segments", type=int, default=4000)
+    parser.add_argument("--latency-ms", type=float, default=5, help="fake Gemini latency per call")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default="summary-tree", help="name used in the saved results file")
+    args = parser.parse_args()
+
+    os.environ.pop("MONGODB_URI", None)
+    _, fakes = install_fakes(FakeProviderConfig(latency=LatencyProfile("fixed", args.latency_ms)))
+    from app.models.video_models import VideoTranscript
+    from app.api.routes.video_routes import ingestion_pipeline
+    from app.services import video_artifacts as video_artifacts_module
+
+    # Count only summarization prompts; the starter quiz is generated on every ingest either way
+    gemini, counts = fakes["gemini"], {"calls": 0, "prompt_tokens": 0}
+    generate_content = gemini.generate_content
+
+    def counting_generate_content(prompt: str, **kwargs):
+        if "EXACTLY" not in prompt:
+            counts["calls"] += 1
+            counts["prompt_tokens"] += len(prompt) // 4
+        return generate_content(prompt, **kwargs)
+
+    gemini.generate_content = counting_generate_content
+
+    async def ingest(segments: List[Dict]) -> Dict:
+        counts.update(calls=0, prompt_tokens=0)
+        transcript = VideoTranscript(video_id="bench-video", course_id="bench", title="Cell biology", transcript=segments)
+        started = time.perf_counter()
+        result = await ingestion_pipeline.ingest(transcript, force=True)
+        document = video_artifacts_module.video_artifacts.get("bench-video") or {}
+        return {**counts, "ms": round((time.perf_counter() - started) * 1000, 1), "status": result.get("status"),
+                "nodes": len(document.get("summary_tree", {}).get("nodes", {}))}
+
+    async def run_scenarios() -> Dict:
+        # One event loop for every ingest, as in the service; the pipeline's semaphore is bound to it
+        baseline = build_transcript(args.segments)
+        video_artifacts_module.video_artifacts.store = video_artifacts_module.InMemoryArtifactStore()
+        scratch = await ingest(baseline)
+        report = {"segments": args.segments, "from_scratch": scratch, "scenarios": {}}
+        for name, make in build_scenarios(baseline, args.seed).items():
+            # Every scenario starts from the stored baseline so edits are measured one at a time
+            video_artifacts_module.video_artifacts.store = video_artifacts_module.InMemoryArtifactStore()
+            await ingest(baseline)
+            result = await ingest(make())
+            result["cost_vs_scratch"] = round(result["prompt_tokens"] / max(scratch["prompt_tokens"], 1), 3)
+            report["scenarios"][name] = result
+        return report
+
+    report = asyncio.run(run_scenarios())
+    scratch = report["from_scratch"]
+    print(f"\n📊 {args.segments} segments: from scratch {scratch['calls']} calls, {scratch['prompt_tokens']} prompt "
+          f"tokens, {scratch['nodes']} tree nodes, {scratch['ms']}ms")
+    for name, result in report["scenarios"].items():
+        print(f"  {name:<20} {result['calls']:>4} calls {result['prompt_tokens']:>7} prompt tokens "
+              f"({result['cost_vs_scratch']:.1%} of scratch) {result['ms']}ms {result['status']}")
+    print(f"💾 Saved {save_report(report, args.label)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# /ai-service/benchmarks/worker_scaling.py
+# Serves benchmarks.fake_app with 1..N uvicorn workers and measures throughput at each count.
+#   python -m benchmarks.worker_scaling --workers 1,2,4 --rps 40 --duration 20 --latency-ms 200
+import argparse
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import run_load, save_report
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(workers: int, port: int, args, state_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "LOADTEST_LATENCY_MS": str(args.latency_ms),
+        "LOADTEST_LATENCY_DISTRIBUTION": args.latency_distribution,
+        "LOADTEST_ERROR_RATE": str(args.error_rate),
+        "SHARED_STATE_BACKEND": args.state_backend,
+        "SHARED_STATE_PATH": state_path,
+        "QUESTION_BANK_BACKEND": "memory",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=SERVICE_DIR,
+        env=env,
+        stdout=None if args.verbose else subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+
+
+async def wait_until_ready(client, workers: int, timeout: float = 60) -> None:
+    """Wait until every worker has answered a health check"""
+    deadline = time.monotonic() + timeout
+    seen = set()
+    while time.monotonic() < deadline:
+        with contextlib.suppress(Exception):
+            # A fresh connection per probe, since keep-alive would pin every probe to one worker
+            response = await client.get("/api/health", headers={"Connection": "close"})
+            if response.status_code == 200:
+                seen.add(response.json().get("worker_pid"))
+                if len(seen) >= workers:
+                    return
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"only {len(seen)} of {workers} workers became ready")
+
+
+async def measure(workers: int, args, state_path: str) -> Dict:
+    import httpx
+
+    server = start_server(workers, args.port, args, state_path)
+    try:
+        limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits,
+                                     timeout=args.timeout) as client:
+            await wait_until_ready(client, workers)
+            return await run_load(client, args.scenarios.split(","), args.rps, args.duration,
+                                  args.seed, args.timeout)
+    finally:
+        server.terminate()
+        with contextlib.suppress(subprocess.TimeoutExpired):
+            server.wait(timeout=30)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure AI service throughput against uvicorn worker count")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to test")
+    parser.add_argument("--rps", type=float, default=40, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per worker count")
+    parser.add_argument("--scenarios", default="quiz,chat,summarize,ask", help="comma-separated scenario mix")
+    parser.add_argument("--latency-distribution", default="lognormal", choices=["fixed", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--latency-ms", type=float, default=200, help="mean fake provider latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--state-backend", default="sqlite", choices=["memory", "sqlite", "mongo"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="workers")
+    parser.add_argument("--verbose", action="store_true", help="show server output")
+    return parser.parse_args(argv)
+
+
+async def main_async(args) -> int:
+    results: List[Dict] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            print(f"\n👥 {workers} worker(s) at {args.rps} req/s for {args.duration}s...")
+            report = await measure(workers, args, os.path.join(tmp, f"state-{workers}.db"))
+            lag = report["event_loop_lag"]
+            p99s = [s["p99_ms"] for s in report["endpoints"].values() if s.get("count")]
+            errors = sum(s["errors"] for s in report["endpoints"].values())
+            print(f"   {report['throughput_rps']} req/s, worst p99 {max(p99s) if p99s else '-'}ms, "
+                  f"errors {errors}, client loop lag p99 {lag.get('p99_ms')}ms")
+            results.append({"workers": workers, **report})
+
+    base = results[0]["throughput_rps"] or 1
+    print("\n📊 workers  req/s   speedup")
+    for result in results:
+        print(f"   {result['workers']:<7}  {result['throughput_rps']:<6}  {result['throughput_rps'] / base:.2f}x")
+    path = save_report({"state_backend": args.state_backend, "latency_ms": args.latency_ms,
+                        "rps": args.rps, "runs": results}, args.label)
+    print(f"💾 Saved results to {path}")
+    return 0
+
+
+def main(argv=None) -> int:
+    return asyncio.run(main_async(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
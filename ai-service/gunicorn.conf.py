@@ -0,0 +1,28 @@
+# /ai-service/gunicorn.conf.py
+# Multi-worker serving with graceful reload: gunicorn -c gunicorn.conf.py main:app
+# `kill -HUP <master pid>` starts fresh workers and lets the old ones finish in-flight requests.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8001)}"
+workers = int(os.getenv("AI_SERVICE_WORKERS", os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Quiz generation and document extraction can take well over gunicorn's 30s default
+timeout = int(os.getenv("WORKER_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Recycle workers periodically so slow leaks in provider SDKs cannot accumulate
+max_requests = int(os.getenv("WORKER_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+# Each worker must import the app itself so provider clients and Mongo connections are not forked
+preload_app = False
+
+
+def on_starting(server):
+    backend = os.getenv("SHARED_STATE_BACKEND", "memory")
+    print(f"👥 Starting {workers} workers with '{backend}' shared state")
+    if workers > 1 and backend == "memory":
+        print("⚠️ SHARED_STATE_BACKEND=memory keeps sessions and circuits per worker - use sqlite or mongo")
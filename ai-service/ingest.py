@@ -0,0 +1,67 @@
+# /ai-service/ingest.py
+# Precompute video AI artifacts outside the request path.
+#   python ingest.py video react-hooks-intro --force
+#   python ingest.py backfill --checkpoint ingest_checkpoint.json --concurrency 4
+#   python ingest.py backfill --course-id react-course-001 --limit 50
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+async def run(args) -> int:
+    if args.concurrency:
+        os.environ["INGEST_CONCURRENCY"] = str(args.concurrency)
+    from app.api.routes.video_routes import ingestion_pipeline
+    from app.services.ingestion import transcript_from_document
+    from app.services.transcript_store import transcripts_collection
+
+    # Transcripts are written by the Node server (mongoose model VideoTranscript)
+    collection = transcripts_collection()
+    if collection is None:
+        print("❌ MONGODB_URI is required to read transcripts")
+        return 1
+    if args.command == "video":
+        document = collection.find_one({"videoId": args.video_id})
+        if not document:
+            print(f"❌ No transcript for video {args.video_id}")
+            return 1
+        result = await ingestion_pipeline.ingest(transcript_from_document(document), args.force)
+        print(json.dumps(result, indent=2))
+        return 0 if result["status"] in ("complete", "skipped") else 1
+
+    result = await ingestion_pipeline.backfill(
+        collection, args.checkpoint, course_id=args.course_id, force=args.force, limit=args.limit
+    )
+    print(f"\n✅ Backfill finished: {result['processed']} videos this run, totals {json.dumps(result['counts'])}")
+    if result["failed_ids"]:
+        print(f"⚠️ {len(result['failed_ids'])} videos incomplete - rerun to retry them")
+    return 0
+
+
+def main() -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--concurrency", type=int, help="provider calls in flight at once (INGEST_CONCURRENCY)")
+    common.add_argument("--force", action="store_true", help="recompute even when the transcript is unchanged")
+
+    parser = argparse.ArgumentParser(description="Precompute summaries, segment indexes and starter quizzes for videos")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    video = commands.add_parser("video", parents=[common], help="ingest one video")
+    video.add_argument("video_id")
+
+    backfill = commands.add_parser("backfill", parents=[common], help="ingest the whole catalog, resumably")
+    backfill.add_argument("--checkpoint", default="ingest_checkpoint.json", help="progress file used to resume")
+    backfill.add_argument("--course-id", help="only this course")
+    backfill.add_argument("--limit", type=int, help="stop after this many videos")
+
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,11 +9,38 @@ from dotenv import load_dotenv
 from app.api.routes.quiz_routes import router as quiz_router
 from app.api.routes.chatbot_routes import router as chatbot_router
 from app.api.routes.video_routes import router as video_router 
+from app.api.routes.usage_routes import router as usage_router
+from app.api.routes.admin_routes import router as admin_router
+from app.services.document_extractor import shutdown_extraction_pool
+from app.services.health_prober import health_prober
+from app.utils.http_transport import close_http_client, get_transport_stats
+from app.api.responses import FastJSONResponse
+from app.api.middleware.compression import CompressionMiddleware, get_compression_stats
+from app.api.middleware.deadline import DeadlineMiddleware
+from app.api.middleware.profiling import ProfilingMiddleware
+from app.api.middleware.admission import AdmissionMiddleware
+from app.utils.deadline import get_deadline_stats
+from app.utils.admission import admission_controller
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="LMS AI Service", version="1.0.0", description="AI Service with Quiz Generator, Bobby Chatbot, and Video AI")
+app = FastAPI(
+    title="LMS AI Service",
+    version="1.0.0",
+    description="AI Service with Quiz Generator, Bobby Chatbot, and Video AI",
+    default_response_class=FastJSONResponse
+)
+
+# Request time budgets; added first so 504s still pass through CORS
+app.add_middleware(DeadlineMiddleware)
+
+# Load shedding for batch work and local answers for interactive requests when providers are saturated;
+# outside the deadline middleware so the degraded flag reaches the handler's task
+app.add_middleware(AdmissionMiddleware)
+
+# Per-request sampling for requests sent with X-Debug-Profile: <ADMIN_TOKEN>
+app.add_middleware(ProfilingMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -31,10 +58,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated brotli/gzip for large quiz, summary and history payloads
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(quiz_router, prefix="/api/ai", tags=["Quiz Generator"])
 app.include_router(chatbot_router, prefix="/api/chatbot", tags=["Bobby Chatbot"])
 app.include_router(video_router, prefix="/api/video-ai", tags=["Video AI"])  # ADD THIS LINE
+app.include_router(usage_router, prefix="/api/usage", tags=["Usage"])
+app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
 
 # Root endpoint
 @app.get("/")
@@ -44,24 +76,48 @@ async def root():
         "services": ["Quiz Generator", "Bobby Chatbot", "Video AI"],  # UPDATE THIS LINE
         "endpoints": {
             "quiz": "/api/ai/generate-quiz",
+            "quiz_from_file": "/api/ai/generate-quiz-from-file",
             "bobby_chat": "/api/chatbot/chat",
             "video_summarize": "/api/video-ai/summarize",  # ADD THIS LINE
             "video_qa": "/api/video-ai/ask-question",      # ADD THIS LINE
+            "video_ingest": "/api/video-ai/ingest",
+            "usage": "/api/usage",
             "health": "/api/ai/health, /api/chatbot/health, /api/video-ai/health"  # UPDATE THIS LINE
         }
     }
 
+@app.on_event("startup")
+async def start_health_prober():
+    """Probe dependencies before serving and keep probing in the background"""
+    await health_prober.start()
+    await admission_controller.start()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop background worker pools"""
+    await health_prober.stop()
+    await admission_controller.stop()
+    shutdown_extraction_pool()
+    close_http_client()
+
 # Combined health check
 @app.get("/api/health")
 async def combined_health():
     """Combined health check for all AI services"""
     # Import health functions from routes
     from app.api.routes.quiz_routes import GEMINI_AVAILABLE
-    from app.api.routes.chatbot_routes import GROQ_AVAILABLE, MONGO_AVAILABLE
-    from app.api.routes.video_routes import GEMINI_AVAILABLE as VIDEO_GEMINI_AVAILABLE  # ADD THIS LINE
+    from app.api.routes.chatbot_routes import GROQ_AVAILABLE, mongo_ready
+    from app.api.routes.video_routes import video_ai_service
+    from app.services.provider_cassette import get_cassette_stats
+    from app.utils.shared_state import state_backend
+    VIDEO_GEMINI_AVAILABLE = video_ai_service.gemini_available
+    dependencies = health_prober.get_report()
+    admission = admission_controller.get_stats()
         
     return {
-        "status": "healthy",
+        # Degraded means requests are being served by fallbacks
+        "status": "degraded" if any(d["healthy"] is False for d in dependencies.values()) or admission["slo_at_risk"]
+        else "healthy",
         "services": {
             "quiz_generator": {
                 "ai_available": GEMINI_AVAILABLE,
@@ -69,7 +125,7 @@ async def combined_health():
             },
             "bobby_chatbot": {
                 "ai_available": GROQ_AVAILABLE,
-                "database_available": MONGO_AVAILABLE,
+                "database_available": mongo_ready(),
                 "model": "llama-3.1-8b-instant" if GROQ_AVAILABLE else "intelligent_fallback"
             },
             # ADD THIS BLOCK
@@ -78,12 +134,36 @@ async def combined_health():
                 "model": "gemini-1.5-flash" if VIDEO_GEMINI_AVAILABLE else "intelligent_fallback",
                 "features": ["summarization", "question-answering"]
             }
-        }
+        },
+        "dependencies": dependencies,
+        "provider_cassettes": get_cassette_stats(),
+        "http_transport": get_transport_stats(),
+        "compression": get_compression_stats(),
+        "deadlines": get_deadline_stats(),
+        "admission": admission,
+        "shared_state": state_backend.name,
+        "worker_pid": os.getpid()
     }
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8001))
+    # WEB_CONCURRENCY is the worker count most hosts (Render, Heroku) already set
+    workers = int(os.getenv("AI_SERVICE_WORKERS", os.getenv("WEB_CONCURRENCY", 1)))
+    reload = os.getenv("AI_SERVICE_RELOAD", "false").lower() == "true"
     print(f"🚀 Starting LMS AI Service on port {port}...")
     print("📋 Services: Quiz Generator (Gemini) + Bobby Chatbot (Groq) + Video AI (Gemini)")  # UPDATE THIS LINE
     print(f"🌐 Server will be available on port {port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    if workers > 1:
+        from app.utils.shared_state import SHARED_STATE_BACKEND
+        print(f"👥 Running {workers} workers with '{SHARED_STATE_BACKEND}' shared state")
+        if SHARED_STATE_BACKEND == "memory":
+            print("⚠️ SHARED_STATE_BACKEND=memory keeps sessions and circuits per worker - use sqlite or mongo")
+    # An import string is required for workers > 1 and for reload
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=1 if reload else workers,
+        reload=reload,
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", 30)),
+    )
@@ -0,0 +1,55 @@
+from app.services.short_answer_grader import GRADING_ESCALATE_BELOW, ShortAnswerGrader
+
+QUESTIONS = [
+    {"question_id": "yes_no", "question": "Is a virus a living cell?", "correct_answer": "No", "points": 1},
+    {"question_id": "letter", "question": "Which language is the Linux kernel written in?", "correct_answer": "C",
+     "points": 1},
+    {"question_id": "atp", "question": "What does the mitochondria produce?",
+     "correct_answer": "ATP, which the cell uses as its energy currency", "points": 1},
+    {"question_id": "co2", "question": "Which gas do plants take in for photosynthesis?",
+     "correct_answer": "Carbon dioxide", "points": 1},
+]
+
+
+def grade(question_id, answer):
+    submission = {"submission_id": "s1", "question_id": question_id, "answer": answer}
+    return ShortAnswerGrader().grade(QUESTIONS, [submission])[0]
+
+
+def test_one_word_correct_answer_gets_full_credit():
+    result = grade("yes_no", "No.")
+    assert result["score"] == 1.0
+    assert result["method"] == "exact"
+    assert result["feedback"] == "Matches the expected answer."
+
+
+def test_one_letter_correct_answer_gets_full_credit():
+    result = grade("letter", "c")
+    assert result["score"] == 1.0
+    assert result["method"] == "exact"
+
+
+def test_wrong_letter_against_termless_reference_is_escalated():
+    result = grade("letter", "x")
+    assert result["method"] == "local"
+    assert result["feedback"] != "No answer was given."
+    assert result["confidence"] < GRADING_ESCALATE_BELOW
+
+
+def test_wrong_yes_no_answer_is_escalated():
+    result = grade("yes_no", "Yes")
+    assert result["method"] == "local"
+    assert result["confidence"] < GRADING_ESCALATE_BELOW
+
+
+def test_synonym_without_shared_terms_is_escalated():
+    result = grade("co2", "CO2")
+    assert result["method"] == "local"
+    assert result["confidence"] < GRADING_ESCALATE_BELOW
+
+
+def test_only_blank_answers_are_graded_as_empty():
+    blank = grade("atp", "  ?! ")
+    assert blank["score"] == 0.0
+    assert blank["feedback"] == "No answer was given."
+    assert grade("atp", "x")["feedback"] != "No answer was given."
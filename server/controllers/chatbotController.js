@@ -2,6 +2,7 @@
 import axios from 'axios';
 
 const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'https://your-ai-service.onrender.com';
+const CHAT_TIMEOUT_MS = 30000;
 
 // Chat with Bobby
 export const chatWithBobby = async (req, res) => {
@@ -23,9 +24,11 @@ export const chatWithBobby = async (req, res) => {
       message,
       sessionId
     }, {
-      timeout: 30000, // 30 second timeout
+      timeout: CHAT_TIMEOUT_MS,
       headers: {
-        'Content-Type': 'application/json'
+        'Content-Type': 'application/json',
+        // Bobby answers within this budget, with a fallback reply if Groq is too slow
+        'X-Request-Timeout-Ms': String(CHAT_TIMEOUT_MS - 2000)
       }
     });
 
@@ -79,14 +82,30 @@ export const getChatHistory = async (req, res) => {
       });
     }
 
+    const { before, after, limit } = req.query;
     const response = await axios.get(`${AI_SERVICE_URL}/api/chatbot/history/${sessionId}`, {
+      params: { before, after, limit },
+      headers: req.headers['if-none-match'] ? { 'If-None-Match': req.headers['if-none-match'] } : {},
+      // 304 means the client's copy of this page is still current
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
       timeout: 10000
     });
 
+    if (response.headers.etag) {
+      res.set('ETag', response.headers.etag);
+    }
+    if (response.status === 304) {
+      return res.status(304).end();
+    }
+
     res.status(200).json({
       success: true,
       data: {
-        messages: response.data.messages || []
+        messages: response.data.messages || [],
+        total: response.data.total || 0,
+        hasMoreBefore: response.data.has_more_before || false,
+        beforeCursor: response.data.before_cursor || null,
+        afterCursor: response.data.after_cursor || null
       }
     });
 
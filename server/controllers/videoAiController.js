@@ -4,6 +4,60 @@ import VideoQA from '../models/VideoQA.js';
 import axios from 'axios';
 
 const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'https://skillnest-ai-service.onrender.com';
+// The AI service is told to answer a little inside these, falling back to local summaries/answers if it must
+const SUMMARY_TIMEOUT_MS = 30000;
+const QA_TIMEOUT_MS = 20000;
+const deadlineHeader = (timeoutMs) => ({ 'X-Request-Timeout-Ms': String(timeoutMs - 2000) });
+
+const INGEST_MAX_ATTEMPTS = 4;
+
+// Send only the digest so the AI service serves its cached copy. It answers 404 when it cannot load the
+// transcript itself (no Mongo access, Mongo marked down), and transcripts saved before digests existed have
+// none, so both cases send the full transcript inline.
+const postWithTranscript = async (path, transcriptDoc, body, options) => {
+  const sendInline = async () => {
+    const full = await VideoTranscript.findOne({ videoId: transcriptDoc.videoId }, { transcript: 1 });
+    return axios.post(`${AI_SERVICE_URL}${path}`, {
+      ...body,
+      transcript: (full?.transcript || []).map(({ timestamp, text }) => ({ timestamp, text }))
+    }, options);
+  };
+
+  if (!transcriptDoc.transcriptDigest) {
+    return sendInline();
+  }
+  try {
+    return await axios.post(`${AI_SERVICE_URL}${path}`, {
+      ...body,
+      transcript_digest: transcriptDoc.transcriptDigest
+    }, options);
+  } catch (error) {
+    if (error.response?.status !== 404) {
+      throw error;
+    }
+    return sendInline();
+  }
+};
+
+// Ask the AI service to precompute summaries, the segment index and starter questions.
+// Fire-and-forget: the AI service queues the work, and on-demand requests still work without it.
+// Under load it sheds ingestion with 503 + Retry-After, so those are retried after the given delay.
+const queueIngestion = (transcriptDoc, attempt = 1) => {
+  axios.post(`${AI_SERVICE_URL}/api/video-ai/ingest`, {
+    video_id: transcriptDoc.videoId,
+    course_id: transcriptDoc.courseId,
+    title: transcriptDoc.title,
+    transcript: transcriptDoc.transcript.map(({ timestamp, text }) => ({ timestamp, text })),
+    duration: transcriptDoc.duration
+  }).catch((error) => {
+    if (error.response?.status === 503 && attempt < INGEST_MAX_ATTEMPTS) {
+      const retryAfterSeconds = Number(error.response.headers['retry-after']) || 15;
+      setTimeout(() => queueIngestion(transcriptDoc, attempt + 1), retryAfterSeconds * 1000 * attempt);
+      return;
+    }
+    console.error(`Failed to queue ingestion for ${transcriptDoc.videoId}:`, error.message);
+  });
+};
 
 // Seed function to manually add transcripts (for showcase)
 const seedTranscripts = async () => {
@@ -61,8 +115,9 @@ const seedTranscripts = async () => {
   for (const transcriptData of sampleTranscripts) {
     const exists = await VideoTranscript.findOne({ videoId: transcriptData.videoId });
     if (!exists) {
-      await VideoTranscript.create(transcriptData);
+      const created = await VideoTranscript.create(transcriptData);
       console.log(`✅ Seeded transcript: ${transcriptData.title}`);
+      queueIngestion(created);
     }
   }
 };
@@ -127,8 +182,8 @@ export const getVideoSummary = async (req, res) => {
     let summary = await VideoSummary.findOne({ videoId, userId });
     
     if (!summary) {
-      // Get transcript first
-      const transcript = await VideoTranscript.findOne({ videoId });
+      // The AI service loads and caches the transcript itself; the digest tells it whether its copy is current
+      const transcript = await VideoTranscript.findOne({ videoId }, { videoId: 1, courseId: 1, transcriptDigest: 1 });
       if (!transcript) {
         return res.status(404).json({
           success: false,
@@ -137,10 +192,12 @@ export const getVideoSummary = async (req, res) => {
       }
 
       // Call AI service for summarization
-      const aiResponse = await axios.post(`${AI_SERVICE_URL}/api/video-ai/summarize`, {
+      const aiResponse = await postWithTranscript('/api/video-ai/summarize', transcript, {
         video_id: videoId,
-        transcript: transcript.transcript,
         summary_type: 'detailed'
+      }, {
+        timeout: SUMMARY_TIMEOUT_MS,
+        headers: deadlineHeader(SUMMARY_TIMEOUT_MS)
       });
 
       if (!aiResponse.data || !aiResponse.data.summary) {
@@ -212,8 +269,8 @@ export const askQuestion = async (req, res) => {
       });
     }
 
-    // Get transcript
-    const transcript = await VideoTranscript.findOne({ videoId });
+    // Only the digest is needed: the AI service keeps the parsed transcript cached
+    const transcript = await VideoTranscript.findOne({ videoId }, { videoId: 1, courseId: 1, transcriptDigest: 1 });
     if (!transcript) {
       return res.status(404).json({
         success: false,
@@ -222,13 +279,14 @@ export const askQuestion = async (req, res) => {
     }
 
     // Call AI service for answer
-    const aiResponse = await axios.post(`${AI_SERVICE_URL}/api/video-ai/ask-question`, {
+    const aiResponse = await postWithTranscript('/api/video-ai/ask-question', transcript, {
       video_id: videoId,
-      transcript: transcript.transcript,
       question
     }, {
+      timeout: QA_TIMEOUT_MS,
       headers: {
-        'Authorization': `Bearer ${process.env.AI_SERVICE_KEY}`
+        'Authorization': `Bearer ${process.env.AI_SERVICE_KEY}`,
+        ...deadlineHeader(QA_TIMEOUT_MS)
       }
     });
 
@@ -393,6 +451,7 @@ export const uploadTranscript = async (req, res) => {
     });
 
     console.log(`✅ Uploaded transcript: ${title}`);
+    queueIngestion(newTranscript);
 
     res.status(201).json({
       success: true,
@@ -1,3 +1,4 @@
+import crypto from 'crypto';
 import mongoose from 'mongoose';
 
 const videoTranscriptSchema = new mongoose.Schema({
@@ -24,6 +25,10 @@ const videoTranscriptSchema = new mongoose.Schema({
       required: true
     }
   }],
+  // Same digest the AI service computes, so it can tell whether its cached copy is current
+  transcriptDigest: {
+    type: String
+  },
   cloudinaryUrl: {
     type: String,
     required: true
@@ -38,6 +43,21 @@ const videoTranscriptSchema = new mongoose.Schema({
   }
 });
 
+export const computeTranscriptDigest = (transcript) => {
+  const hash = crypto.createHash('sha1');
+  for (const segment of transcript) {
+    hash.update(`${segment.timestamp || ''}\x1f${(segment.text || '').trim()}\x1e`, 'utf8');
+  }
+  return hash.digest('hex').slice(0, 16);
+};
+
+videoTranscriptSchema.pre('save', function (next) {
+  if (this.isModified('transcript')) {
+    this.transcriptDigest = computeTranscriptDigest(this.transcript);
+  }
+  next();
+});
+
 // Indexes for efficient queries
 videoTranscriptSchema.index({ videoId: 1 });
 videoTranscriptSchema.index({ courseId: 1 });
@@ -20,7 +20,7 @@ const router = express.Router();
 router.post('/chat', chatbotRateLimit, validateChatRequest, logChatbotRequest, chatWithBobby);
 
 // @route   GET /api/chatbot/history/:sessionId
-// @desc    Get conversation history for a session
+// @desc    Get a page of conversation history (?before=&after=&limit=, supports If-None-Match)
 // @access  Public
 router.get('/history/:sessionId', getChatHistory);
 
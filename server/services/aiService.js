@@ -1,5 +1,8 @@
 import axios from 'axios';
 
+// The AI service is told to answer a little inside our own timeout, falling back locally if it must
+const QUIZ_TIMEOUT_MS = 45000;
+
 class AiService {
   constructor() {
     this.aiServiceUrl = process.env.AI_SERVICE_URL || 'http://localhost:8001';
@@ -16,6 +19,9 @@ class AiService {
         },
         course_id: settings.courseId || 'default',
         user_id: settings.userId || 'default'
+      }, {
+        timeout: QUIZ_TIMEOUT_MS,
+        headers: { 'X-Request-Timeout-Ms': String(QUIZ_TIMEOUT_MS - 2000) }
       });
       
       return response.data;